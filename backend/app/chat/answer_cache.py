@@ -0,0 +1,165 @@
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from ..core.config import settings
+
+@dataclass
+class CachedAnswer:
+    document_id: int
+    question: str
+    embedding: np.ndarray  # unit-length question embedding
+    answer: str
+    context_chunks_used: int
+    created_at: float
+    citations: List[dict] = field(default_factory=list)
+
+class AnswerCache:
+    """
+    Thread-safe semantic cache of generated answers
+
+    Entries are keyed by document and question embedding: a new question is
+    answered from the cache when its cosine similarity to a cached question on
+    the same document reaches the threshold. Entries expire after a TTL and the
+    least recently used ones are evicted beyond max_entries.
+
+    Each document has a generation, bumped by invalidate_document(). Callers
+    read it before retrieving and pass it to put(), so an answer built from an
+    index that was replaced meanwhile (e.g. a partial index while ingesting)
+    is not cached after the invalidation.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, min_similarity: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.min_similarity = min_similarity
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._by_document: Dict[int, Dict[int, CachedAnswer]] = {}
+        self._generations: Dict[int, int] = {}
+        self._next_key = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, document_id: int, embedding: np.ndarray) -> Optional[CachedAnswer]:
+        """
+        Find a cached answer to a similar question
+        Args:
+            document_id: Document the question is about
+            embedding: Unit-length question embedding
+        Returns: The closest cached answer above the threshold, or None
+        """
+        with self._lock:
+            self._expire(document_id)
+            candidates = self._by_document.get(document_id)
+            if not candidates:
+                self.misses += 1
+                return None
+
+            keys = list(candidates)
+            matrix = np.stack([candidates[key].embedding for key in keys])
+            scores = matrix @ embedding
+            best = int(np.argmax(scores))
+            if scores[best] < self.min_similarity:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(keys[best])
+            self.hits += 1
+            return candidates[keys[best]]
+
+    def put(
+        self,
+        document_id: int,
+        question: str,
+        embedding: np.ndarray,
+        answer: str,
+        context_chunks_used: int,
+        citations: Optional[List[dict]] = None,
+        generation: Optional[int] = None
+    ) -> None:
+        """
+        Cache an answer, evicting least recently used entries beyond max_entries
+        Args:
+            generation: generation() of the document when retrieval started; the
+                answer is dropped if the document was invalidated since
+        """
+        if self.max_entries <= 0:
+            return
+        entry = CachedAnswer(
+            document_id=document_id,
+            question=question,
+            embedding=np.asarray(embedding, dtype='float32'),
+            answer=answer,
+            context_chunks_used=context_chunks_used,
+            created_at=time.monotonic(),
+            citations=citations or []
+        )
+        with self._lock:
+            if generation is not None and generation != self._generations.get(document_id, 0):
+                return
+            key = self._next_key
+            self._next_key += 1
+            self._entries[key] = entry
+            self._by_document.setdefault(document_id, {})[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def generation(self, document_id: int) -> int:
+        """Number of times the document's answers were invalidated"""
+        with self._lock:
+            return self._generations.get(document_id, 0)
+
+    def invalidate_document(self, document_id: int) -> None:
+        """Drop every cached answer for a document (reprocessed or deleted)"""
+        with self._lock:
+            self._generations[document_id] = self._generations.get(document_id, 0) + 1
+            for key in list(self._by_document.get(document_id, {})):
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_document.clear()
+
+    def stats(self) -> dict:
+        """Cache counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+    def _expire(self, document_id: int) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        cutoff = time.monotonic() - self.ttl_seconds
+        for key, entry in list(self._by_document.get(document_id, {}).items()):
+            if entry.created_at < cutoff:
+                self._remove(key)
+
+    def _remove(self, key: int) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        document_entries = self._by_document.get(entry.document_id)
+        if document_entries is not None:
+            document_entries.pop(key, None)
+            if not document_entries:
+                del self._by_document[entry.document_id]
+
+# Global instance
+answer_cache = AnswerCache(
+    max_entries=settings.answer_cache_max_entries,
+    ttl_seconds=settings.answer_cache_ttl_seconds,
+    min_similarity=settings.answer_cache_min_similarity
+)
\ No newline at end of file
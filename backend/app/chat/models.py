@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..core.database import Base
@@ -15,6 +15,10 @@ class Conversation(Base):
     # Context and metadata
     context_chunks_used = Column(Integer, default=0)
     response_time_seconds = Column(Float, nullable=True)
+    time_to_first_token_seconds = Column(Float, nullable=True)  # streamed answers only
+    citations = Column(JSON, nullable=True)  # pages and character spans of the context used
+    document_ids = Column(JSON, nullable=True)  # every document searched, for multi-document questions
+    stage_timings = Column(JSON, nullable=True)  # seconds per stage (retrieval, llm, ...) up to saving the answer
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     def __repr__(self):
@@ -1,38 +1,69 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .service import ChatService
-from .schemas import QuestionRequest, QuestionResponse, ConversationHistoryResponse, ConversationResponse
-from ..documents.service import DocumentService
-from ..core.database import get_db
+from .schemas import (
+    QuestionRequest, QuestionResponse, MultiDocumentQuestionRequest, MultiDocumentQuestionResponse,
+    ConversationHistoryResponse, ConversationResponse
+)
+from ..documents.models import Document
+from ..core.database import get_async_db
 
 router = APIRouter()
 
 @router.post("/ask", response_model=QuestionResponse)
 async def ask_question(
     request: QuestionRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Ask a question about a document
     """
-    return ChatService.ask_question(db, request)
+    return await ChatService.ask_question(db, request)
+
+@router.post("/ask/multi", response_model=MultiDocumentQuestionResponse)
+async def ask_across_documents(
+    request: MultiDocumentQuestionRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Ask a question across several documents, or all of them with "all"
+    """
+    return await ChatService.ask_across_documents(db, request)
+
+@router.post("/ask/stream")
+async def ask_question_stream(
+    request: QuestionRequest,
+    http_request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Ask a question and stream the answer as server-sent events
+    """
+    # Fail with a proper status code before the stream starts
+    await ChatService.validate_document(db, request.document_id)
+    
+    return StreamingResponse(
+        ChatService.stream_answer(request, http_request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/history/{document_id}", response_model=ConversationHistoryResponse)
 async def get_conversation_history(
     document_id: int,
     limit: int = 50,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get conversation history for a document
     """
-    document = DocumentService.get_document(db, document_id)
+    document = await db.get(Document, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    conversations = ChatService.get_conversation_history(db, document_id, limit)
+    conversations = await ChatService.get_conversation_history(db, document_id, limit)
     
     return ConversationHistoryResponse(
         conversations=[ConversationResponse.model_validate(conv) for conv in conversations],
@@ -43,12 +74,12 @@ async def get_conversation_history(
 @router.get("/conversation/{conversation_id}", response_model=ConversationResponse)
 async def get_conversation(
     conversation_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get a specific conversation by ID
     """
-    conversation = ChatService.get_conversation(db, conversation_id)
+    conversation = await ChatService.get_conversation(db, conversation_id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
@@ -1,11 +1,23 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional, Union
 from datetime import datetime
 
 class QuestionRequest(BaseModel):
     document_id: int
     question: str
 
+class MultiDocumentQuestionRequest(BaseModel):
+    document_ids: Union[List[int], Literal["all"]]  # "all" = every processed document
+    question: str
+
+class Citation(BaseModel):
+    document_id: Optional[int] = None
+    page: Optional[int] = None  # 1-based, None for documents indexed before pages were tracked
+    char_start: Optional[int] = None  # span in the document's cleaned text
+    char_end: Optional[int] = None
+    score: float
+    snippet: str
+
 class QuestionResponse(BaseModel):
     answer: str
     question: str
@@ -13,14 +25,29 @@ class QuestionResponse(BaseModel):
     context_chunks_used: int
     response_time_seconds: float
     conversation_id: int
+    cached: bool = False  # answered from the semantic answer cache
+    citations: List[Citation] = []
+
+class MultiDocumentQuestionResponse(BaseModel):
+    answer: str
+    question: str
+    document_ids: List[int]  # documents searched
+    context_chunks_used: int
+    response_time_seconds: float
+    conversation_id: int
+    citations: List[Citation] = []
 
 class ConversationResponse(BaseModel):
     id: int
     document_id: int
+    document_ids: Optional[List[int]] = None  # set for multi-document questions
     question: str
     answer: str
     context_chunks_used: int
     response_time_seconds: Optional[float]
+    time_to_first_token_seconds: Optional[float] = None
+    citations: Optional[List[Citation]] = None
+    stage_timings: Optional[Dict[str, float]] = None  # seconds per stage, see GET /metrics
     created_at: datetime
     
     class Config:
@@ -1,48 +1,86 @@
-import os
+import json
 import time
-from typing import List, Optional, Tuple
-from sqlalchemy.orm import Session
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
-import google.generativeai as genai
+
+import numpy as np
 
 from .models import Conversation
-from .schemas import QuestionRequest, QuestionResponse, ConversationResponse
-from ..documents.service import DocumentService
+from .answer_cache import answer_cache, CachedAnswer
+from .schemas import (
+    Citation, QuestionRequest, QuestionResponse, MultiDocumentQuestionRequest, MultiDocumentQuestionResponse
+)
+from ..documents.models import Document
 from ..rag.vector_store import get_vector_store
+from ..rag.chunk_store import SearchResult
+from ..rag.hybrid import hybrid_search
+from ..rag.multi_document import search_documents
+from ..rag.embeddings import embedding_service, as_query_batch
 from ..core.config import settings
+from ..core.database import get_async_session_factory
+from ..core.metrics import StageTimer, questions_total, stage
+from ..llm.gateway import llm_gateway
 
-# Configure Gemini
-genai.configure(api_key=settings.gemini_api_key)
+NO_CONTEXT_ANSWER = "I couldn't find information relevant to this question in the document. Please try rephrasing your question."
+EMPTY_RESPONSE_ANSWER = "I apologize, but I couldn't generate a response. Please try rephrasing your question."
 
-class ChatService:
-    
-    @staticmethod
-    def _get_gemini_model():
-        """Get Gemini model instance"""
+# Characters of each cited chunk returned with the answer
+CITATION_SNIPPET_CHARS = 200
+
+# Embedding + FAISS search are CPU-bound; cap how many run at once so they
+# neither block the event loop nor oversubscribe the cores
+_retrieval_executor = ThreadPoolExecutor(max_workers=settings.retrieval_workers, thread_name_prefix="retrieval")
+
+async def _single(text: str) -> AsyncIterator[str]:
+    yield text
+
+def _sse(event: str, data: dict) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _first_within(iterator: AsyncIterator[str], timeout: float) -> AsyncIterator[str]:
+    """Re-yield an async iterator, bounding the wait for its first item"""
+    try:
         try:
-            model_name = os.environ.get("MODEL_NAME", "gemini-2.0-flash-001")
-            model = genai.GenerativeModel(model_name)
-            return model
-        except Exception as e:
-            print(f"❌ Error initializing Gemini model: {e}")
-            raise HTTPException(status_code=500, detail="Failed to initialize AI model")
+            first = await asyncio.wait_for(iterator.__anext__(), timeout=timeout)
+        except StopAsyncIteration:
+            return
+        yield first
+        async for item in iterator:
+            yield item
+    finally:
+        await iterator.aclose()
+
+class ChatService:
     
     @staticmethod
-    def _retrieve_relevant_context(document_id: int, question: str, top_k: int = 5) -> Tuple[List[str], int]:
+    def _retrieve_relevant_context(
+        document_id: int,
+        question: str,
+        top_k: int = 5,
+        question_embedding: Optional[np.ndarray] = None
+    ) -> Tuple[List[SearchResult], int]:
         """
         Retrieve relevant context chunks for the question
         
         Returns:
-            tuple: (context_chunks, chunks_count)
+            tuple: (context_chunks with their page and character span, chunks_count)
         """
         try:
             vector_store = get_vector_store(document_id)
             if not vector_store.exists():
                 raise ValueError(f"No vector index found for document {document_id}")
 
-            search_results = vector_store.search(question, top_k=top_k)
+            search_results = hybrid_search(vector_store, question, top_k=top_k, query_embedding=question_embedding)
 
-            context_chunks = [text for text, score in search_results]
+            # Weak matches only add prompt tokens and latency; chunks matching
+            # query terms (part numbers, clause ids) are kept regardless
+            context_chunks = ChatService._relevant(search_results)
 
             return context_chunks, len(context_chunks)
             
@@ -51,14 +89,44 @@ class ChatService:
             raise HTTPException(status_code=500, detail=f"Failed to retrieve context: {str(e)}")
     
     @staticmethod
-    def _generate_answer(question: str, context_chunks: List[str]) -> str:
+    def _relevant(search_results: List[SearchResult]) -> List[SearchResult]:
         """
-        Generate answer using Gemini with retrieved context
+        Drop weak matches, which only add prompt tokens and latency
+
+        Chunks below retrieval_min_similarity are kept only when they are among
+        the strongest BM25 matches (part numbers, clause ids), scoring at least
+        retrieval_min_bm25_ratio of the best BM25 score; a chunk sharing a
+        single common word with the question does not qualify.
         """
-        try:
-            context_text = "\n\n".join([f"Context {i+1}: {chunk}" for i, chunk in enumerate(context_chunks)])
+        best_bm25 = max((result.bm25_score or 0.0 for result in search_results), default=0.0)
+        bm25_floor = best_bm25 * settings.retrieval_min_bm25_ratio
+        return [
+            result for result in search_results
+            if (result.similarity is not None and result.similarity >= settings.retrieval_min_similarity)
+            or (result.bm25_score and result.bm25_score >= bm25_floor)
+        ]
+    
+    @staticmethod
+    def _citations(context_chunks: List[SearchResult]) -> List[Citation]:
+        """Where each context chunk came from, in retrieval order"""
+        return [
+            Citation(
+                document_id=result.document_id,
+                page=result.page,
+                char_start=result.char_start,
+                char_end=result.char_end,
+                score=result.score,
+                snippet=result.text[:CITATION_SNIPPET_CHARS]
+            )
+            for result in context_chunks
+        ]
+    
+    @staticmethod
+    def _build_prompt(question: str, context_chunks: List[str], source: str = "a document") -> str:
+        """Build the LLM prompt from the question and retrieved context"""
+        context_text = "\n\n".join([f"Context {i+1}: {chunk}" for i, chunk in enumerate(context_chunks)])
 
-            prompt = f"""Based on the following context from a document, please answer the question. If the answer cannot be found in the context, please say so clearly.
+        return f"""Based on the following context from {source}, please answer the question. If the answer cannot be found in the context, please say so clearly.
 
 Context:
 {context_text}
@@ -66,43 +134,164 @@ Context:
 Question: {question}
 
 Please provide a comprehensive answer based on the context above. If specific information is not available in the context, mention that clearly."""
+    
+    @staticmethod
+    async def _retrieve_relevant_context_async(
+        document_id: int,
+        question: str,
+        top_k: int = 5,
+        question_embedding: Optional[np.ndarray] = None
+    ) -> Tuple[List[SearchResult], int]:
+        """Run retrieval (embedding + FAISS search) on the bounded retrieval pool"""
+        loop = asyncio.get_running_loop()
+        # In the request's context, so the retrieval stages are timed with the question
+        return await loop.run_in_executor(
+            _retrieval_executor,
+            contextvars.copy_context().run,
+            ChatService._retrieve_relevant_context,
+            document_id,
+            question,
+            top_k,
+            question_embedding
+        )
+    
+    @staticmethod
+    async def _lookup_cached_answer(request: QuestionRequest) -> Tuple[Optional[CachedAnswer], Optional[np.ndarray]]:
+        """
+        Embed the question and look for a cached answer to a near-identical one
+        
+        Returns:
+            tuple: (cached answer or None, question embedding for retrieval)
+        """
+        if not settings.answer_cache_enabled:
+            return None, None
+        
+        loop = asyncio.get_running_loop()
+        with stage("query_embedding"):
+            question_embedding = await loop.run_in_executor(
+                _retrieval_executor,
+                embedding_service.create_single_embedding,
+                request.question
+            )
+        with stage("answer_cache"):
+            cached = answer_cache.get(request.document_id, as_query_batch(question_embedding, normalize=True)[0])
+        return cached, question_embedding
+    
+    @staticmethod
+    def _cache_answer(
+        request: QuestionRequest,
+        question_embedding: Optional[np.ndarray],
+        answer: str,
+        chunks_used: int,
+        citations: List[Citation],
+        generation: int
+    ) -> None:
+        if question_embedding is None:
+            return
+        answer_cache.put(
+            request.document_id,
+            request.question,
+            as_query_batch(question_embedding, normalize=True)[0],
+            answer,
+            chunks_used,
+            [citation.model_dump() for citation in citations],
+            generation=generation
+        )
+    
+    @staticmethod
+    async def _generate_answer(question: str, context_chunks: List[str], source: str = "a document") -> Tuple[str, bool]:
+        """
+        Generate answer using Gemini with retrieved context
+        
+        Returns:
+            tuple: (answer, whether the model produced it and it can be cached)
+        """
+        if not context_chunks:
+            # Nothing in the document is similar enough, skip the LLM call entirely
+            return NO_CONTEXT_ANSWER, False
+        
+        try:
+            with stage("prompt"):
+                prompt = ChatService._build_prompt(question, context_chunks, source)
 
-            model = ChatService._get_gemini_model()
-            response = model.generate_content(prompt)
+            with stage("llm"):
+                response = await asyncio.wait_for(
+                    llm_gateway.generate(prompt),
+                    timeout=settings.llm_timeout_seconds
+                )
             
             if not response.text:
-                return "I apologize, but I couldn't generate a response. Please try rephrasing your question."
-            return response.text.strip()
+                return EMPTY_RESPONSE_ANSWER, False
+            return response.text.strip(), True
             
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="The AI model took too long to respond")
         except Exception as e:
             print(f"Error generating answer: {e}")
-            return f"I apologize, but I encountered an error while processing your question: {str(e)}. Please try again."
+            return f"I apologize, but I encountered an error while processing your question: {str(e)}. Please try again.", False
     
     @staticmethod
-    def ask_question(db: Session, request: QuestionRequest) -> QuestionResponse:
+    async def validate_document(db: AsyncSession, document_id: int) -> None:
+        """Ensure the document exists and is processed"""
+        document = await db.get(Document, document_id)
+        if not document:
+            raise HTTPException(status_code=404, detail="Document not found")
+        
+        # Documents still being ingested can be searched once their first chunks are indexed
+        if not document.processed and (document.processing_error or not document.chunk_count):
+            raise HTTPException(status_code=400, detail="Document is not yet processed")
+    
+    @staticmethod
+    async def ask_question(db: AsyncSession, request: QuestionRequest) -> QuestionResponse:
         """
-        Process a question and return an answer
+        Process a question and return an answer, within chat_request_timeout_seconds
         """
+        timer = StageTimer("ask")
+        try:
+            with timer.active():
+                return await asyncio.wait_for(
+                    ChatService._answer_question(db, request, timer),
+                    timeout=settings.chat_request_timeout_seconds
+                )
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Timed out answering the question")
+    
+    @staticmethod
+    async def _answer_question(db: AsyncSession, request: QuestionRequest, timer: StageTimer) -> QuestionResponse:
         start_time = time.time()
         
         # Validate document exists and is processed
-        document = DocumentService.get_document(db, request.document_id)
-        if not document:
-            raise HTTPException(status_code=404, detail="Document not found")
-        
-        if not document.processed:
-            raise HTTPException(status_code=400, detail="Document is not yet processed")
+        with timer.stage("validate"):
+            await ChatService.validate_document(db, request.document_id)
         
         try:
-            # Retrieve relevant context
-            context_chunks, chunks_used = ChatService._retrieve_relevant_context(
-                request.document_id, 
-                request.question,
-                top_k=5
-            )
-            
-            # Generate answer
-            answer = ChatService._generate_answer(request.question, context_chunks)
+            # Read before retrieval: a document re-indexed while the answer is
+            # generated invalidates it, and the answer is then not cached
+            cache_generation = answer_cache.generation(request.document_id)
+            cached, question_embedding = await ChatService._lookup_cached_answer(request)
+            if cached:
+                answer, chunks_used = cached.answer, cached.context_chunks_used
+                citations = [Citation(**citation) for citation in cached.citations]
+            else:
+                # Retrieve relevant context
+                with timer.stage("retrieval"):
+                    context_chunks, chunks_used = await ChatService._retrieve_relevant_context_async(
+                        request.document_id, 
+                        request.question,
+                        top_k=5,
+                        question_embedding=question_embedding
+                    )
+                
+                citations = ChatService._citations(context_chunks)
+                
+                # Generate answer
+                answer, cacheable = await ChatService._generate_answer(
+                    request.question, [result.text for result in context_chunks]
+                )
+                if cacheable:
+                    ChatService._cache_answer(
+                        request, question_embedding, answer, chunks_used, citations, cache_generation
+                    )
             
             # Calculate response time
             response_time = time.time() - start_time
@@ -113,12 +302,17 @@ Please provide a comprehensive answer based on the context above. If specific in
                 question=request.question,
                 answer=answer,
                 context_chunks_used=chunks_used,
-                response_time_seconds=response_time
+                response_time_seconds=response_time,
+                citations=[citation.model_dump() for citation in citations],
+                stage_timings=timer.rounded()
             )
             
-            db.add(conversation)
-            db.commit()
-            db.refresh(conversation)
+            with timer.stage("db_commit"):
+                db.add(conversation)
+                await db.commit()
+                await db.refresh(conversation)
+            timer.finish()
+            questions_total.labels("ask", str(cached is not None).lower()).inc()
             
             # print(f"Successfully processed question for document {request.document_id}")
             
@@ -128,7 +322,9 @@ Please provide a comprehensive answer based on the context above. If specific in
                 document_id=request.document_id,
                 context_chunks_used=chunks_used,
                 response_time_seconds=response_time,
-                conversation_id=conversation.id
+                conversation_id=conversation.id,
+                cached=cached is not None,
+                citations=citations
             )
             
         except HTTPException:
@@ -138,26 +334,272 @@ Please provide a comprehensive answer based on the context above. If specific in
             raise HTTPException(status_code=500, detail=f"Failed to process question: {str(e)}")
     
     @staticmethod
-    def get_conversation_history(db: Session, document_id: int, limit: int = 50) -> List[Conversation]:
+    async def _resolve_documents(db: AsyncSession, request: MultiDocumentQuestionRequest) -> Dict[int, str]:
+        """
+        Documents a multi-document question searches
+        
+        Returns:
+            dict: document id -> original filename, in the requested order
+        """
+        searchable = or_(
+            Document.processed,
+            and_(Document.processing_error.is_(None), Document.chunk_count > 0)
+        )
+        if request.document_ids == "all":
+            result = await db.execute(
+                select(Document.id, Document.original_filename).where(searchable).order_by(Document.id)
+            )
+            documents = dict(result.all())
+            if not documents:
+                raise HTTPException(status_code=400, detail="No processed documents to search")
+        else:
+            document_ids = list(dict.fromkeys(request.document_ids))
+            if not document_ids:
+                raise HTTPException(status_code=400, detail="No documents given")
+            result = await db.execute(
+                select(Document.id, Document.original_filename, searchable).where(Document.id.in_(document_ids))
+            )
+            rows = {document_id: (filename, ready) for document_id, filename, ready in result.all()}
+            missing = [document_id for document_id in document_ids if document_id not in rows]
+            if missing:
+                raise HTTPException(status_code=404, detail=f"Documents not found: {missing}")
+            pending = [document_id for document_id in document_ids if not rows[document_id][1]]
+            if pending:
+                raise HTTPException(status_code=400, detail=f"Documents not yet processed: {pending}")
+            documents = {document_id: rows[document_id][0] for document_id in document_ids}
+        
+        if len(documents) > settings.multi_document_max_documents:
+            raise HTTPException(
+                status_code=400,
+                detail=f"A question can search at most {settings.multi_document_max_documents} documents"
+            )
+        return documents
+    
+    @staticmethod
+    async def ask_across_documents(
+        db: AsyncSession,
+        request: MultiDocumentQuestionRequest
+    ) -> MultiDocumentQuestionResponse:
+        """
+        Answer a question from several documents, within chat_request_timeout_seconds
+        """
+        timer = StageTimer("ask_multi")
+        try:
+            with timer.active():
+                return await asyncio.wait_for(
+                    ChatService._answer_across_documents(db, request, timer),
+                    timeout=settings.chat_request_timeout_seconds
+                )
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Timed out answering the question")
+    
+    @staticmethod
+    async def _answer_across_documents(
+        db: AsyncSession,
+        request: MultiDocumentQuestionRequest,
+        timer: StageTimer
+    ) -> MultiDocumentQuestionResponse:
+        start_time = time.time()
+        with timer.stage("validate"):
+            documents = await ChatService._resolve_documents(db, request)
+        document_ids = list(documents)
+        
+        try:
+            # The documents are searched in parallel on the fan-out pool; this
+            # thread only embeds the question and merges the results
+            loop = asyncio.get_running_loop()
+            with timer.stage("retrieval"):
+                search_results = await loop.run_in_executor(
+                    _retrieval_executor,
+                    contextvars.copy_context().run,
+                    lambda: search_documents(
+                        document_ids, request.question, top_k=5, all_documents=request.document_ids == "all"
+                    )
+                )
+            context_chunks = ChatService._relevant(search_results)
+            chunks_used = len(context_chunks)
+            citations = ChatService._citations(context_chunks)
+            
+            # Name each chunk's source so the answer can tell the documents apart
+            answer, _ = await ChatService._generate_answer(
+                request.question,
+                [
+                    f"[{documents.get(result.document_id, 'unknown')}"
+                    f"{f', p. {result.page}' if result.page else ''}] {result.text}"
+                    for result in context_chunks
+                ],
+                source="several documents"
+            )
+            
+            response_time = time.time() - start_time
+            
+            # Listed under the most relevant document's history
+            conversation = Conversation(
+                document_id=context_chunks[0].document_id if context_chunks else document_ids[0],
+                document_ids=document_ids,
+                question=request.question,
+                answer=answer,
+                context_chunks_used=chunks_used,
+                response_time_seconds=response_time,
+                citations=[citation.model_dump() for citation in citations],
+                stage_timings=timer.rounded()
+            )
+            
+            with timer.stage("db_commit"):
+                db.add(conversation)
+                await db.commit()
+                await db.refresh(conversation)
+            timer.finish()
+            questions_total.labels("ask_multi", "false").inc()
+            
+            return MultiDocumentQuestionResponse(
+                answer=answer,
+                question=request.question,
+                document_ids=document_ids,
+                context_chunks_used=chunks_used,
+                response_time_seconds=response_time,
+                conversation_id=conversation.id,
+                citations=citations
+            )
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f"Error processing multi-document question: {e}")
+            raise HTTPException(status_code=500, detail=f"Failed to process question: {str(e)}")
+    
+    @staticmethod
+    async def stream_answer(
+        request: QuestionRequest,
+        is_disconnected: Callable[[], Awaitable[bool]]
+    ) -> AsyncIterator[str]:
+        """
+        Answer a question as server-sent events
+        
+        Emits `context`, then `token` events as the model produces text, then
+        `done` with the saved conversation. The document must already have
+        been validated with validate_document(). If the client disconnects,
+        generation stops and nothing is saved.
+        """
+        start_time = time.time()
+        time_to_first_token = None
+        parts: List[str] = []
+        # Timed stages never span a yield, the generator may resume in another context
+        timer = StageTimer("stream")
+        
+        try:
+            with timer.active():
+                cache_generation = answer_cache.generation(request.document_id)
+                cached, question_embedding = await ChatService._lookup_cached_answer(request)
+                if cached:
+                    context_chunks, chunks_used = [], cached.context_chunks_used
+                    citations = [Citation(**citation) for citation in cached.citations]
+                else:
+                    with timer.stage("retrieval"):
+                        context_chunks, chunks_used = await ChatService._retrieve_relevant_context_async(
+                            request.document_id,
+                            request.question,
+                            5,
+                            question_embedding
+                        )
+                    citations = ChatService._citations(context_chunks)
+            yield _sse("context", {
+                "context_chunks_used": chunks_used,
+                "cached": cached is not None,
+                "citations": [citation.model_dump() for citation in citations]
+            })
+            
+            if cached:
+                tokens = _single(cached.answer)
+            elif not context_chunks:
+                tokens = _single(NO_CONTEXT_ANSWER)
+            else:
+                with timer.stage("prompt"):
+                    prompt = ChatService._build_prompt(request.question, [result.text for result in context_chunks])
+                tokens = _first_within(llm_gateway.stream(prompt), settings.llm_timeout_seconds)
+            
+            # Includes the time the client takes to read the tokens
+            generation_start = time.perf_counter()
+            async for text in tokens:
+                if await is_disconnected():
+                    # Stop pulling from the model, which ends the upstream call
+                    await tokens.aclose()
+                    print(f"Client disconnected, cancelled generation for document {request.document_id}")
+                    return
+                if not text:
+                    continue
+                if time_to_first_token is None:
+                    time_to_first_token = time.time() - start_time
+                parts.append(text)
+                yield _sse("token", {"text": text})
+            
+            answer = "".join(parts).strip()
+            if not answer:
+                answer = EMPTY_RESPONSE_ANSWER
+                yield _sse("token", {"text": answer})
+            elif context_chunks:
+                ChatService._cache_answer(
+                    request, question_embedding, answer, chunks_used, citations, cache_generation
+                )
+            timer.add("llm", time.perf_counter() - generation_start)
+            response_time = time.time() - start_time
+            
+            conversation = Conversation(
+                document_id=request.document_id,
+                question=request.question,
+                answer=answer,
+                context_chunks_used=chunks_used,
+                response_time_seconds=response_time,
+                time_to_first_token_seconds=time_to_first_token,
+                citations=[citation.model_dump() for citation in citations],
+                stage_timings=timer.rounded()
+            )
+            
+            # The request-scoped session may already be closed once the body streams
+            with timer.stage("db_commit"):
+                async with get_async_session_factory()() as db:
+                    db.add(conversation)
+                    await db.commit()
+                    await db.refresh(conversation)
+            timer.finish()
+            questions_total.labels("stream", str(cached is not None).lower()).inc()
+            
+            yield _sse("done", {
+                "conversation_id": conversation.id,
+                "context_chunks_used": chunks_used,
+                "response_time_seconds": response_time,
+                "time_to_first_token_seconds": time_to_first_token,
+                "cached": cached is not None
+            })
+            
+        except asyncio.TimeoutError:
+            yield _sse("error", {"detail": "The AI model took too long to respond"})
+        except HTTPException as e:
+            yield _sse("error", {"detail": e.detail})
+        except Exception as e:
+            print(f"Error streaming answer: {e}")
+            yield _sse("error", {"detail": f"Failed to process question: {str(e)}"})
+    
+    @staticmethod
+    async def get_conversation_history(db: AsyncSession, document_id: int, limit: int = 50) -> List[Conversation]:
         """
         Get conversation history for a document
         """
         try:
-            conversations = (
-                db.query(Conversation)
+            result = await db.execute(
+                select(Conversation)
                 .filter(Conversation.document_id == document_id)
                 .order_by(Conversation.created_at.desc())
                 .limit(limit)
-                .all()
             )
             
-            return conversations
+            return list(result.scalars().all())
             
         except Exception as e:
             print(f"Error getting conversation history: {e}")
             raise HTTPException(status_code=500, detail="Failed to get conversation history")
     
     @staticmethod
-    def get_conversation(db: Session, conversation_id: int) -> Optional[Conversation]:
+    async def get_conversation(db: AsyncSession, conversation_id: int) -> Optional[Conversation]:
         """Get single conversation by ID"""
-        return db.query(Conversation).filter(Conversation.id == conversation_id).first()
\ No newline at end of file
+        return await db.get(Conversation, conversation_id)
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""
+Maintenance commands
+
+Run from the backend directory, e.g. `python -m app.cli migrate-global-index`
+"""
+import click
+
+@click.group()
+def cli():
+    """PDF Q&A maintenance commands"""
+
+@cli.command("migrate-global-index")
+@click.option("--delete-old", is_flag=True, help="Remove per-document index files after migrating")
+def migrate_global_index(delete_old: bool):
+    """Fold per-document FAISS indexes into the shared global index"""
+    from .rag.global_index import migrate_per_document_indexes
+
+    migrated = migrate_per_document_indexes(delete_old=delete_old)
+    click.echo(f"✅ Migrated {migrated} documents into the global index")
+    click.echo("Set VECTOR_INDEX_MODE=global to serve searches from it")
+
+@cli.command("convert-chunk-stores")
+@click.option("--keep-pickles", is_flag=True, help="Keep the pickled text files after converting")
+def convert_chunk_stores(keep_pickles: bool):
+    """
+    Convert pickled chunk texts from older versions into memory-mapped chunk stores
+
+    Unpickling can execute arbitrary code, only run this on index files you trust.
+    Without it, the re-index job rebuilds these documents from their PDFs.
+    """
+    import glob
+    import os
+    import pickle
+    from .core.config import settings
+    from .rag.chunk_store import ChunkStore
+
+    converted = 0
+    for texts_path in sorted(glob.glob(f"{settings.storage_path}/indexes/*_texts.pkl")):
+        with open(texts_path, 'rb') as f:
+            texts = pickle.load(f)
+
+        ChunkStore.write(texts_path[:-len("_texts.pkl")], texts)
+
+        if not keep_pickles:
+            os.remove(texts_path)
+        converted += 1
+        click.echo(f"Converted {texts_path}")
+
+    click.echo(f"✅ Converted {converted} chunk stores")
+
+@cli.command("ingest")
+@click.argument("source", type=click.Path(exists=True))
+@click.option("--workers", type=int, default=None, help="Extraction processes (default: BULK_INGESTION_WORKERS, one per CPU)")
+def ingest(source: str, workers: int):
+    """
+    Ingest every PDF in a directory or zip archive
+
+    Safe to re-run: PDFs already ingested are skipped, so an interrupted run resumes.
+    """
+    from .core.database import init_db
+    from .documents.bulk import ingest_path
+
+    init_db()
+    report = ingest_path(
+        source,
+        workers=workers,
+        progress=lambda report: click.echo(f"📦 {report.summary()}")
+    )
+    for error in report.errors:
+        click.echo(f"❌ {error}")
+    click.echo(f"✅ {report.summary()}")
+
+@cli.command("reindex")
+@click.option("--dry-run", is_flag=True, help="Only list the stale indexes")
+@click.option("--throttle", type=float, default=1.0, show_default=True,
+              help="Fraction of time the rebuild may be busy (the server's background job uses REINDEX_THROTTLE)")
+@click.option("--stamp", is_flag=True,
+              help="Record the current settings in indexes built before manifests, without rebuilding them")
+def reindex_command(dry_run: bool, throttle: float, stamp: bool):
+    """
+    Rebuild the indexes built with other embedding or chunking settings
+
+    Each index is swapped in atomically. In per-document mode this is safe
+    while the server runs: it drops its cached copy of an index once the
+    index's manifest is replaced. In global mode the server keeps the shared
+    index in memory and would overwrite the rebuild, so use
+    POST /api/documents/reindex instead, or stop the server first.
+    Use --stamp only for indexes you know match the current settings.
+    """
+    from .core.database import init_db
+    from .documents.reindex import stamp_manifests, reindex
+
+    init_db()
+    if stamp:
+        click.echo(f"✅ Stamped {stamp_manifests()} index manifests")
+        return
+    report = reindex(throttle=throttle, dry_run=dry_run)
+    for error in report.errors:
+        click.echo(f"❌ {error}")
+    click.echo(f"{'🔎' if dry_run else '✅'} {report.summary()}")
+
+if __name__ == "__main__":
+    cli()
\ No newline at end of file
@@ -1,29 +1,111 @@
 import os
 from pathlib import Path
+from pydantic import AliasChoices, Field
 from pydantic_settings import BaseSettings
 from typing import List
 
 class Settings(BaseSettings):
     # Database
     database_url: str = "sqlite:///./storage/app.db"
+    async_database_url: str = ""  # defaults to database_url with an async driver (aiosqlite/asyncpg)
     
     # Google Gemini
     gemini_api_key: str
     
+    # LLM gateway
+    llm_backend: str = "gemini"  # gemini, or stub for offline load tests
+    llm_model: str = Field("gemini-2.0-flash-001", validation_alias=AliasChoices("llm_model", "model_name"))  # LLM_MODEL or MODEL_NAME
+    llm_max_concurrency: int = 16  # in-flight calls sharing the client
+    llm_requests_per_minute: int = 0  # 0 = unlimited
+    llm_tokens_per_minute: int = 0  # prompt + output tokens, 0 = unlimited
+    llm_max_retries: int = 3  # on rate-limit errors
+    llm_retry_base_delay_seconds: float = 1.0  # doubled per attempt, with jitter
+    llm_stub_latency_ms: float = 200.0  # stub backend only
+    
     # File Upload
     upload_max_size: int = 10485760  # 10MB
+    upload_chunk_size: int = 1048576  # bytes read, hashed and written per step while saving an upload
     upload_allowed_extensions: List[str] = ["pdf"]
     storage_path: str = "./storage"
-    
+
+    # Ingestion
+    ingestion_workers: int = 2  # documents processed concurrently
+    ingestion_max_pending: int = 100  # queued jobs before uploads are rejected
+    pdf_extraction_workers: int = 0  # processes extracting page ranges, 0 = one per CPU
+    pdf_pages_per_task: int = 50  # pages per extraction task
+    pdf_parallel_min_pages: int = 100  # smaller PDFs are extracted in-process
+    bulk_ingestion_workers: int = 0  # processes extracting and chunking bulk-ingested PDFs, 0 = one per CPU
+    bulk_embedding_batch_chunks: int = 2048  # chunks from several documents embedded per model call
+    bulk_insert_batch: int = 500  # document rows inserted per commit
+    bulk_upload_max_size: int = 2147483648  # 2GB zip archives for POST /api/documents/bulk
+    ingestion_batch_chunks: int = 256  # chunks embedded and indexed per step (bounds memory)
+    text_unicode_form: str = "NFKC"  # NFC, NFKC (also folds ligatures and full-width forms) or empty to skip
+    text_drop_categories: List[str] = ["C"]  # Unicode category prefixes removed from extracted text, e.g. ["C", "So"]
+    chunk_strategy: str = "recursive"  # fixed, sentence or recursive (sentence, then clause, then word boundaries)
+    chunk_size_tokens: int = 128  # capped at the embedding model's max sequence length
+    chunk_overlap_tokens: int = 16  # less than half of chunk_size_tokens
+    chunk_tokenizer: str = "model"  # model (the embedding model's tokenizer) or regex (approximate, no model)
+
     # Application
     environment: str = "development"
     debug: bool = True
+    warmup_on_startup: bool = True  # load the embedding model during startup
+    warmup_in_background: bool = True  # serve requests (and /health) while warming up
+    
+    # Chat
+    llm_timeout_seconds: float = 30.0  # per Gemini call
+    chat_request_timeout_seconds: float = 60.0  # whole question, answered with 504 when exceeded
+    answer_cache_enabled: bool = True  # reuse answers to near-identical questions
+    answer_cache_min_similarity: float = 0.95  # cosine similarity between questions
+    answer_cache_ttl_seconds: float = 86400.0  # 0 = never expire
+    answer_cache_max_entries: int = 1000
     
     # CORS
     allowed_origins: List[str] = ["http://localhost:3000", "http://localhost:5173"]
     
     # AI/ML
     embedding_model: str = "all-MiniLM-L6-v2"
+    embedding_cache_enabled: bool = True
+    embedding_cache_path: str = ""  # defaults to <storage_path>/embedding_cache.db
+    embedding_batch_size: int = 64  # texts per forward pass when embedding chunks
+    embedding_device: str = ""  # e.g. cpu, cuda; empty lets sentence-transformers pick
+    embedding_torch_threads: int = 0  # 0 = torch default (all cores)
+    embedding_precision: str = "fp32"  # fp32, fp16 (GPU) or int8 (dynamic quantization, CPU)
+    embedding_backend: str = "torch"  # torch, onnx (needs sentence-transformers >= 3.2) or hashing (offline benchmarks/tests only)
+    embedding_hashing_dimension: int = 384  # hashing backend only
+    embedding_query_batch_window_ms: float = 2.0  # 0 disables query micro-batching
+    embedding_query_batch_max_size: int = 32
+    
+    # Vector store
+    vector_index_mode: str = "per_document"  # per_document or global (one shared index)
+    vector_metric: str = "cosine"  # cosine (inner product on normalized embeddings) or l2
+    vector_index_type: str = "auto"  # auto, flat, hnsw, ivf_flat, ivf_pq
+    ann_hnsw_min_chunks: int = 5000  # auto: HNSW from this many chunks
+    ann_ivf_pq_min_chunks: int = 250000  # auto: IVF-PQ from this many chunks
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 200
+    hnsw_ef_search: int = 64  # default, can be overridden per query
+    ivf_nlist: int = 0  # 0 = 4 * sqrt(chunks)
+    ivf_nprobe: int = 16  # default, can be overridden per query
+    pq_m: int = 0  # 0 = derived from embedding dimension
+    pq_nbits: int = 8
+    retrieval_min_similarity: float = 0.2  # chunks scoring below this are not sent to the LLM
+    retrieval_min_bm25_ratio: float = 0.5  # ...unless their BM25 score is at least this fraction of the best one
+    retrieval_mode: str = "hybrid"  # dense, sparse (BM25 only) or hybrid (reciprocal rank fusion of both)
+    hybrid_dense_weight: float = 1.0
+    hybrid_sparse_weight: float = 1.0
+    hybrid_rrf_k: int = 60  # reciprocal rank fusion damping constant
+    hybrid_candidates: int = 20  # chunks each retriever contributes before fusion
+    bm25_k1: float = 1.2
+    bm25_b: float = 0.75
+    retrieval_workers: int = 4  # threads for embedding + FAISS search during chat
+    multi_document_search_workers: int = 8  # threads searching documents in parallel for multi-document questions
+    multi_document_dedup_overlap: float = 0.5  # chunks of a document sharing this fraction of the shorter span are duplicates
+    multi_document_max_documents: int = 1000  # documents one multi-document question may search
+    index_cache_max_bytes: int = 536870912  # 512MB of loaded indexes kept in memory
+    reindex_on_startup: bool = True  # rebuild indexes built with other embedding/chunking settings in the background
+    reindex_throttle: float = 0.25  # fraction of wall time the background re-index may be busy (1 = no pauses)
+    reindex_batch_chunks: int = 256  # chunks embedded per re-index step, with a pause after each
     
     class Config:
         env_file = ".env"
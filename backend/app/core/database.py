@@ -1,7 +1,7 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import AsyncGenerator, Generator
 from .config import settings
 
 if settings.database_url.startswith("sqlite"):
@@ -20,6 +20,38 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Async engine for the chat path, created on first use so the async driver is only
+# needed by deployments that serve questions
+_async_engine = None
+_async_session_factory = None
+
+def _async_url(url: str) -> str:
+    """Swap a sync driver for its async counterpart"""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    if url.startswith("postgresql://") or url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    return url
+
+def get_async_session_factory():
+    global _async_engine, _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        _async_engine = create_async_engine(
+            settings.async_database_url or _async_url(settings.database_url),
+            echo=False
+        )
+        _async_session_factory = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_session_factory
+
+async def dispose_async_engine() -> None:
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+async def get_async_db() -> AsyncGenerator:
+    async with get_async_session_factory()() as db:
+        yield db
+
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
     try:
@@ -30,4 +62,25 @@ def get_db() -> Generator[Session, None, None]:
 
 # Initialize database tables
 def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+
+def _add_missing_columns():
+    """
+    create_all() only creates missing tables; add nullable columns introduced
+    since an existing database was created, along with their indexes
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            added = False
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                added = True
+            if added:
+                for index in table.indexes:
+                    index.create(bind=conn, checkfirst=True)
\ No newline at end of file
@@ -0,0 +1,152 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, Optional
+from prometheus_client import Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Wall-time buckets from a cached index lookup up to a large document's ingestion
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+stage_seconds = Histogram(
+    "pdfqa_stage_seconds", "Time spent in one stage of a question or document, excluding nested stages",
+    ["pipeline", "stage"], buckets=STAGE_BUCKETS
+)
+pipeline_seconds = Histogram(
+    "pdfqa_pipeline_seconds", "Time to answer a question or process a document",
+    ["pipeline"], buckets=STAGE_BUCKETS
+)
+questions_total = Counter("pdfqa_questions_total", "Questions answered", ["pipeline", "cached"])
+documents_processed_total = Counter("pdfqa_documents_processed_total", "Documents processed", ["status"])
+pages_extracted_total = Counter("pdfqa_pages_extracted_total", "PDF pages extracted by document processing")
+chunks_indexed_total = Counter("pdfqa_chunks_indexed_total", "Chunks embedded and indexed by document processing")
+
+class _Span:
+    def __init__(self, timer: "StageTimer"):
+        self.timer = timer
+        self.nested = 0.0  # seconds spent in stages opened inside this one
+
+# Innermost open stage of the current request; copied into retrieval threads with contextvars.copy_context()
+_current_span: ContextVar[Optional[_Span]] = ContextVar("current_span", default=None)
+
+class StageTimer:
+    """
+    Wall time per stage of one question or document
+
+    Stages are timed with `with timer.stage(name):` and may nest, also through
+    stage() in code that does not know the timer (retrieval, indexing) while
+    the timer is active(). Each stage records its own time only, excluding
+    stages opened inside it, so the stages add up to the total. A stage
+    entered repeatedly (once per batch) accumulates. finish() records the
+    stages in the Prometheus histograms.
+    """
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        self.timings: Dict[str, float] = {}
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def active(self) -> Iterator["StageTimer"]:
+        """Record stage() calls made inside the block, and in contexts copied from it, in this timer"""
+        token = _current_span.set(_Span(self))
+        try:
+            yield self
+        finally:
+            _current_span.reset(token)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        parent = _current_span.get()
+        span = _Span(self)
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_span.reset(token)
+            self.add(name, elapsed - span.nested)
+            if parent is not None and parent.timer is self:
+                parent.nested += elapsed
+
+    def add(self, name: str, seconds: float) -> None:
+        """Record time measured outside stage(), e.g. across the yields of a stream"""
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def rounded(self) -> Dict[str, float]:
+        """Timings in seconds, rounded to microseconds for storage"""
+        return {name: round(seconds, 6) for name, seconds in self.timings.items()}
+
+    def finish(self) -> Dict[str, float]:
+        """Record the stages and the total in the histograms; returns the rounded timings"""
+        for name, seconds in self.timings.items():
+            stage_seconds.labels(self.pipeline, name).observe(seconds)
+        pipeline_seconds.labels(self.pipeline).observe(time.perf_counter() - self.started)
+        return self.rounded()
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a stage of the request or document being timed, if any"""
+    span = _current_span.get()
+    if span is None:
+        yield
+        return
+    with span.timer.stage(name):
+        yield
+
+# Values of GET /stats also exported on /metrics: section -> {key: (type, help)}
+STATS_METRICS = {
+    "index_cache": {
+        "hits": ("counter", "Vector index cache hits"),
+        "misses": ("counter", "Vector index cache misses"),
+        "evictions": ("counter", "Vector indexes evicted from the cache"),
+        "entries": ("gauge", "Vector indexes cached"),
+        "bytes": ("gauge", "Bytes of cached vector indexes"),
+    },
+    "embedding_cache": {
+        "hits": ("counter", "Chunk embeddings reused from the embedding cache"),
+        "misses": ("counter", "Chunk embeddings missing from the embedding cache"),
+    },
+    "embeddings": {
+        "texts_encoded": ("counter", "Texts encoded by the embedding model"),
+        "encode_seconds": ("counter", "Seconds spent encoding texts"),
+        "query_batches": ("counter", "Micro-batches of question embeddings"),
+    },
+    "answer_cache": {
+        "hits": ("counter", "Questions answered from the answer cache"),
+        "misses": ("counter", "Answer cache misses"),
+        "evictions": ("counter", "Answers evicted from the answer cache"),
+        "entries": ("gauge", "Answers cached"),
+    },
+    "llm": {
+        "calls": ("counter", "LLM calls"),
+        "failures": ("counter", "Failed LLM calls"),
+        "retries": ("counter", "Retried LLM calls"),
+        "rate_limited": ("counter", "LLM calls rejected by the provider's rate limit"),
+        "coalesced": ("counter", "Prompts answered by an identical in-flight call"),
+        "prompt_tokens": ("counter", "Prompt tokens sent to the LLM"),
+        "output_tokens": ("counter", "Tokens generated by the LLM"),
+        "in_flight": ("gauge", "LLM calls in flight"),
+    },
+    "ingestion": {
+        "queued": ("gauge", "Documents waiting for an ingestion worker"),
+        "running": ("gauge", "Documents being ingested"),
+    },
+}
+
+class StatsCollector:
+    """Exports the counters the services already keep (see GET /stats) at scrape time"""
+
+    def __init__(self, source: Callable[[], dict]):
+        self.source = source
+
+    def collect(self):
+        stats = self.source()
+        for section, metrics in STATS_METRICS.items():
+            for key, (kind, description) in metrics.items():
+                value = stats.get(section, {}).get(key)
+                if value is None:
+                    continue
+                family = CounterMetricFamily if kind == "counter" else GaugeMetricFamily
+                yield family(f"pdfqa_{section}_{key}", description, value=float(value))
@@ -0,0 +1,357 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from .models import Document
+from .service import DocumentService
+from .ingestion import ingestion_queue
+from .pdf_extraction import extract_chunks, init_chunk_worker
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.metrics import StageTimer, chunks_indexed_total, documents_processed_total, pages_extracted_total
+from ..rag.chunking import get_chunker
+from ..rag.embeddings import embedding_service
+from ..rag.global_index import global_index
+from ..rag.vector_store import get_vector_store
+from ..chat.answer_cache import answer_cache
+
+# Per-file errors kept in a report, the rest are only counted
+MAX_REPORTED_ERRORS = 100
+# Finished bulk jobs kept in memory for status lookups
+MAX_FINISHED_JOBS = 100
+
+@dataclass
+class BulkIngestionReport:
+    source: str
+    files: int = 0  # PDFs found in the source
+    ingested: int = 0
+    skipped: int = 0  # already ingested (earlier run) or repeated within the source
+    failed: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.ingested / self.seconds if self.seconds else 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.seconds if self.seconds else 0.0
+
+    def fail(self, name: str, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"{name}: {error}")
+
+    def summary(self) -> str:
+        return (
+            f"{self.ingested} ingested, {self.skipped} skipped, {self.failed} failed of {self.files} PDFs, "
+            f"{self.chunks} chunks in {self.seconds:.1f}s "
+            f"({self.docs_per_second:.2f} docs/s, {self.chunks_per_second:.0f} chunks/s)"
+        )
+
+@dataclass
+class _Extracted:
+    document: Document
+    total_pages: int
+    characters: int
+    chunks: List[str]
+    metadata: List[dict]
+
+def iter_pdf_sources(path: str) -> Iterator[Tuple[str, Callable[[], BinaryIO]]]:
+    """
+    PDFs in a directory (recursively) or a zip archive, in name order
+    Yields: (name, function opening the file for binary reading)
+    """
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(".pdf"):
+                    file_path = os.path.join(root, name)
+                    yield os.path.relpath(file_path, path), lambda file_path=file_path: open(file_path, "rb")
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in sorted(archive.infolist(), key=lambda info: info.filename):
+                # Skip macOS resource forks, which also end in .pdf
+                if info.is_dir() or not info.filename.lower().endswith(".pdf") or info.filename.startswith("__MACOSX/"):
+                    continue
+                yield info.filename, lambda info=info: archive.open(info)
+    else:
+        raise ValueError(f"Not a directory or zip archive: {path}")
+
+def _register_documents(db: Session, source: str, report: BulkIngestionReport) -> List[Document]:
+    """
+    Copy new PDFs into storage and insert their rows in batches
+
+    A file whose contents are already stored is skipped, unless an earlier
+    run was interrupted before processing it or failed on it, in which case
+    its document is processed again. This is how a re-run resumes.
+
+    Returns:
+        list: Documents to process, in source order
+    """
+    to_process: List[Document] = []
+    new_documents: List[Document] = []
+    seen_hashes = set()
+
+    def insert() -> None:
+        # One multi-row INSERT and commit per batch instead of one per file
+        db.add_all(new_documents)
+        db.commit()
+        to_process.extend(new_documents)
+        new_documents.clear()
+
+    for name, open_source in iter_pdf_sources(source):
+        report.files += 1
+        try:
+            with open_source() as stream:
+                temp_path, file_size, content_hash = DocumentService.save_stream(stream)
+        except HTTPException as e:
+            report.fail(name, e.detail)
+            continue
+        except Exception as e:
+            report.fail(name, str(e))
+            continue
+
+        existing = None
+        if content_hash not in seen_hashes:
+            # Failed documents are retried on their existing row rather than duplicated
+            existing = (
+                db.query(Document)
+                .filter(Document.content_hash == content_hash)
+                .order_by(Document.processing_error.isnot(None), Document.id)
+                .first()
+            )
+        if content_hash in seen_hashes or existing:
+            os.remove(temp_path)
+            # A document with an active upload job is left to the ingestion queue
+            if existing and not existing.processed and not ingestion_queue.is_ingesting(existing.id):
+                to_process.append(existing)
+            else:
+                report.skipped += 1
+            seen_hashes.add(content_hash)
+            continue
+        seen_hashes.add(content_hash)
+
+        file_path = DocumentService.move_to_uploads(temp_path, name)
+        new_documents.append(Document(
+            filename=os.path.basename(file_path),
+            original_filename=os.path.basename(name),
+            file_path=file_path,
+            file_size=file_size,
+            content_hash=content_hash
+        ))
+        if len(new_documents) >= settings.bulk_insert_batch:
+            insert()
+    if new_documents:
+        insert()
+    return to_process
+
+def _mark_failed(document: Document, error: str, report: BulkIngestionReport) -> None:
+    document.processed = False
+    document.processing_error = error
+    document.chunk_count = 0
+    report.fail(document.original_filename, error)
+    documents_processed_total.labels("failed").inc()
+
+def _index_batch(db: Session, batch: List[_Extracted], report: BulkIngestionReport) -> None:
+    """Embed the chunks of several documents in one call, then index each document"""
+    timer = StageTimer("bulk_batch")
+    texts = [chunk for extracted in batch for chunk in extracted.chunks]
+    with timer.stage("embedding"):
+        embeddings = embedding_service.create_embeddings(texts)
+    global_mode = settings.vector_index_mode == "global"
+
+    offset = 0
+    for extracted in batch:
+        document = extracted.document
+        count = len(extracted.chunks)
+        try:
+            vector_store = get_vector_store(document.id)
+            with timer.stage("indexing"):
+                if global_mode:
+                    # The shared index is written once per batch below
+                    vector_store.create_index(
+                        extracted.chunks, extracted.metadata, embeddings=embeddings[offset:offset + count], persist=False
+                    )
+                else:
+                    vector_store.create_index(extracted.chunks, extracted.metadata, embeddings=embeddings[offset:offset + count])
+            answer_cache.invalidate_document(document.id)
+
+            document.processed = True
+            document.processing_error = None
+            document.chunk_count = count
+            document.total_pages = extracted.total_pages
+            document.total_characters = extracted.characters
+            document.processed_date = datetime.utcnow()
+            report.ingested += 1
+            report.chunks += count
+            documents_processed_total.labels("processed").inc()
+            pages_extracted_total.inc(extracted.total_pages)
+            chunks_indexed_total.inc(count)
+        except Exception as e:
+            _mark_failed(document, str(e), report)
+            get_vector_store(document.id).delete()
+        offset += count
+
+    if global_mode:
+        with timer.stage("indexing"):
+            global_index.save()
+    with timer.stage("db_commit"):
+        db.commit()
+    timer.finish()
+
+def ingest_path(
+    source: str,
+    report: Optional[BulkIngestionReport] = None,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[BulkIngestionReport], None]] = None
+) -> BulkIngestionReport:
+    """
+    Ingest every PDF in a directory or zip archive
+
+    Files are copied into storage and their rows bulk-inserted. A process
+    pool then extracts and chunks whole documents, while this process embeds
+    the chunks of several documents per model call
+    (bulk_embedding_batch_chunks) and indexes them. Re-running on the same
+    source skips documents that are already processed, so an interrupted
+    run resumes where it stopped.
+    Args:
+        source: Directory or zip archive
+        report: Report to fill in place (lets another thread watch progress)
+        workers: Extraction processes, bulk_ingestion_workers by default
+        progress: Called with the report after each indexed batch
+    Returns: The report, with docs/sec and chunks/sec
+    """
+    report = report or BulkIngestionReport(source=source)
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        documents = _register_documents(db, source, report)
+        report.seconds = time.perf_counter() - start
+        if not documents:
+            return report
+
+        # Built here, which loads the embedding model before the workers start
+        chunker = get_chunker()
+        workers = workers or settings.bulk_ingestion_workers or os.cpu_count() or 1
+        remaining = iter(documents)
+        pending: Dict = {}
+        batch: List[_Extracted] = []
+        batch_chunks = 0
+
+        # spawn: forking a process that already runs torch/FAISS threads can deadlock
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_chunk_worker,
+            initargs=(chunker,)
+        ) as executor:
+            def submit() -> None:
+                # Two documents per worker in flight keeps the pool busy while this process embeds
+                while len(pending) < workers * 2:
+                    document = next(remaining, None)
+                    if document is None:
+                        return
+                    pending[executor.submit(extract_chunks, document.file_path)] = document
+
+            submit()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    document = pending.pop(future)
+                    try:
+                        total_pages, characters, chunks, metadata = future.result()
+                    except Exception as e:
+                        _mark_failed(document, f"Failed to extract text from PDF: {e}", report)
+                        continue
+                    if not chunks:
+                        _mark_failed(document, "No text content found in PDF", report)
+                        continue
+                    batch.append(_Extracted(document, total_pages, characters, chunks, metadata))
+                    batch_chunks += len(chunks)
+                submit()
+
+                if batch and (batch_chunks >= settings.bulk_embedding_batch_chunks or not pending):
+                    _index_batch(db, batch, report)
+                    batch, batch_chunks = [], 0
+                    report.seconds = time.perf_counter() - start
+                    if progress:
+                        progress(report)
+        db.commit()  # failures after the last batch
+    finally:
+        db.close()
+        report.seconds = time.perf_counter() - start
+    return report
+
+@dataclass
+class BulkIngestionJob:
+    report: BulkIngestionReport
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"  # queued, running, completed, failed
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+class BulkIngestionJobs:
+    """
+    Runs uploaded archives through ingest_path on a background thread
+
+    One bulk job runs at a time; it already uses every core.
+    """
+
+    def __init__(self):
+        self._jobs: "OrderedDict[str, BulkIngestionJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, archive_path: str, name: str) -> BulkIngestionJob:
+        """
+        Ingest a saved archive in the background, deleting it when done
+        Args:
+            archive_path: Zip archive in storage/temp
+            name: Name reported for the source
+        """
+        with self._lock:
+            if any(not job.finished_at for job in self._jobs.values()):
+                os.remove(archive_path)
+                raise HTTPException(status_code=409, detail="A bulk ingestion is already running")
+            job = BulkIngestionJob(report=BulkIngestionReport(source=name))
+            self._jobs[job.job_id] = job
+            finished = [job_id for job_id, other in self._jobs.items() if other.finished_at]
+            for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+                del self._jobs[job_id]
+        threading.Thread(target=self._run, args=(job, archive_path), name="bulk-ingestion", daemon=True).start()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[BulkIngestionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: BulkIngestionJob, archive_path: str) -> None:
+        job.status = "running"
+        try:
+            ingest_path(archive_path, report=job.report)
+            job.status = "completed"
+            print(f"✅ Bulk ingestion {job.job_id}: {job.report.summary()}")
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            print(f"❌ Bulk ingestion {job.job_id} failed: {e}")
+        finally:
+            os.remove(archive_path)
+            job.finished_at = time.time()
+
+# Global instance
+bulk_ingestion = BulkIngestionJobs()
@@ -0,0 +1,191 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional, Dict
+from fastapi import HTTPException
+
+from .service import DocumentService
+from ..core.config import settings
+from ..core.database import SessionLocal
+
+# Finished jobs kept in memory for status lookups
+MAX_FINISHED_JOBS = 1000
+
+@dataclass
+class IngestionJob:
+    document_id: int
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"  # queued, running, completed, failed
+    stage: str = "queued"  # queued, extracting, chunking, indexing, completed, failed
+    progress: float = 0.0
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+class IngestionQueue:
+    """
+    Bounded worker pool that runs document processing off the request path.
+
+    Persistent state lives on the Document row (processed / processing_error);
+    jobs only add per-stage progress for documents handled by this process.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._document_jobs: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the worker pool"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="ingestion"
+                )
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop the worker pool, dropping jobs that have not started yet"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            # Unstarted documents stay unprocessed and are re-queued on next startup
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def submit(self, document_id: int) -> IngestionJob:
+        """
+        Queue a document for processing
+
+        Returns:
+            IngestionJob: The queued job (or the already active job for this document)
+        """
+        with self._lock:
+            if self._executor is None:
+                raise HTTPException(status_code=503, detail="Ingestion queue is not running")
+
+            active_job_id = self._document_jobs.get(document_id)
+            if active_job_id and not self._jobs[active_job_id].finished:
+                return self._jobs[active_job_id]
+
+            if self._pending_count() >= self.max_pending:
+                raise HTTPException(status_code=503, detail="Ingestion queue is full, please retry later")
+
+            job = IngestionJob(document_id=document_id)
+            self._jobs[job.job_id] = job
+            self._document_jobs[document_id] = job.job_id
+            self._prune_finished()
+            self._executor.submit(self._run, job)
+            return job
+
+    def requeue_unprocessed(self) -> int:
+        """
+        Queue documents left unprocessed by a previous run
+
+        Returns:
+            int: Number of documents queued
+        """
+        db = SessionLocal()
+        try:
+            document_ids = [doc.id for doc in DocumentService.get_pending_documents(db)]
+        finally:
+            db.close()
+
+        queued = 0
+        for document_id in document_ids:
+            try:
+                self.submit(document_id)
+                queued += 1
+            except HTTPException as e:
+                print(f"❌ Could not re-queue document {document_id}: {e.detail}")
+                break
+        return queued
+
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        """Get job by ID"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_document_job(self, document_id: int) -> Optional[IngestionJob]:
+        """Get the most recent job for a document"""
+        with self._lock:
+            job_id = self._document_jobs.get(document_id)
+            return self._jobs.get(job_id) if job_id else None
+    
+    def is_ingesting(self, document_id: int) -> bool:
+        """Whether a job for the document is queued or running (finished jobs stay listed for status lookups)"""
+        job = self.get_document_job(document_id)
+        return job is not None and not job.finished
+
+    def stats(self) -> dict:
+        """Queue depth and worker usage"""
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.status == "running")
+            return {
+                "workers": self.max_workers,
+                "running": running,
+                "queued": self._pending_count() - running,
+                "max_pending": self.max_pending,
+            }
+
+    def _pending_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def _prune_finished(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            job = self._jobs.pop(job_id)
+            if self._document_jobs.get(job.document_id) == job_id:
+                del self._document_jobs[job.document_id]
+
+    def _update(self, job: IngestionJob, stage: str, fraction: float) -> None:
+        with self._lock:
+            job.stage = stage
+            job.progress = fraction
+
+    def _run(self, job: IngestionJob) -> None:
+        """Worker entry point: each job gets its own database session"""
+        with self._lock:
+            job.status = "running"
+            job.started_at = time.time()
+
+        db = SessionLocal()
+        try:
+            document = DocumentService.get_document(db, job.document_id)
+            if not document:
+                raise ValueError(f"Document {job.document_id} no longer exists")
+
+            success = DocumentService.process_document(
+                db,
+                document,
+                progress=lambda stage, fraction: self._update(job, stage, fraction)
+            )
+            error = None if success else document.processing_error
+        except Exception as e:
+            print(f"❌ Ingestion job {job.job_id} failed: {e}")
+            error = str(e)
+        finally:
+            db.close()
+
+        with self._lock:
+            job.status = "failed" if error else "completed"
+            job.stage = job.status
+            job.progress = 1.0
+            job.error = error
+            job.finished_at = time.time()
+
+# Global instance
+ingestion_queue = IngestionQueue(
+    max_workers=settings.ingestion_workers,
+    max_pending=settings.ingestion_max_pending
+)
\ No newline at end of file
@@ -10,6 +10,7 @@ class Document(Base):
     original_filename = Column(String(255), nullable=False)
     file_path = Column(String(500), nullable=False)
     file_size = Column(Integer, nullable=False)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the uploaded bytes
     
     # Processing status
     processed = Column(Boolean, default=False, nullable=False)
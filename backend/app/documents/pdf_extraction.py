@@ -0,0 +1,169 @@
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+import fitz  # PyMuPDF
+
+from ..core.config import settings
+
+# Separator between pages in the flattened document text
+PAGE_SEPARATOR = "\n\n"
+
+@dataclass
+class ExtractedText:
+    text: str
+    page_count: int
+    page_offsets: List[int]  # character offset in `text` where each page starts
+
+    def page_for_offset(self, offset: int) -> int:
+        """1-based page number containing a character offset"""
+        low, high = 0, len(self.page_offsets) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.page_offsets[middle] <= offset:
+                low = middle
+            else:
+                high = middle - 1
+        return low + 1
+
+def _extract_range(file_path: str, start: int, end: int) -> List[str]:
+    """Text of pages [start, end), run in a worker process with its own document handle"""
+    with fitz.open(file_path) as doc:
+        return [doc.load_page(page_num).get_text() for page_num in range(start, end)]
+
+# Chunker of a bulk ingestion worker process, set once by init_chunk_worker
+_worker_chunker = None
+
+def init_chunk_worker(chunker) -> None:
+    """Process pool initializer: receive the (pickled) chunker of the parent process"""
+    global _worker_chunker
+    _worker_chunker = chunker
+
+def extract_chunks(file_path: str, chunker=None) -> Tuple[int, int, List[str], List[dict]]:
+    """
+    Extract and chunk a whole document, run in a bulk ingestion worker process
+    Args:
+        file_path: PDF file
+        chunker: Chunker to use instead of the worker's (when called in-process)
+    Returns: (page_count, characters, chunks, per-chunk metadata)
+    """
+    chunker = chunker or _worker_chunker
+    characters = 0
+    chunks, metadata = [], []
+    with fitz.open(file_path) as doc:
+        total_pages = len(doc)
+
+        def pages():
+            nonlocal characters
+            for page_num in range(total_pages):
+                text = doc.load_page(page_num).get_text()
+                characters += len(text)
+                yield page_num + 1, text
+
+        for chunk, meta in chunker.chunk_pages(pages()):
+            chunks.append(chunk)
+            metadata.append(meta)
+    return total_pages, characters, chunks, metadata
+
+def page_count(file_path: str) -> int:
+    """Number of pages in a PDF"""
+    with fitz.open(file_path) as doc:
+        return len(doc)
+
+class PdfExtractor:
+    """
+    Page-level PDF text extraction
+
+    Large documents are split into page ranges that worker processes extract
+    in parallel (PyMuPDF holds the GIL, so threads would not help). Small
+    documents are extracted in-process, where spawning work costs more than
+    it saves.
+    """
+
+    def __init__(self, max_workers: int, pages_per_task: int, parallel_min_pages: int):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_task = max(1, pages_per_task)
+        self.parallel_min_pages = parallel_min_pages
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that already runs torch/FAISS threads can deadlock
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def iter_pages(self, file_path: str) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (page_number, text) in page order, 1-based
+
+        At most two page ranges per worker are extracted ahead of the consumer,
+        so memory stays bounded for very long documents.
+        """
+        total_pages = page_count(file_path)
+        if total_pages < self.parallel_min_pages or self.max_workers == 1:
+            with fitz.open(file_path) as doc:
+                for page_num in range(total_pages):
+                    yield page_num + 1, doc.load_page(page_num).get_text()
+            return
+
+        executor = self._get_executor()
+        ranges = deque(
+            (start, min(start + self.pages_per_task, total_pages))
+            for start in range(0, total_pages, self.pages_per_task)
+        )
+        pending = deque()
+        try:
+            while ranges or pending:
+                while ranges and len(pending) < self.max_workers * 2:
+                    start, end = ranges.popleft()
+                    pending.append((start, executor.submit(_extract_range, file_path, start, end)))
+                start, future = pending.popleft()
+                for i, text in enumerate(future.result()):
+                    yield start + i + 1, text
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    def extract(self, file_path: str) -> ExtractedText:
+        """
+        Extract the whole document as one string
+        Args:
+            file_path: Path to the PDF
+        Returns: ExtractedText with page start offsets into the joined text
+        """
+        pages = [text for _, text in self.iter_pages(file_path)]
+
+        page_offsets = []
+        offset = 0
+        for text in pages:
+            page_offsets.append(offset)
+            offset += len(text) + len(PAGE_SEPARATOR)
+        text = PAGE_SEPARATOR.join(pages)
+
+        # Match the historical strip() of the joined text, shifting offsets accordingly
+        stripped = text.strip()
+        leading = len(text) - len(text.lstrip())
+        page_offsets = [min(max(0, start - leading), len(stripped)) for start in page_offsets]
+        return ExtractedText(text=stripped, page_count=len(pages), page_offsets=page_offsets)
+
+# Global instance
+pdf_extractor = PdfExtractor(
+    max_workers=settings.pdf_extraction_workers,
+    pages_per_task=settings.pdf_pages_per_task,
+    parallel_min_pages=settings.pdf_parallel_min_pages
+)
\ No newline at end of file
@@ -0,0 +1,320 @@
+import glob
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from .models import Document
+from .service import DocumentService
+from .ingestion import ingestion_queue
+from .pdf_extraction import extract_chunks
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..rag.chunking import get_chunker
+from ..rag.embeddings import embedding_service
+from ..rag.global_index import GlobalVectorIndex, global_index
+from ..rag.manifest import (
+    IndexManifest, chunks_digest, current_manifest, document_manifest_path, read_manifest, stale_reason, write_manifest
+)
+from ..rag.vector_store import get_vector_store, legacy_texts_path
+from ..chat.answer_cache import answer_cache
+
+# Per-document errors kept in a report, the rest are only counted
+MAX_REPORTED_ERRORS = 100
+# Finished re-index jobs kept in memory for status lookups
+MAX_FINISHED_JOBS = 100
+
+@dataclass
+class ReindexReport:
+    documents: int = 0  # indexed documents checked
+    stale: int = 0
+    rebuilt: int = 0
+    failed: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+    reasons: Dict[str, int] = field(default_factory=dict)  # stale documents by reason
+    global_index_rebuilt: bool = False
+    errors: List[str] = field(default_factory=list)
+
+    def fail(self, name: str, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"{name}: {error}")
+
+    def summary(self) -> str:
+        reasons = ", ".join(f"{count} {reason}" for reason, count in sorted(self.reasons.items()))
+        return (
+            f"{self.stale} of {self.documents} indexes stale ({reasons or 'none'}), "
+            f"{self.rebuilt} rebuilt, {self.failed} failed, {self.chunks} chunks in {self.seconds:.1f}s"
+        )
+
+class Throttle:
+    """
+    Keeps a background job busy for at most a fraction of wall time
+
+    Each step run as `with throttle:` is followed by a pause proportional to
+    its duration, so serving threads get the CPU (and the embedding model)
+    most of the time.
+    """
+
+    def __init__(self, fraction: float):
+        self.fraction = fraction
+        self._started = 0.0
+
+    def __enter__(self) -> "Throttle":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if 0 < self.fraction < 1:
+            busy = time.perf_counter() - self._started
+            time.sleep(busy * (1 - self.fraction) / self.fraction)
+
+def _embed(texts: List[str], throttle: Throttle) -> np.ndarray:
+    """Embed chunks reindex_batch_chunks at a time, pausing between batches"""
+    batches = []
+    for start in range(0, len(texts), settings.reindex_batch_chunks):
+        with throttle:
+            batches.append(embedding_service.create_embeddings(texts[start:start + settings.reindex_batch_chunks]))
+    return np.vstack(batches)
+
+def _rechunk(document: Document, throttle: Throttle) -> Tuple[List[str], List[dict]]:
+    """Chunks of a document re-extracted from its stored PDF with the current chunker"""
+    if not os.path.exists(document.file_path):
+        raise ValueError("PDF file is missing")
+    with throttle:
+        if document.content_hash and DocumentService.hash_file(document.file_path) != document.content_hash:
+            raise ValueError("PDF file changed since it was uploaded")
+        _, _, texts, metadata = extract_chunks(document.file_path, get_chunker())
+    if not texts:
+        raise ValueError("No text content found in PDF")
+    return texts, metadata
+
+def find_stale(db: Session, report: ReindexReport) -> Tuple[bool, List[Tuple[Document, Optional[IndexManifest], str]]]:
+    """
+    Indexes built with settings other than the current ones
+
+    Processed documents whose only index is a pickle from older versions
+    (which is never unpickled) are stale with reason "legacy".
+    Returns:
+        (whether the global index needs re-embedding, [(document, its manifest, reason)])
+    """
+    current = current_manifest(embedding_service.get_embedding_dimension())
+    global_mode = settings.vector_index_mode == "global"
+    global_stale = False
+    if global_mode and global_index.document_ids():
+        global_stale = stale_reason(global_index.manifest, current, check_chunking=False) is not None
+
+    stale = []
+    documents = db.query(Document).filter(Document.processed == True).order_by(Document.id).all()
+    for document in documents:
+        # Documents being (re-)ingested get current indexes anyway
+        if ingestion_queue.is_ingesting(document.id):
+            continue
+        if get_vector_store(document.id).exists():
+            manifest = read_manifest(document_manifest_path(document.id))
+            # In global mode the vectors are checked once, above, and re-embedded together
+            reason = stale_reason(manifest, current, check_embedding=not global_mode)
+            if reason is None and global_stale:
+                reason = "embedding"
+        elif os.path.exists(legacy_texts_path(document.id)):
+            manifest, reason = None, "legacy"
+        else:
+            continue
+        report.documents += 1
+        if reason:
+            report.stale += 1
+            report.reasons[reason] = report.reasons.get(reason, 0) + 1
+            stale.append((document, manifest, reason))
+    return global_stale, stale
+
+def _rebuild_global_index(throttle: Throttle) -> Set[int]:
+    """
+    Re-embed the stored chunks of every document into a new global index and swap it in
+
+    Documents added or removed meanwhile are caught up before the swap.
+    Returns: The documents re-embedded
+    """
+    rebuilt = GlobalVectorIndex(name=f"global.staged-{uuid.uuid4().hex[:8]}")
+    done: Set[int] = set()
+
+    def copy(document_id: int, throttle: Throttle) -> None:
+        if not global_index.has_document(document_id):
+            rebuilt.remove_document(document_id, persist=False)
+            return
+        texts, metadata = global_index.document_contents(document_id)
+        rebuilt.add_document(document_id, texts, embeddings=_embed(texts, throttle), persist=False, metadata=metadata)
+        done.add(document_id)
+
+    global_index.track_changes()
+    try:
+        for document_id in global_index.document_ids():
+            copy(document_id, throttle)
+        for _ in range(3):
+            changed = global_index.take_changes()
+            if not changed:
+                break
+            for document_id in changed:
+                copy(document_id, throttle)
+
+        def catch_up(changed: Set[int]) -> None:
+            # The last few changes are copied while searches wait, so without pauses
+            for document_id in changed:
+                copy(document_id, Throttle(1))
+
+        global_index.replace_with(rebuilt, catch_up)
+    finally:
+        global_index.stop_tracking()
+        for path in glob.glob(f"{rebuilt.chunks_prefix}.*"):
+            os.remove(path)
+    return done
+
+def reindex(
+    report: Optional[ReindexReport] = None,
+    throttle: Optional[float] = None,
+    dry_run: bool = False
+) -> ReindexReport:
+    """
+    Rebuild every index whose manifest differs from the current settings
+
+    Documents whose chunking settings are unchanged keep their chunks and are
+    only re-embedded; the others are re-chunked from their stored PDF (which
+    must still match its upload hash). Each rebuilt index is swapped in
+    atomically, searches use the old one until then and fall back to BM25
+    while it was built with another embedding model.
+    Args:
+        report: Report to fill in place (lets another thread watch progress)
+        throttle: Fraction of time the job may be busy, reindex_throttle by default
+        dry_run: Only count the stale indexes
+    Returns: The report
+    """
+    report = report or ReindexReport()
+    throttle = Throttle(settings.reindex_throttle if throttle is None else throttle)
+    current = current_manifest(embedding_service.get_embedding_dimension())
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        global_stale, stale = find_stale(db, report)
+        if dry_run or not stale:
+            return report
+
+        reembedded: Set[int] = set()
+        if global_stale:
+            print(f"🔁 Re-embedding the global index with {embedding_service.model_name}")
+            reembedded = _rebuild_global_index(throttle)
+            report.global_index_rebuilt = True
+
+        for document, manifest, reason in stale:
+            rechunk = manifest is None or manifest.chunking_hash != current.chunking_hash
+            if document.id in reembedded and not rechunk:
+                report.rebuilt += 1
+                report.chunks += document.chunk_count
+                continue
+            try:
+                store = get_vector_store(document.id)
+                texts, metadata = _rechunk(document, throttle) if rechunk else store.stored_chunks()
+                embeddings = _embed(texts, throttle)
+                with throttle:
+                    store.create_index(texts, metadata, embeddings=embeddings)
+                answer_cache.invalidate_document(document.id)
+                if reason == "legacy" and os.path.exists(legacy_texts_path(document.id)):
+                    # Left behind in global mode, where the index lives elsewhere
+                    os.remove(legacy_texts_path(document.id))
+                document.chunk_count = len(texts)
+                db.commit()
+                report.rebuilt += 1
+                report.chunks += len(texts)
+            except Exception as e:
+                # The old index keeps serving
+                report.fail(document.original_filename, str(e))
+            report.seconds = time.perf_counter() - start
+    finally:
+        db.close()
+        report.seconds = time.perf_counter() - start
+    return report
+
+def stamp_manifests() -> int:
+    """
+    Write manifests for indexes built before manifests, assuming the current settings
+
+    For deployments that know their indexes match the current settings and
+    want to skip rebuilding them. Indexes of another embedding dimension are
+    left alone.
+    Returns: Number of manifests written
+    """
+    stamped = 0
+    if settings.vector_index_mode == "global" and global_index.document_ids() and global_index.manifest is None:
+        if global_index.dense_compatible():
+            global_index.manifest = current_manifest(embedding_service.get_embedding_dimension())
+            global_index.save()
+            stamped += 1
+
+    db = SessionLocal()
+    try:
+        for document in db.query(Document).filter(Document.processed == True).order_by(Document.id):
+            path = document_manifest_path(document.id)
+            store = get_vector_store(document.id)
+            if read_manifest(path) is not None or not store.exists() or not store.dense_compatible():
+                continue
+            texts, _ = store.stored_chunks()
+            write_manifest(path, current_manifest(
+                embedding_service.get_embedding_dimension(), len(texts), chunks_digest(texts).hexdigest()
+            ))
+            stamped += 1
+    finally:
+        db.close()
+    return stamped
+
+@dataclass
+class ReindexJob:
+    report: ReindexReport
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"  # queued, running, completed, failed
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+class ReindexJobs:
+    """Runs reindex() on a background thread, one job at a time"""
+
+    def __init__(self):
+        self._jobs: "OrderedDict[str, ReindexJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self) -> ReindexJob:
+        with self._lock:
+            if any(not job.finished_at for job in self._jobs.values()):
+                raise HTTPException(status_code=409, detail="A re-index is already running")
+            job = ReindexJob(report=ReindexReport())
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > MAX_FINISHED_JOBS + 1:
+                self._jobs.popitem(last=False)
+        threading.Thread(target=self._run, args=(job,), name="reindex", daemon=True).start()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[ReindexJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: ReindexJob) -> None:
+        job.status = "running"
+        try:
+            reindex(report=job.report)
+            job.status = "completed"
+            if job.report.stale:
+                print(f"✅ Re-index {job.job_id}: {job.report.summary()}")
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            print(f"❌ Re-index {job.job_id} failed: {e}")
+        finally:
+            job.finished_at = time.time()
+
+# Global instance
+reindex_jobs = ReindexJobs()
@@ -1,9 +1,18 @@
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List
 
 from .service import DocumentService
-from .schemas import DocumentResponse, DocumentListResponse, UploadResponse
+from .ingestion import ingestion_queue
+from .bulk import bulk_ingestion
+from .reindex import ReindexReport, find_stale, reindex_jobs
+from .schemas import (
+    DocumentResponse, DocumentListResponse, UploadResponse,
+    IngestionJobResponse, DocumentStatusResponse, BulkIngestionJobResponse,
+    ReindexJobResponse, ReindexReportResponse
+)
+from ..core.config import settings
 from ..core.database import get_db
 
 router = APIRouter()
@@ -14,21 +23,34 @@ async def upload_document(
     db: Session = Depends(get_db)
 ):
     """
-    Upload a PDF document
+    Upload a PDF document and queue it for processing
     """
     try:
         # Create document record and save file
-        document = DocumentService.create_document(db, file)
+        document, duplicate = await run_in_threadpool(DocumentService.create_document, db, file)
         
-        # Process document in background (for now, process immediately)
-        processing_success = DocumentService.process_document(db, document)
+        if duplicate and document.processed:
+            return UploadResponse(
+                document_id=document.id,
+                message="Document was already uploaded and processed",
+                filename=document.original_filename,
+                file_size=document.file_size,
+                processing_started=False,
+                duplicate=True
+            )
+        
+        # Extraction, chunking and indexing run on the ingestion workers
+        # (a pending duplicate gets its existing job back)
+        job = ingestion_queue.submit(document.id)
         
         return UploadResponse(
             document_id=document.id,
-            message="Document uploaded and processed successfully" if processing_success else "Document uploaded but processing failed",
+            message="Document uploaded and queued for processing",
             filename=document.original_filename,
             file_size=document.file_size,
-            processing_started=True
+            processing_started=True,
+            job_id=job.job_id,
+            duplicate=duplicate
         )
         
     except HTTPException:
@@ -36,6 +58,104 @@ async def upload_document(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+@router.post("/bulk", response_model=BulkIngestionJobResponse)
+async def bulk_upload(file: UploadFile = File(...)):
+    """
+    Upload a zip archive of PDFs and ingest them in the background
+    """
+    if not file.filename.lower().endswith('.zip'):
+        raise HTTPException(status_code=400, detail="Only zip archives are allowed")
+    
+    archive_path, _, _ = await run_in_threadpool(
+        DocumentService.save_stream, file.file, settings.bulk_upload_max_size, b"PK\x03\x04", "zip archive"
+    )
+    job = bulk_ingestion.start(archive_path, file.filename)
+    return BulkIngestionJobResponse.model_validate(job)
+
+@router.get("/bulk/{job_id}", response_model=BulkIngestionJobResponse)
+async def get_bulk_ingestion_job(job_id: str):
+    """
+    Get bulk ingestion progress, with docs/sec and chunks/sec so far
+    """
+    job = bulk_ingestion.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return BulkIngestionJobResponse.model_validate(job)
+
+@router.get("/reindex", response_model=ReindexReportResponse)
+async def get_stale_indexes(db: Session = Depends(get_db)):
+    """
+    Count the indexes built with other embedding or chunking settings, without rebuilding them
+    """
+    report = ReindexReport()
+    await run_in_threadpool(find_stale, db, report)
+    return ReindexReportResponse.model_validate(report)
+
+@router.post("/reindex", response_model=ReindexJobResponse)
+async def start_reindex():
+    """
+    Rebuild stale indexes in the background; the old ones keep serving until each swap
+    """
+    job = reindex_jobs.start()
+    return ReindexJobResponse.model_validate(job)
+
+@router.get("/reindex/{job_id}", response_model=ReindexJobResponse)
+async def get_reindex_job(job_id: str):
+    """
+    Get re-index progress
+    """
+    job = reindex_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return ReindexJobResponse.model_validate(job)
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_ingestion_job(job_id: str):
+    """
+    Get ingestion job progress
+    """
+    job = ingestion_queue.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return IngestionJobResponse.model_validate(job)
+
+@router.get("/{document_id}/status", response_model=DocumentStatusResponse)
+async def get_document_status(
+    document_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Get document processing status and per-stage progress
+    """
+    document = DocumentService.get_document(db, document_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    job = ingestion_queue.get_document_job(document_id)
+    if job and not job.finished:
+        status, stage, progress = job.status, job.stage, job.progress
+    elif document.processed:
+        status, stage, progress = "completed", "completed", 1.0
+    elif document.processing_error:
+        status, stage, progress = "failed", "failed", 1.0
+    else:
+        # Waiting for a worker (or for re-queue on the next startup)
+        status, stage, progress = "queued", "queued", 0.0
+    
+    return DocumentStatusResponse(
+        document_id=document.id,
+        processed=document.processed,
+        processing_error=document.processing_error,
+        chunk_count=document.chunk_count or 0,
+        status=status,
+        stage=stage,
+        progress=progress,
+        job_id=job.job_id if job else None
+    )
+
 @router.get("/", response_model=DocumentListResponse)
 async def get_documents(
     skip: int = 0,
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class DocumentBase(BaseModel):
@@ -9,6 +9,7 @@ class DocumentBase(BaseModel):
 class DocumentCreate(DocumentBase):
     file_path: str
     file_size: int
+    content_hash: Optional[str] = None
 
 class DocumentResponse(DocumentBase):
     id: int
@@ -33,4 +34,81 @@ class UploadResponse(BaseModel):
     message: str
     filename: str
     file_size: int
-    processing_started: bool
\ No newline at end of file
+    processing_started: bool
+    job_id: Optional[str] = None
+    duplicate: bool = False  # same file was already uploaded, its document is returned
+
+class IngestionJobResponse(BaseModel):
+    job_id: str
+    document_id: int
+    status: str
+    stage: str
+    progress: float
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    
+    class Config:
+        from_attributes = True
+
+class BulkIngestionReportResponse(BaseModel):
+    source: str
+    files: int
+    ingested: int
+    skipped: int
+    failed: int
+    chunks: int
+    seconds: float
+    docs_per_second: float
+    chunks_per_second: float
+    errors: List[str] = []
+    
+    class Config:
+        from_attributes = True
+
+class BulkIngestionJobResponse(BaseModel):
+    job_id: str
+    status: str
+    error: Optional[str] = None
+    created_at: float
+    finished_at: Optional[float] = None
+    report: BulkIngestionReportResponse
+    
+    class Config:
+        from_attributes = True
+
+class ReindexReportResponse(BaseModel):
+    documents: int
+    stale: int
+    rebuilt: int
+    failed: int
+    chunks: int
+    seconds: float
+    reasons: Dict[str, int] = {}
+    global_index_rebuilt: bool
+    errors: List[str] = []
+    
+    class Config:
+        from_attributes = True
+
+class ReindexJobResponse(BaseModel):
+    job_id: str
+    status: str
+    error: Optional[str] = None
+    created_at: float
+    finished_at: Optional[float] = None
+    report: ReindexReportResponse
+    
+    class Config:
+        from_attributes = True
+
+class DocumentStatusResponse(BaseModel):
+    document_id: int
+    processed: bool
+    processing_error: Optional[str] = None
+    chunk_count: int
+    status: str
+    stage: str
+    progress: float
+    job_id: Optional[str] = None
\ No newline at end of file
@@ -1,105 +1,279 @@
 import os
 import uuid
+import hashlib
+import tempfile
 from datetime import datetime
-from typing import Optional, List
+from typing import BinaryIO, Optional, List, Callable, Tuple
 from fastapi import UploadFile, HTTPException
 from sqlalchemy.orm import Session
-import fitz  # PyMuPDF
 
 from .models import Document
 from .schemas import DocumentCreate, DocumentResponse
+from .pdf_extraction import pdf_extractor, page_count as pdf_page_count
 from ..core.config import settings
+from ..core.metrics import (
+    StageTimer, chunks_indexed_total, documents_processed_total, pages_extracted_total, stage
+)
 from ..rag.vector_store import get_vector_store
-from ..rag.text_processing import chunk_text
+from ..rag.chunking import get_chunker
+from ..chat.answer_cache import answer_cache
+
+# Bytes at the start of an upload searched for its file type's header
+HEADER_SEARCH_BYTES = 1024
 
 class DocumentService:
     
     @staticmethod
-    def save_uploaded_file(file: UploadFile) -> tuple[str, int]:
+    def save_uploaded_file(file: UploadFile) -> Tuple[str, int, str]:
         """
-        Save uploaded file to storage directory
+        Stream an uploaded file to a temporary file under storage/temp
         
         Returns:
-            tuple: (file_path, file_size)
+            tuple: (temp_path, file_size, content_hash)
+        """
+        return DocumentService.save_stream(file.file)
+    
+    @staticmethod
+    def save_stream(
+        stream: BinaryIO,
+        max_size: Optional[int] = None,
+        header: bytes = b"%PDF-",
+        file_type: str = "PDF"
+    ) -> Tuple[str, int, str]:
         """
-        # Generate unique filename
-        file_extension = os.path.splitext(file.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = f"{settings.storage_path}/uploads/{unique_filename}"
+        Copy a binary stream to a temporary file under storage/temp
+        
+        The stream is copied in upload_chunk_size blocks, so memory use does
+        not grow with the file. While it streams, the size limit is enforced
+        (413), the SHA-256 is computed, and the first bytes are checked for
+        the file type's header (400). The temporary file is removed on any failure.
+        Args:
+            stream: Readable binary file object
+            max_size: Byte limit, upload_max_size by default
+            header: Magic bytes expected within the first 1KB
+            file_type: Name used in the error for a missing header
+        
+        Returns:
+            tuple: (temp_path, file_size, content_hash)
+        """
+        max_size = max_size or settings.upload_max_size
+        fd, temp_path = tempfile.mkstemp(suffix=".upload", dir=f"{settings.storage_path}/temp")
+        digest = hashlib.sha256()
+        file_size = 0
+        start = b""
         
-        # Save file
         try:
-            with open(file_path, "wb") as buffer:
-                content = file.file.read()
-                buffer.write(content)
-                file_size = len(content)
+            with os.fdopen(fd, "wb") as buffer:
+                for block in iter(lambda: stream.read(settings.upload_chunk_size), b""):
+                    file_size += len(block)
+                    if file_size > max_size:
+                        raise HTTPException(
+                            status_code=413,
+                            detail=f"File too large. Max size: {max_size} bytes"
+                        )
+                    if len(start) < HEADER_SEARCH_BYTES:
+                        start += block[:HEADER_SEARCH_BYTES - len(start)]
+                        if len(start) == HEADER_SEARCH_BYTES:
+                            DocumentService._check_header(start, header, file_type)
+                    digest.update(block)
+                    buffer.write(block)
+            
+            if len(start) < HEADER_SEARCH_BYTES:
+                DocumentService._check_header(start, header, file_type)
             
-            # print(f"Saved file: {file_path} ({file_size} bytes)")
-            return file_path, file_size
+            return temp_path, file_size, digest.hexdigest()
             
+        except HTTPException:
+            os.remove(temp_path)
+            raise
         except Exception as e:
+            os.remove(temp_path)
             print(f"Error saving file: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
     
+    @staticmethod
+    def remove_partial_uploads() -> int:
+        """Delete temporary files left by uploads interrupted by a restart"""
+        temp_dir = f"{settings.storage_path}/temp"
+        removed = 0
+        for name in os.listdir(temp_dir):
+            if name.endswith(".upload"):
+                os.remove(os.path.join(temp_dir, name))
+                removed += 1
+        return removed
+    
+    @staticmethod
+    def _check_header(start: bytes, header: bytes, file_type: str) -> None:
+        # PDF readers accept the %PDF- marker anywhere in the first 1KB, after junk such as a BOM
+        if header not in start:
+            raise HTTPException(status_code=400, detail=f"File is not a {file_type}")
+    
+    @staticmethod
+    def move_to_uploads(temp_path: str, original_filename: str) -> str:
+        """
+        Move a saved temporary file into storage/uploads under a unique name
+        
+        Same filesystem, so the rename is atomic: uploads/ only ever holds complete files.
+        
+        Returns:
+            str: The new file path
+        """
+        file_path = f"{settings.storage_path}/uploads/{uuid.uuid4()}{os.path.splitext(original_filename)[1]}"
+        os.replace(temp_path, file_path)
+        return file_path
+    
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """SHA-256 of a file's contents, read in chunks"""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def find_duplicate(db: Session, content_hash: str) -> Optional[Document]:
+        """Find a processed or still pending document with the same contents"""
+        return (
+            db.query(Document)
+            .filter(Document.content_hash == content_hash, Document.processing_error.is_(None))
+            .order_by(Document.id)
+            .first()
+        )
+    
     @staticmethod
     def extract_text_from_pdf(file_path: str) -> tuple[str, int]:
         """
         Extract text from PDF using PyMuPDF
         
+        Large PDFs are extracted in parallel page ranges, see pdf_extraction.
+        
         Returns:
             tuple: (extracted_text, page_count)
         """
         try:
-            doc = fitz.open(file_path)
-            text_content = ""
-            page_count = len(doc)  # Get page count before processing
-            
-            for page_num in range(page_count):
-                page = doc.load_page(page_num)
-                text_content += page.get_text()
-                text_content += "\n\n"  # Add page separator
-            
-            doc.close()
+            extracted = pdf_extractor.extract(file_path)
             
-            # print(f"Extracted text from PDF: {len(text_content)} characters, {page_count} pages")
-            return text_content.strip(), page_count
+            # print(f"Extracted text from PDF: {len(extracted.text)} characters, {extracted.page_count} pages")
+            return extracted.text, extracted.page_count
             
         except Exception as e:
             # print(f"Error extracting text from PDF: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to extract text from PDF: {str(e)}")
     
     @staticmethod
-    def process_document(db: Session, document: Document) -> bool:
+    def process_document(
+        db: Session,
+        document: Document,
+        progress: Optional[Callable[[str, float], None]] = None
+    ) -> bool:
         """
         Process document: extract text, create chunks, build vector index
         
+        Runs as a streaming pipeline (pages -> cleaned text -> chunks ->
+        embedding batches -> index appends), so memory does not grow with the
+        page count and chunks become searchable batch by batch.
+        
+        Args:
+            progress: Optional callback receiving (stage, fraction_complete)
+        
         Returns:
             bool: Success status
         """
+        timer = StageTimer("document")
+        with timer.active():
+            processed = DocumentService._process_document(db, document, progress)
+        timer.finish()
+        documents_processed_total.labels("processed" if processed else "failed").inc()
+        return processed
+    
+    @staticmethod
+    def _process_document(
+        db: Session,
+        document: Document,
+        progress: Optional[Callable[[str, float], None]]
+    ) -> bool:
+        def report(stage_name: str, fraction: float) -> None:
+            if progress:
+                progress(stage_name, fraction)
+        
         try:
-            # Extract text from PDF
-            text_content, page_count = DocumentService.extract_text_from_pdf(document.file_path)
+            report("extracting", 0.0)
+            total_pages = pdf_page_count(document.file_path)
+            pages_seen = 0
+            characters = 0
             
-            if not text_content.strip():
-                raise ValueError("No text content found in PDF")
+            def pages():
+                nonlocal pages_seen, characters
+                page_iterator = pdf_extractor.iter_pages(document.file_path)
+                while True:
+                    with stage("extraction"):
+                        page = next(page_iterator, None)
+                    if page is None:
+                        return
+                    page_number, text = page
+                    pages_seen = page_number
+                    characters += len(text)
+                    pages_extracted_total.inc()
+                    yield page_number, text
             
-            chunks = chunk_text(text_content, chunk_size=500, overlap=50)
+            # Answers cached against the previous index may no longer hold
+            answer_cache.invalidate_document(document.id)
+            vector_store = get_vector_store(document.id)
+            with stage("indexing"):
+                vector_store.begin_index()
+            document.chunk_count = 0
+            document.total_pages = total_pages
+            with stage("db_commit"):
+                db.commit()
             
-            if not chunks:
-                raise ValueError("No text chunks created")
+            texts: List[str] = []
+            metadata: List[dict] = []
             
-            vector_store = get_vector_store(document.id)
-            vector_store.create_index(chunks)
+            def flush() -> None:
+                # Embedding is timed separately, inside append_chunks
+                with stage("indexing"):
+                    vector_store.append_chunks(texts, metadata)
+                document.chunk_count += len(texts)
+                with stage("db_commit"):
+                    db.commit()
+                chunks_indexed_total.inc(len(texts))
+                texts.clear()
+                metadata.clear()
+                report("indexing", 0.05 + 0.9 * pages_seen / max(1, total_pages))
+            
+            # Pulled one chunk at a time so chunking is timed apart from extraction and indexing
+            chunks = get_chunker().chunk_pages(pages())
+            while True:
+                with stage("chunking"):
+                    item = next(chunks, None)
+                if item is None:
+                    break
+                chunk, meta = item
+                texts.append(chunk)
+                metadata.append(meta)
+                if len(texts) >= settings.ingestion_batch_chunks:
+                    flush()
+            if texts:
+                flush()
+            
+            if not document.chunk_count:
+                raise ValueError("No text content found in PDF")
+            
+            report("indexing", 0.95)
+            with stage("finalize"):
+                vector_store.finalize_index()
+            answer_cache.invalidate_document(document.id)
             
             # Update document metadata
             document.processed = True
             document.processing_error = None
-            document.chunk_count = len(chunks)
-            document.total_pages = page_count
-            document.total_characters = len(text_content)
+            document.total_characters = characters
             document.processed_date = datetime.utcnow()
             
-            db.commit()
+            with stage("db_commit"):
+                db.commit()
+            report("completed", 1.0)
             
             # print(f"Successfully processed document {document.id}: {len(chunks)} chunks created")
             return True
@@ -108,32 +282,50 @@ class DocumentService:
             # Update document with error
             document.processed = False
             document.processing_error = str(e)
+            document.chunk_count = 0
             db.commit()
+            get_vector_store(document.id).delete()
+            report("failed", 1.0)
             
             print(f"Error processing document {document.id}: {e}")
             return False
     
     @staticmethod
-    def create_document(db: Session, file: UploadFile) -> Document:
+    def create_document(db: Session, file: UploadFile) -> Tuple[Document, bool]:
         """
         Create new document record and save file
+        
+        Re-uploads of a file that is already stored reuse the existing document
+        (and its index) instead of being processed again.
+        
+        Returns:
+            tuple: (document, is_duplicate)
         """
         # Validate file
         if not file.filename.lower().endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Only PDF files are allowed")
         
+        # Fail fast when the client declared the size; the stream is checked regardless
         if file.size and file.size > settings.upload_max_size:
-            raise HTTPException(status_code=400, detail=f"File too large. Max size: {settings.upload_max_size} bytes")
+            raise HTTPException(status_code=413, detail=f"File too large. Max size: {settings.upload_max_size} bytes")
         
         # Save file
-        file_path, file_size = DocumentService.save_uploaded_file(file)
+        temp_path, file_size, content_hash = DocumentService.save_uploaded_file(file)
+        
+        duplicate = DocumentService.find_duplicate(db, content_hash)
+        if duplicate:
+            os.remove(temp_path)
+            return duplicate, True
+        
+        file_path = DocumentService.move_to_uploads(temp_path, file.filename)
         
         # Create database record
         document_data = DocumentCreate(
             filename=os.path.basename(file_path),
             original_filename=file.filename,
             file_path=file_path,
-            file_size=file_size
+            file_size=file_size,
+            content_hash=content_hash
         )
         
         document = Document(**document_data.dict())
@@ -141,7 +333,7 @@ class DocumentService:
         db.commit()
         db.refresh(document)
         
-        return document
+        return document, False
     
     @staticmethod
     def get_document(db: Session, document_id: int) -> Optional[Document]:
@@ -153,6 +345,16 @@ class DocumentService:
         """Get list of documents"""
         return db.query(Document).offset(skip).limit(limit).all()
     
+    @staticmethod
+    def get_pending_documents(db: Session) -> List[Document]:
+        """Get documents that were uploaded but never finished processing"""
+        return (
+            db.query(Document)
+            .filter(Document.processed == False, Document.processing_error.is_(None))
+            .order_by(Document.id)
+            .all()
+        )
+    
     @staticmethod
     def delete_document(db: Session, document_id: int) -> bool:
         """Delete document and associated files"""
@@ -163,6 +365,7 @@ class DocumentService:
         try:
             vector_store = get_vector_store(document_id)
             vector_store.delete()
+            answer_cache.invalidate_document(document_id)
             
             if os.path.exists(document.file_path):
                 os.remove(document.file_path)
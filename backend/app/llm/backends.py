@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import AsyncIterator
+from ..core.config import settings
+
+class RateLimitError(Exception):
+    """The provider rejected the call for exceeding its quota (HTTP 429)"""
+
+@dataclass
+class LLMResult:
+    text: str
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for budgeting before a call"""
+    return max(1, len(text) // 4)
+
+def _is_rate_limit(error: Exception) -> bool:
+    # google.api_core raises ResourceExhausted (gRPC) or TooManyRequests (REST)
+    return getattr(error, "code", None) == 429 or type(error).__name__ in ("ResourceExhausted", "TooManyRequests")
+
+class GeminiBackend:
+    """
+    Google Gemini through the google-generativeai SDK
+
+    The SDK is imported and the model created once, on first use; every call
+    then shares the SDK's client and its connections.
+    """
+    name = "gemini"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import google.generativeai as genai
+                    genai.configure(api_key=settings.gemini_api_key)
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    async def generate(self, prompt: str) -> LLMResult:
+        try:
+            response = await self._get_model().generate_content_async(prompt)
+        except Exception as e:
+            if _is_rate_limit(e):
+                raise RateLimitError(str(e)) from e
+            raise
+        return LLMResult(
+            text=response.text if response.parts else "",
+            **self._usage(response)
+        )
+
+    async def stream(self, prompt: str) -> AsyncIterator[LLMResult]:
+        """Yield text deltas; token counts are cumulative and arrive with the last chunks"""
+        try:
+            response = await self._get_model().generate_content_async(prompt, stream=True)
+        except Exception as e:
+            if _is_rate_limit(e):
+                raise RateLimitError(str(e)) from e
+            raise
+        async for chunk in response:
+            yield LLMResult(text=chunk.text if chunk.parts else "", **self._usage(chunk))
+
+    @staticmethod
+    def _usage(response) -> dict:
+        usage = getattr(response, "usage_metadata", None)
+        return {
+            "prompt_tokens": getattr(usage, "prompt_token_count", 0) or 0,
+            "output_tokens": getattr(usage, "candidates_token_count", 0) or 0,
+        }
+
+class StubBackend:
+    """
+    Offline backend for load tests: waits a fixed latency and returns a
+    deterministic answer derived from the prompt, without any network calls
+    """
+    name = "stub"
+
+    def __init__(self, latency_seconds: float):
+        self.latency_seconds = latency_seconds
+
+    def _answer(self, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        return f"Stub answer {digest}: the document covers this in the retrieved context."
+
+    async def generate(self, prompt: str) -> LLMResult:
+        await asyncio.sleep(self.latency_seconds)
+        text = self._answer(prompt)
+        return LLMResult(text=text, prompt_tokens=estimate_tokens(prompt), output_tokens=estimate_tokens(text))
+
+    async def stream(self, prompt: str) -> AsyncIterator[LLMResult]:
+        words = self._answer(prompt).split(" ")
+        for i, word in enumerate(words):
+            await asyncio.sleep(self.latency_seconds / len(words))
+            yield LLMResult(text=word if i == 0 else f" {word}")
+        yield LLMResult(text="", prompt_tokens=estimate_tokens(prompt), output_tokens=len(words))
+
+def create_backend(name: str):
+    """Build the backend selected by LLM_BACKEND"""
+    if name == "gemini":
+        return GeminiBackend(settings.llm_model)
+    if name == "stub":
+        return StubBackend(settings.llm_stub_latency_ms / 1000)
+    raise ValueError(f"Unknown LLM backend: {name}")
\ No newline at end of file
@@ -0,0 +1,170 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import AsyncIterator, Dict
+import numpy as np
+from ..core.config import settings
+from .backends import LLMResult, RateLimitError, create_backend, estimate_tokens
+from .rate_limiter import RateLimiter
+
+# Longest single backoff between rate-limited attempts
+MAX_RETRY_DELAY_SECONDS = 30.0
+
+class LLMGateway:
+    """
+    Long-lived entry point for every LLM call
+
+    Holds one backend client for the life of the process, caps concurrent
+    calls, enforces the requests/tokens-per-minute budget, retries rate-limited
+    calls with jittered exponential backoff, shares one call between identical
+    in-flight prompts, and records latency and token usage.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self.limiter = RateLimiter(settings.llm_requests_per_minute, settings.llm_tokens_per_minute)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._semaphores: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.coalesced = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.latencies = deque(maxlen=1000)
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = create_backend(settings.llm_backend)
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend) -> None:
+        self._backend = backend
+
+    async def generate(self, prompt: str) -> LLMResult:
+        """
+        Generate a complete response
+        Args:
+            prompt: Prompt text
+        Returns: LLMResult with the text and token usage
+        Raises: RateLimitError once retries are exhausted, or the backend's error
+        """
+        inflight = self._inflight.get(prompt)
+        if inflight is not None:
+            # Identical prompt already being answered, wait for that call instead
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        task = asyncio.ensure_future(self._generate_with_retries(prompt))
+        self._inflight[prompt] = task
+        task.add_done_callback(lambda done: self._finish_inflight(prompt, done))
+        # Shielded so one caller timing out doesn't cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Stream a response as text deltas
+        
+        Rate-limited calls are retried until the first text arrives; after that
+        errors are raised to the consumer. Closing the iterator stops the call.
+        """
+        estimated = estimate_tokens(prompt)
+        for attempt in range(settings.llm_max_retries + 1):
+            await self.limiter.acquire(estimated)
+            start = time.perf_counter()
+            started = False
+            usage = LLMResult(text="")
+            try:
+                async with self._semaphore():
+                    async for chunk in self.backend.stream(prompt):
+                        usage.prompt_tokens = max(usage.prompt_tokens, chunk.prompt_tokens)
+                        usage.output_tokens = max(usage.output_tokens, chunk.output_tokens)
+                        if chunk.text:
+                            started = True
+                            yield chunk.text
+            except RateLimitError:
+                self.rate_limited += 1
+                if started or attempt == settings.llm_max_retries:
+                    self.failures += 1
+                    raise
+                await self._backoff(attempt)
+                continue
+            except Exception:
+                self.failures += 1
+                raise
+            self._record(start, estimated, usage)
+            return
+
+    def stats(self) -> dict:
+        """Call counters and latency percentiles for monitoring"""
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {
+            "backend": self.backend.name,
+            "model": settings.llm_model,
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "throttled_seconds": self.limiter.throttled_seconds,
+            "latency_p50_seconds": float(np.percentile(latencies, 50)),
+            "latency_p95_seconds": float(np.percentile(latencies, 95)),
+        }
+
+    async def _generate_with_retries(self, prompt: str) -> LLMResult:
+        estimated = estimate_tokens(prompt)
+        for attempt in range(settings.llm_max_retries + 1):
+            await self.limiter.acquire(estimated)
+            start = time.perf_counter()
+            try:
+                async with self._semaphore():
+                    result = await self.backend.generate(prompt)
+            except RateLimitError:
+                self.rate_limited += 1
+                if attempt == settings.llm_max_retries:
+                    self.failures += 1
+                    raise
+                await self._backoff(attempt)
+                continue
+            except Exception:
+                self.failures += 1
+                raise
+            self._record(start, estimated, result)
+            return result
+
+    async def _backoff(self, attempt: int) -> None:
+        """Full-jitter exponential backoff, so rejected callers don't retry in lockstep"""
+        self.retries += 1
+        delay = min(MAX_RETRY_DELAY_SECONDS, settings.llm_retry_base_delay_seconds * 2 ** attempt)
+        await asyncio.sleep(random.uniform(0, delay))
+
+    def _record(self, start: float, estimated_tokens: int, result: LLMResult) -> None:
+        self.calls += 1
+        self.latencies.append(time.perf_counter() - start)
+        self.prompt_tokens += result.prompt_tokens
+        self.output_tokens += result.output_tokens
+        self.limiter.record_usage(estimated_tokens, result.prompt_tokens + result.output_tokens)
+
+    def _finish_inflight(self, prompt: str, task: asyncio.Future) -> None:
+        self._inflight.pop(prompt, None)
+        if not task.cancelled():
+            task.exception()  # mark as retrieved even if every caller gave up
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # asyncio primitives belong to one event loop (tests may run several)
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(settings.llm_max_concurrency)
+            self._semaphores = {loop: semaphore}
+        return semaphore
+
+# Global instance
+llm_gateway = LLMGateway()
\ No newline at end of file
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a per-minute rate
+
+    Meant for a single event loop: state is only touched between awaits, so
+    no lock is needed. A rate of 0 disables the limit.
+    """
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self._updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.per_minute > 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.per_minute / 60)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (0 when available now)"""
+        if not self.enabled:
+            return 0.0
+        self._refill()
+        # Requests larger than the whole bucket only wait for a full bucket
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) * 60 / self.per_minute
+
+    def take(self, amount: float) -> None:
+        """Consume tokens; the balance may go negative to account for usage measured after a call"""
+        if self.enabled:
+            self._refill()
+            self.tokens -= amount
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budgets enforced together"""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.throttled_seconds = 0.0
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        """Wait until one request and the estimated tokens fit in both budgets"""
+        while True:
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+            if wait <= 0:
+                self.requests.take(1)
+                self.tokens.take(estimated_tokens)
+                return
+            self.throttled_seconds += wait
+            await asyncio.sleep(wait)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token budget once the real usage of a call is known"""
+        if actual_tokens:
+            self.tokens.take(actual_tokens - estimated_tokens)
\ No newline at end of file
@@ -1,13 +1,37 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from sqlalchemy import text
 from .core.config import settings
-from .core.database import init_db
+from .core.database import init_db, engine, dispose_async_engine
+from .core.metrics import StatsCollector
+from .documents.ingestion import ingestion_queue
+from .documents.service import DocumentService
+from .documents.pdf_extraction import pdf_extractor
+from .documents.reindex import reindex_jobs
+from .rag.index_cache import index_cache
+from .rag.vector_store import remove_staged_indexes
+from .rag.embedding_cache import embedding_cache
+from .rag.embeddings import embedding_service
+from .chat.answer_cache import answer_cache
+from .llm.gateway import llm_gateway
 from .documents.router import router as documents_router
 from .chat.router import router as chat_router
 
 
+async def warm_up(app: FastAPI):
+    """Load heavy dependencies (embedding model, torch) off the event loop"""
+    try:
+        await asyncio.to_thread(embedding_service.warm_up)
+        print("✅ Embedding model loaded")
+    except Exception as e:
+        app.state.warmup_error = str(e)
+        print(f"❌ Warm-up failed: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
@@ -16,11 +40,35 @@ async def lifespan(app: FastAPI):
     print("✅ Database initialized")
     print(f"🔧 Environment: {settings.environment}")
     print(f"📁 Storage path: {settings.storage_path}")
+    removed = DocumentService.remove_partial_uploads()
+    if removed:
+        print(f"🧹 Removed {removed} partial uploads")
+    removed = remove_staged_indexes()
+    if removed:
+        print(f"🧹 Removed {removed} staged index files of an interrupted rebuild")
+    ingestion_queue.start()
+    requeued = ingestion_queue.requeue_unprocessed()
+    print(f"📥 Ingestion queue started ({settings.ingestion_workers} workers, {requeued} documents re-queued)")
+    if settings.reindex_on_startup:
+        reindex_jobs.start()
+    
+    app.state.warmup_error = None
+    warmup_task = None
+    if settings.warmup_on_startup:
+        if settings.warmup_in_background:
+            warmup_task = asyncio.create_task(warm_up(app))
+        else:
+            await warm_up(app)
     
     yield
     
     # Shutdown
     print("🛑 Shutting down PDF Q&A Application...")
+    if warmup_task:
+        warmup_task.cancel()
+    ingestion_queue.shutdown()
+    pdf_extractor.shutdown()
+    await dispose_async_engine()
 
 
 app = FastAPI(
@@ -48,6 +96,7 @@ async def root():
         "environment": settings.environment
     }
 
+# Liveness: the process is up, no dependency checks
 @app.get("/health")
 async def health_check():
     return {
@@ -56,6 +105,53 @@ async def health_check():
         "storage": "accessible"
     }
 
+# Readiness: dependencies are loaded and reachable
+@app.get("/ready")
+async def readiness_check():
+    def check_database() -> bool:
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            return False
+    
+    database_ok = await asyncio.to_thread(check_database)
+    model_ok = embedding_service.is_loaded or not settings.warmup_on_startup
+    checks = {
+        "database": "connected" if database_ok else "unavailable",
+        "embedding_model": "loaded" if embedding_service.is_loaded else "not_loaded",
+    }
+    if app.state.warmup_error:
+        checks["warmup_error"] = app.state.warmup_error
+    
+    if database_ok and model_ok:
+        return {"status": "ready", **checks}
+    return JSONResponse(status_code=503, content={"status": "not_ready", **checks})
+
+def collect_stats() -> dict:
+    return {
+        "index_cache": index_cache.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "embeddings": embedding_service.stats(),
+        "answer_cache": answer_cache.stats(),
+        "llm": llm_gateway.stats(),
+        "ingestion": ingestion_queue.stats()
+    }
+
+# Plain def endpoints: collection touches locks and SQLite, so it runs on the threadpool, not the event loop
+@app.get("/stats")
+def stats():
+    return collect_stats()
+
+# The counters above, alongside the stage timing histograms of app/core/metrics.py
+REGISTRY.register(StatsCollector(collect_stats))
+
+# Prometheus scrape endpoint
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 app.include_router(documents_router, prefix="/api/documents", tags=["documents"])
 app.include_router(chat_router, prefix="/api/chat", tags=["chat"])
 
@@ -0,0 +1,202 @@
+import math
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from ..core.config import settings
+from .index_cache import index_cache
+
+STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have',
+    'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should',
+    'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we', 'they',
+    'what', 'which', 'who', 'how', 'when', 'where', 'why'
+})
+
+# Words, keeping identifiers such as AB-1234, 4.2.1 or 10/2023 whole
+_TERM = re.compile(r"\w+(?:[-./]\w+)*")
+_TERM_PARTS = re.compile(r"[-./]")
+MAX_TERM_LENGTH = 64
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-cased BM25 terms of a text, without stop words
+
+    Compound identifiers are indexed whole and as their parts, so both
+    "AB-1234" and "1234" match a chunk mentioning AB-1234.
+    """
+    terms = []
+    for match in _TERM.finditer(text.lower()):
+        term = match.group()
+        if len(term) > MAX_TERM_LENGTH:
+            continue
+        if term not in STOP_WORDS:
+            terms.append(term)
+        if not term.isalnum():
+            terms.extend(part for part in _TERM_PARTS.split(term) if part and part not in STOP_WORDS)
+    return terms
+
+class BM25Index:
+    """
+    Inverted index over one document's chunks, scored with Okapi BM25
+
+    Rows are chunk numbers in document order. Chunks can be added while the
+    index is being searched (during ingestion); saved indexes store their
+    postings as CSR arrays in a compressed .npz file.
+    """
+
+    def __init__(self):
+        self.term_ids: Dict[str, int] = {}
+        self.rows: List = []  # per term: chunk rows containing it
+        self.frequencies: List = []  # per term: occurrences in each of those rows
+        self.doc_lengths = array('i')  # terms per chunk
+        self.total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the postings"""
+        postings = sum(len(rows) for rows in self.rows)
+        return postings * 6 + len(self.doc_lengths) * 4 + len(self.term_ids) * 64
+
+    def add(self, texts: Iterable[str]) -> None:
+        """Append chunks, numbered after the existing ones"""
+        with self._lock:
+            for text in texts:
+                row = len(self.doc_lengths)
+                terms = tokenize(text)
+                self.doc_lengths.append(len(terms))
+                self.total_length += len(terms)
+                for term, count in Counter(terms).items():
+                    term_id = self.term_ids.get(term)
+                    if term_id is None:
+                        term_id = self.term_ids[term] = len(self.rows)
+                        self.rows.append(array('i'))
+                        self.frequencies.append(array('H'))
+                    elif not isinstance(self.rows[term_id], array):
+                        # Postings of a loaded index are read-only arrays
+                        self.rows[term_id] = array('i', self.rows[term_id].tolist())
+                        self.frequencies[term_id] = array('H', self.frequencies[term_id].tolist())
+                    self.rows[term_id].append(row)
+                    self.frequencies[term_id].append(min(count, 65535))
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[int, float]]:
+        """
+        Rank chunks against a query
+        Args:
+            query: Search query
+            top_k: Number of results to return
+        Returns: (row, score) pairs best first, only rows matching at least one term
+        """
+        terms = set(tokenize(query))
+        k1, b = settings.bm25_k1, settings.bm25_b
+        with self._lock:
+            count = len(self.doc_lengths)
+            if not count or not terms:
+                return []
+            lengths = np.array(self.doc_lengths, dtype=np.float32)
+            length_norm = k1 * (1 - b + b * lengths / max(1.0, self.total_length / count))
+            scores = np.zeros(count, dtype=np.float32)
+            for term in terms:
+                term_id = self.term_ids.get(term)
+                if term_id is None:
+                    continue
+                rows = np.array(self.rows[term_id], dtype=np.int64)
+                frequencies = np.array(self.frequencies[term_id], dtype=np.float32)
+                idf = math.log(1 + (count - len(rows) + 0.5) / (len(rows) + 0.5))
+                scores[rows] += idf * frequencies * (k1 + 1) / (frequencies + length_norm[rows])
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        matched = matched[np.argsort(-scores[matched], kind='stable')]
+        return [(int(row), float(scores[row])) for row in matched]
+
+    def save(self, path: str) -> None:
+        """Write the index as CSR arrays, replacing any existing file atomically"""
+        with self._lock:
+            terms = list(self.term_ids)
+            offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(self.rows[self.term_ids[term]]) for term in terms])
+            rows = np.concatenate([np.array(self.rows[self.term_ids[term]], dtype=np.int32) for term in terms]) \
+                if terms else np.empty(0, dtype=np.int32)
+            frequencies = np.concatenate([np.array(self.frequencies[self.term_ids[term]], dtype=np.uint16) for term in terms]) \
+                if terms else np.empty(0, dtype=np.uint16)
+            doc_lengths = np.array(self.doc_lengths, dtype=np.int32)
+
+        with open(f"{path}.tmp", 'wb') as f:
+            np.savez_compressed(
+                f,
+                # Terms never contain whitespace, so newline-joined UTF-8 needs no pickling
+                terms=np.frombuffer("\n".join(terms).encode('utf-8'), dtype=np.uint8),
+                offsets=offsets,
+                rows=rows,
+                frequencies=frequencies,
+                doc_lengths=doc_lengths
+            )
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Read an index written by save()"""
+        index = cls()
+        with np.load(path, allow_pickle=False) as data:
+            blob = data["terms"].tobytes().decode('utf-8')
+            terms = blob.split("\n") if blob else []
+            offsets = data["offsets"]
+            rows, frequencies = data["rows"], data["frequencies"]
+            index.doc_lengths = array('i', data["doc_lengths"].tolist())
+        index.term_ids = {term: i for i, term in enumerate(terms)}
+        index.rows = [rows[offsets[i]:offsets[i + 1]] for i in range(len(terms))]
+        index.frequencies = [frequencies[offsets[i]:offsets[i + 1]] for i in range(len(terms))]
+        index.total_length = sum(index.doc_lengths)
+        return index
+
+def bm25_path(document_id: int) -> str:
+    return f"{settings.storage_path}/indexes/doc_{document_id}.bm25.npz"
+
+def _cache_key(document_id: int) -> tuple:
+    # Shares the index cache (and its memory budget) with the FAISS indexes
+    return ("bm25", document_id)
+
+def cache_bm25_index(document_id: int, index: BM25Index) -> None:
+    """Make an index (possibly still being built) visible to searches"""
+    index_cache.put(_cache_key(document_id), index, None, nbytes=index.nbytes)
+
+def save_bm25_index(document_id: int, index: BM25Index) -> None:
+    """Write a document's index next to its FAISS index and cache it"""
+    index.save(bm25_path(document_id))
+    cache_bm25_index(document_id, index)
+
+def load_bm25_index(document_id: int) -> Optional[BM25Index]:
+    """A document's index from the cache or disk, None if it has none"""
+    cached = index_cache.get(_cache_key(document_id))
+    if cached is not None:
+        return cached[0]
+    path = bm25_path(document_id)
+    if not os.path.exists(path):
+        return None
+    try:
+        index = BM25Index.load(path)
+    except Exception as e:
+        print(f"Error loading BM25 index: {e}")
+        return None
+    cache_bm25_index(document_id, index)
+    return index
+
+def uncache_bm25_index(document_id: int) -> None:
+    """Drop a cached index, so the next search reads it from disk"""
+    index_cache.invalidate(_cache_key(document_id))
+
+def delete_bm25_index(document_id: int) -> None:
+    uncache_bm25_index(document_id)
+    path = bm25_path(document_id)
+    if os.path.exists(path):
+        os.remove(path)
\ No newline at end of file
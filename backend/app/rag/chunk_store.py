@@ -0,0 +1,206 @@
+import mmap
+import os
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+# Record table header: magic + format version
+MAGIC = b"TPCHUNK1"
+HEADER_SIZE = 16
+
+# One fixed-size record per chunk, pointing into the UTF-8 blob
+RECORD_DTYPE = np.dtype([
+    ('id', '<i8'),          # caller-defined chunk id (FAISS id)
+    ('offset', '<i8'),      # byte offset of the text in the blob
+    ('length', '<i4'),      # byte length of the text
+    ('page', '<i4'),        # 1-based page number, -1 if unknown
+    ('char_start', '<i8'),  # character span in the document text, -1 if unknown
+    ('char_end', '<i8'),
+])
+
+@dataclass
+class SearchResult:
+    """A retrieved chunk with where it came from in the document"""
+    text: str
+    score: float
+    page: Optional[int] = None  # 1-based
+    char_start: Optional[int] = None  # span in the cleaned document text
+    char_end: Optional[int] = None
+    document_id: Optional[int] = None
+    chunk_id: Optional[int] = None  # id in the index the chunk came from
+    similarity: Optional[float] = None  # dense similarity, set by hybrid retrieval
+    bm25_score: Optional[float] = None  # set by hybrid retrieval when the chunk matched query terms
+
+def _records(texts: List[str], metadata: Optional[List[dict]], ids: Optional[Iterable[int]], base_offset: int):
+    encoded = [text.encode('utf-8') for text in texts]
+    records = np.zeros(len(texts), dtype=RECORD_DTYPE)
+    lengths = np.fromiter((len(data) for data in encoded), dtype='<i8', count=len(encoded))
+    records['length'] = lengths
+    records['offset'] = base_offset + np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(texts) else 0
+    records['id'] = list(ids) if ids is not None else np.arange(len(texts))
+    records['page'] = -1
+    records['char_start'] = -1
+    records['char_end'] = -1
+    if metadata:
+        for key in ('page', 'char_start', 'char_end'):
+            records[key] = [-1 if meta.get(key) is None else meta[key] for meta in metadata]
+    return records, b"".join(encoded)
+
+class ChunkStore:
+    """
+    Memory-mapped chunk texts with per-chunk metadata
+
+    Texts live in one contiguous UTF-8 blob (`.chunks`) and a fixed-size record
+    table (`.chunkidx`) holds each chunk's byte range, id and metadata. Lookups
+    only touch the pages they need, and nothing is unpickled.
+    """
+
+    def __init__(self, path_prefix: str):
+        self.path_prefix = path_prefix
+        self.blob_path = f"{path_prefix}.chunks"
+        self.records_path = f"{path_prefix}.chunkidx"
+        self._blob = None
+        self._blob_file = None
+        self.records = np.empty(0, dtype=RECORD_DTYPE)
+        self._id_order = None
+        self._open()
+
+    @staticmethod
+    def exists(path_prefix: str) -> bool:
+        return os.path.exists(f"{path_prefix}.chunks") and os.path.exists(f"{path_prefix}.chunkidx")
+
+    @staticmethod
+    def write(
+        path_prefix: str,
+        texts: List[str],
+        metadata: Optional[List[dict]] = None,
+        ids: Optional[Iterable[int]] = None
+    ) -> None:
+        """
+        Write a new chunk store, replacing any existing one atomically
+        Args:
+            path_prefix: Path without extension
+            texts: Chunk texts
+            metadata: Optional per-chunk dicts with page, char_start, char_end
+            ids: Optional chunk ids (defaults to row numbers)
+        """
+        records, blob = _records(texts, metadata, ids, 0)
+        blob_path, records_path = f"{path_prefix}.chunks", f"{path_prefix}.chunkidx"
+        with open(f"{blob_path}.tmp", 'wb') as f:
+            f.write(blob)
+        with open(f"{records_path}.tmp", 'wb') as f:
+            f.write(MAGIC.ljust(HEADER_SIZE, b"\0"))
+            f.write(records.tobytes())
+        os.replace(f"{blob_path}.tmp", blob_path)
+        os.replace(f"{records_path}.tmp", records_path)
+
+    @staticmethod
+    def delete(path_prefix: str) -> None:
+        for path in (f"{path_prefix}.chunks", f"{path_prefix}.chunkidx"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def append(self, texts: List[str], metadata: Optional[List[dict]] = None, ids: Optional[Iterable[int]] = None) -> None:
+        """Append chunks to the end of the store"""
+        if not os.path.exists(self.records_path):
+            ChunkStore.write(self.path_prefix, [], None, None)
+        blob_size = os.path.getsize(self.blob_path) if os.path.exists(self.blob_path) else 0
+        records, blob = _records(texts, metadata, ids, blob_size)
+        self.close()
+        with open(self.blob_path, 'ab') as f:
+            f.write(blob)
+        with open(self.records_path, 'ab') as f:
+            f.write(records.tobytes())
+        self._open()
+
+    def remove_ids(self, start_id: int, end_id: int) -> int:
+        """
+        Drop chunks with start_id <= id < end_id by rewriting the store
+        Returns: Number of chunks removed
+        """
+        ids = self.records['id']
+        keep = (ids < start_id) | (ids >= end_id)
+        removed = int(len(ids) - keep.sum())
+        if removed:
+            rows = np.nonzero(keep)[0]
+            texts = [self.get(row) for row in rows]
+            metadata = [self.get_metadata(row) for row in rows]
+            kept_ids = ids[rows].tolist()
+            self.close()
+            ChunkStore.write(self.path_prefix, texts, metadata, kept_ids)
+            self._open()
+        return removed
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def nbytes(self) -> int:
+        """Resident size of the record table (blob pages are loaded on demand)"""
+        return self.records.nbytes
+
+    def get(self, row: int) -> str:
+        """Chunk text at a row"""
+        record = self.records[row]
+        start = int(record['offset'])
+        return self._blob[start:start + int(record['length'])].decode('utf-8')
+
+    def get_metadata(self, row: int) -> Dict[str, Optional[int]]:
+        """Chunk metadata at a row, with unknown values as None"""
+        record = self.records[row]
+        return {
+            key: (int(record[key]) if record[key] >= 0 else None)
+            for key in ('page', 'char_start', 'char_end')
+        }
+
+    def result(self, row: int, score: float, document_id: Optional[int] = None) -> SearchResult:
+        """Chunk text and metadata at a row as a search result"""
+        return SearchResult(
+            text=self.get(row),
+            score=score,
+            document_id=document_id,
+            chunk_id=int(self.records[row]['id']),
+            **self.get_metadata(row)
+        )
+
+    def row_for_id(self, chunk_id: int) -> Optional[int]:
+        """Row holding a chunk id (the most recently appended one wins)"""
+        ids = self.records['id']
+        if self._id_order is None:
+            self._id_order = np.argsort(ids, kind='stable')
+        position = np.searchsorted(ids[self._id_order], chunk_id, side='right') - 1
+        if position < 0 or ids[self._id_order[position]] != chunk_id:
+            return None
+        return int(self._id_order[position])
+
+    def texts(self) -> List[str]:
+        """All chunk texts (loads the whole blob, for maintenance tasks)"""
+        return [self.get(row) for row in range(len(self))]
+
+    def close(self) -> None:
+        if self._blob is not None and not isinstance(self._blob, bytes):
+            self._blob.close()
+        if self._blob_file is not None:
+            self._blob_file.close()
+        self._blob = None
+        self._blob_file = None
+        self.records = np.empty(0, dtype=RECORD_DTYPE)
+        self._id_order = None
+
+    def _open(self) -> None:
+        if not ChunkStore.exists(self.path_prefix):
+            return
+
+        with open(self.records_path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a chunk store: {self.records_path}")
+        count = (os.path.getsize(self.records_path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+        if count:
+            self.records = np.memmap(self.records_path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,))
+
+        if os.path.getsize(self.blob_path):
+            self._blob_file = open(self.blob_path, 'rb')
+            self._blob = mmap.mmap(self._blob_file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            # mmap cannot map empty files
+            self._blob = b""
\ No newline at end of file
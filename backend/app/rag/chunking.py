@@ -0,0 +1,241 @@
+import re
+from bisect import bisect_right
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from ..core.config import settings
+from .text_processing import clean_text
+
+# Bumped whenever the chunker splits the same text differently; indexes built
+# by another version are re-indexed (see app/documents/reindex.py)
+CHUNKER_VERSION = 1
+
+# Strength of the boundary before a token (where a chunk may end), weakest first
+INSIDE_WORD, WORD, CLAUSE, SENTENCE = 0, 1, 2, 3
+
+# Boundaries each strategy prefers to end a chunk at, strongest first; a
+# chunk is cut mid-word only when none of them falls in the second half of
+# its token window
+STRATEGIES = {
+    "fixed": (),
+    "sentence": (SENTENCE, WORD),
+    "recursive": (SENTENCE, CLAUSE, WORD),
+}
+
+_REGEX_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+class RegexTokenizer:
+    """Words and punctuation marks as tokens, approximating word-piece counts without a model"""
+
+    name = "regex"
+
+    def offsets(self, text: str) -> List[Tuple[int, int]]:
+        return [match.span() for match in _REGEX_TOKEN.finditer(text)]
+
+class ModelTokenizer:
+    """The embedding model's own (fast) tokenizer, so chunks are sized as the model sees them"""
+
+    name = "model"
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+
+    def offsets(self, text: str) -> List[Tuple[int, int]]:
+        encoding = self.tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False  # pages are longer than the model's max length, which is fine here
+        )
+        return [(start, end) for start, end in encoding["offset_mapping"] if end > start]
+
+class Chunker:
+    """
+    Token-sized text chunker with a linear-time scan
+
+    Each page is tokenized once. A chunk covers at most `chunk_size` tokens and
+    ends at the strongest boundary the strategy allows within the second half
+    of its window, so consecutive chunks advance by at least
+    chunk_size // 2 - overlap tokens and every token is visited a bounded
+    number of times. The next chunk starts `overlap` tokens back, moved
+    forward to a word start.
+    """
+
+    def __init__(self, tokenizer, chunk_size: int, overlap: int, strategy: str = "recursive"):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown chunk strategy: {strategy}")
+        if chunk_size < 2:
+            raise ValueError("Chunk size must be at least 2 tokens")
+        if not 0 <= overlap < chunk_size // 2:
+            raise ValueError("Chunk overlap must be less than half the chunk size")
+        self.tokenizer = tokenizer
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.strategy = strategy
+        self.boundaries = STRATEGIES[strategy]
+        self.min_tokens = chunk_size // 2
+
+    def chunk(self, text: str) -> List[str]:
+        """
+        Split one text into chunks
+        Args:
+            text: Input text
+        Returns: List of text chunks
+        """
+        return [chunk for chunk, _ in self.chunk_pages([(1, text)])]
+
+    def chunk_pages(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[str, dict]]:
+        """
+        Chunk a document page by page, holding only a small window of text
+
+        Pages are cleaned and joined with a single space, and chunks may span
+        page boundaries.
+        Args:
+            pages: (page_number, raw_text) in page order
+        Yields: (chunk, metadata) with the page the chunk starts on and its
+            char_start/char_end in the cleaned document text
+        """
+        buffer = ""  # cleaned text from the next chunk start onwards
+        buffer_offset = 0  # document offset of buffer[0]
+        document_length = 0
+        starts: List[int] = []  # document offsets of the buffered tokens
+        ends: List[int] = []
+        levels: List[int] = []  # boundary strength before each buffered token
+        page_offsets: List[int] = []  # document offsets where buffered pages start
+        page_numbers: List[int] = []
+        start = 0  # token index of the next chunk
+
+        def emit(first: int, end: int) -> Tuple[str, dict]:
+            char_start, char_end = starts[first], ends[end - 1]
+            page = page_numbers[bisect_right(page_offsets, char_start) - 1]
+            chunk = buffer[char_start - buffer_offset:char_end - buffer_offset]
+            return chunk, {"page": page, "char_start": char_start, "char_end": char_end}
+
+        for page_number, page_text in pages:
+            cleaned = clean_text(page_text)
+            if not cleaned:
+                continue
+            previous = buffer[-1] if buffer else ""
+            if document_length:
+                buffer += " "
+                document_length += 1
+            page_offsets.append(document_length)
+            page_numbers.append(page_number)
+
+            for token_start, token_end in self.tokenizer.offsets(cleaned):
+                starts.append(document_length + token_start)
+                ends.append(document_length + token_end)
+                levels.append(_boundary_level(cleaned, token_start, previous))
+            buffer += cleaned
+            document_length += len(cleaned)
+
+            # Only cut chunks whose window is complete; the rest waits for the next page
+            while start + self.chunk_size < len(starts):
+                end = self._chunk_end(levels, start)
+                yield emit(start, end)
+                start = self._next_start(levels, start, end)
+
+            # Forget tokens, text and pages before the next chunk
+            if start:
+                del starts[:start], ends[:start], levels[:start]
+                start = 0
+            if starts:
+                buffer = buffer[starts[0] - buffer_offset:]
+                buffer_offset = starts[0]
+                keep = max(0, bisect_right(page_offsets, buffer_offset) - 1)
+                del page_offsets[:keep], page_numbers[:keep]
+
+        while start < len(starts):
+            end = self._chunk_end(levels, start)
+            yield emit(start, end)
+            if end == len(starts):
+                break
+            start = self._next_start(levels, start, end)
+
+    def _chunk_end(self, levels: List[int], start: int) -> int:
+        """Token index (exclusive) where the chunk starting at `start` ends"""
+        limit = start + self.chunk_size
+        if limit >= len(levels):
+            return len(levels)
+        if not self.boundaries:
+            return limit
+
+        # Latest boundary of each strength in the second half of the window
+        latest = {}
+        for index in range(limit, start + self.min_tokens - 1, -1):
+            level = levels[index]
+            if level != INSIDE_WORD and level not in latest:
+                latest[level] = index
+                if level == SENTENCE:
+                    break
+        for wanted in self.boundaries:
+            candidates = [index for level, index in latest.items() if level >= wanted]
+            if candidates:
+                return max(candidates)
+        return limit
+
+    def _next_start(self, levels: List[int], start: int, end: int) -> int:
+        """Step back `overlap` tokens from the chunk end, to a word start when there is one"""
+        next_start = max(start + 1, end - self.overlap)
+        if self.boundaries:
+            for index in range(next_start, end):
+                if levels[index] != INSIDE_WORD:
+                    return index
+        return next_start
+
+def _boundary_level(text: str, offset: int, previous: str) -> int:
+    """
+    Boundary strength before the token at `offset` in a cleaned page
+    Args:
+        previous: Last character of the preceding page ("" at the document start)
+    """
+    if offset == 0:
+        last = previous
+    elif text[offset - 1] == " ":
+        last = text[offset - 2] if offset >= 2 else ""
+    else:
+        return INSIDE_WORD
+    if last in ".!?" or not last:
+        return SENTENCE
+    if last in ",;:":
+        return CLAUSE
+    return WORD
+
+def get_chunker(
+    strategy: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+    overlap: Optional[int] = None,
+    tokenizer: Optional[str] = None
+) -> Chunker:
+    """
+    Chunker configured from settings, with optional overrides
+
+    The model tokenizer loads the embedding model; chunk sizes are capped at
+    the tokens the model reads (its max sequence length less the special tokens),
+    and the overlap is lowered with them.
+    """
+    from .embeddings import embedding_service
+
+    strategy = strategy or settings.chunk_strategy
+    chunk_size = chunk_size or settings.chunk_size_tokens
+    overlap = settings.chunk_overlap_tokens if overlap is None else overlap
+    tokenizer = tokenizer or settings.chunk_tokenizer
+
+    if tokenizer == "regex":
+        return Chunker(RegexTokenizer(), chunk_size, overlap, strategy)
+    if tokenizer != "model":
+        raise ValueError(f"Unknown chunk tokenizer: {tokenizer}")
+
+    model = embedding_service.model
+    model_tokenizer = getattr(model, "tokenizer", None)
+    if not getattr(model_tokenizer, "is_fast", False):
+        print(f"⚠️ {settings.embedding_model} has no fast tokenizer, sizing chunks with the regex tokenizer")
+        return Chunker(RegexTokenizer(), chunk_size, overlap, strategy)
+
+    max_seq_length = getattr(model, "max_seq_length", None)
+    if max_seq_length:
+        chunk_size = min(chunk_size, max_seq_length - 2)
+        # A smaller chunk needs a smaller overlap (under half the chunk)
+        overlap = min(overlap, max(0, chunk_size // 2 - 1))
+    return Chunker(ModelTokenizer(model_tokenizer), chunk_size, overlap, strategy)
\ No newline at end of file
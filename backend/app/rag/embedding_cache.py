@@ -0,0 +1,108 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import numpy as np
+from typing import Dict, List, Optional
+from ..core.config import settings
+
+# SQLite limits the number of bound parameters per statement
+LOOKUP_BATCH_SIZE = 500
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def text_hash(text: str) -> bytes:
+    """SHA-256 of a chunk with whitespace normalized, so re-extracted duplicates match"""
+    normalized = _WHITESPACE_RE.sub(' ', text).strip()
+    return hashlib.sha256(normalized.encode('utf-8')).digest()
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by (model name, chunk hash)
+
+    Vectors are stored as raw float32 bytes in a local SQLite file, so repeated
+    material costs a lookup instead of a model forward pass.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Rows counted once, then kept up to date by this process's writes
+        self._entries: Optional[int] = None
+
+    def get_many(self, model_name: str, hashes: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """
+        Look up cached embeddings
+        Returns: Mapping of hash to embedding for the hashes found
+        """
+        found: Dict[bytes, np.ndarray] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            conn = self._connect()
+            for i in range(0, len(unique), LOOKUP_BATCH_SIZE):
+                batch = unique[i:i + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model_name, *batch]
+                ).fetchall()
+                for key, vector in rows:
+                    found[bytes(key)] = np.frombuffer(vector, dtype='float32')
+            self.hits += sum(1 for h in hashes if h in found)
+            self.misses += sum(1 for h in hashes if h not in found)
+        return found
+
+    def put_many(self, model_name: str, hashes: List[bytes], embeddings: np.ndarray) -> None:
+        """Store embeddings (rows of a float32 array) under their chunk hashes"""
+        embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+        rows = [(model_name, key, embedding.tobytes()) for key, embedding in zip(hashes, embeddings)]
+        with self._lock:
+            conn = self._connect()
+            # A (model, chunk hash) pair always has the same vector, so existing rows are kept
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                rows
+            )
+            conn.commit()
+            if self._entries is not None:
+                self._entries += cursor.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM embeddings")
+            conn.commit()
+            self._entries = 0
+
+    def stats(self) -> dict:
+        """Cache counters for monitoring; entries miss rows written by other processes since the first call"""
+        with self._lock:
+            if self._entries is None:
+                # A full table scan, so only on the first call rather than on every scrape
+                self._entries = self._connect().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "entries": self._entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " text_hash BLOB NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " PRIMARY KEY (model, text_hash))"
+            )
+        return self._conn
+
+# Global instance
+embedding_cache = EmbeddingCache(settings.embedding_cache_path or f"{settings.storage_path}/embedding_cache.db")
\ No newline at end of file
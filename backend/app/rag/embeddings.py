@@ -1,52 +1,329 @@
-from sentence_transformers import SentenceTransformer
-from typing import List
+from concurrent.futures import Future
+from typing import Callable, List, Optional
 import numpy as np
+import queue
+import re
+import threading
+import time
+import zlib
 from ..core.config import settings
+from .embedding_cache import embedding_cache, text_hash
+
+def normalize_embeddings(embeddings: np.ndarray) -> np.ndarray:
+    """
+    Scale embeddings to unit L2 norm in one vectorized pass (in place)
+    Args:
+        embeddings: float32 array of shape (n, dimension)
+    Returns: The normalized array
+    """
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    # Leave all-zero vectors untouched instead of dividing by zero
+    norms[norms == 0] = 1.0
+    embeddings /= norms
+    return embeddings
+
+def as_query_batch(embedding: np.ndarray, normalize: bool = False) -> np.ndarray:
+    """
+    Shape a precomputed query embedding as a (1, dimension) float32 batch
+    Args:
+        embedding: Embedding from create_single_embedding (not modified)
+        normalize: Scale to unit length, for inner-product indexes
+    """
+    batch = np.array(embedding, dtype='float32').reshape(1, -1)
+    return normalize_embeddings(batch) if normalize else batch
+
+_WORD = re.compile(r"\w+")
+
+class HashingEmbedder:
+    """
+    Deterministic feature-hashing embeddings that need no model download
+
+    Lower-cased words and word bigrams are hashed (CRC32) into signed
+    buckets. The vectors capture term overlap, not meaning: this backend
+    (EMBEDDING_BACKEND=hashing) is for offline benchmarks and tests, not for
+    answering questions.
+    """
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = _WORD.findall(text.lower())
+            features = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+            if not features:
+                continue
+            hashes = np.fromiter((zlib.crc32(feature.encode('utf-8')) for feature in features),
+                                 dtype=np.uint32, count=len(features))
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(embeddings[row], hashes % self.dimension, signs)
+        return embeddings
+
+class QueryBatcher:
+    """
+    Collects single-text encodes from concurrent requests into micro-batches
+
+    The first queued text opens a window of `window_ms`; everything that
+    arrives before it closes (up to `max_batch_size`) is encoded in one call.
+    """
+
+    def __init__(self, encode: Callable[[List[str]], np.ndarray], window_ms: float, max_batch_size: int):
+        self.encode = encode
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.batches = 0
+        self.texts = 0
+        self._queue: "queue.Queue[tuple[str, Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, text: str) -> np.ndarray:
+        """Encode one text as part of the next micro-batch, blocking until it is done"""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                embeddings = self.encode([text for text, _ in batch])
+                for (_, future), embedding in zip(batch, embeddings):
+                    future.set_result(embedding)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            self.batches += 1
+            self.texts += len(batch)
 
 class EmbeddingService:
+    """
+    Sentence-transformer embeddings
+
+    The model (and torch) is loaded on first use or by warm_up(), not at
+    import time, so the app can start and answer health checks quickly.
+    """
+    
     def __init__(self):
-        self.model = None
-        self._load_model()
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.texts_encoded = 0
+        self.encode_calls = 0
+        self.encode_seconds = 0.0
+        self.query_batcher = QueryBatcher(
+            self._encode,
+            window_ms=settings.embedding_query_batch_window_ms,
+            max_batch_size=settings.embedding_query_batch_max_size
+        )
+    
+    @property
+    def model(self):
+        """The loaded model, loading it on first access (thread-safe)"""
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    self._load_model()
+        return self._model
+    
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+    
+    @property
+    def model_name(self) -> str:
+        """
+        Identity of the vectors produced, used to key the embedding cache and index manifests
+
+        The backend and precision are part of it (model@backend-precision), so
+        a switch to onnx or int8 neither reuses cached fp32 vectors nor leaves
+        indexes built with them current. The default torch fp32 keeps the bare
+        model name that caches and manifests were written with before.
+        """
+        if settings.embedding_backend == "hashing":
+            return f"hashing-{settings.embedding_hashing_dimension}"
+        if settings.embedding_backend == "torch" and settings.embedding_precision == "fp32":
+            return settings.embedding_model
+        return f"{settings.embedding_model}@{settings.embedding_backend}-{settings.embedding_precision}"
+    
+    def warm_up(self) -> None:
+        """Load the model and run one encode so the first request pays no start-up cost"""
+        self._encode(["warm up"])
     
     def _load_model(self):
-        """Load the sentence transformer model"""
+        """Load the sentence transformer model with the configured backend, threads and precision"""
         try:
+            if settings.embedding_backend == "hashing":
+                print(f"Using {self.model_name} embeddings (offline benchmarks and tests only)")
+                self._model = HashingEmbedder(settings.embedding_hashing_dimension)
+                return
+            
+            from sentence_transformers import SentenceTransformer
+            
             print(f"Loading embedding model: {settings.embedding_model}")
-            self.model = SentenceTransformer(settings.embedding_model)
+            if settings.embedding_torch_threads:
+                import torch
+                torch.set_num_threads(settings.embedding_torch_threads)
+            
+            kwargs = {}
+            if settings.embedding_device:
+                kwargs["device"] = settings.embedding_device
+            if settings.embedding_backend == "onnx":
+                kwargs["backend"] = "onnx"
+            elif settings.embedding_backend != "torch":
+                raise ValueError(f"Unknown embedding backend: {settings.embedding_backend}")
+            
+            try:
+                model = SentenceTransformer(settings.embedding_model, **kwargs)
+            except TypeError as e:
+                if "backend" in kwargs:
+                    raise ValueError("The onnx embedding backend needs sentence-transformers >= 3.2 and optimum[onnxruntime]") from e
+                raise
+            
+            self._model = self._apply_precision(model)
         except Exception as e:
             print(f"Error loading embedding model: {e}")
             raise e
     
-    def create_embeddings(self, texts: List[str]) -> np.ndarray:
+    def _apply_precision(self, model):
+        precision = settings.embedding_precision
+        if precision == "fp32":
+            return model
+        if settings.embedding_backend != "torch":
+            raise ValueError(f"Embedding precision {precision} is only supported with the torch backend")
+        if precision == "fp16":
+            # Half precision pays off on GPUs; most CPUs run fp16 matmuls slower than fp32
+            return model.half()
+        if precision == "int8":
+            # Dynamic quantization of the linear layers, CPU only
+            import torch
+            return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        raise ValueError(f"Unknown embedding precision: {precision}")
+    
+    def create_embeddings(
+        self,
+        texts: List[str],
+        normalize: bool = False,
+        use_cache: Optional[bool] = None
+    ) -> np.ndarray:
         """
         Create embeddings for a list of texts
         Args:
             texts: List of text strings to embed
-        Returns: numpy array of embeddings
+            normalize: Scale each embedding to unit length (for cosine similarity)
+            use_cache: Reuse embeddings of previously seen chunks (defaults to settings.embedding_cache_enabled)
+        Returns: float32 numpy array of embeddings
         """
         if not texts:
-            return np.array([])
+            return np.array([], dtype='float32')
+        
+        if use_cache is None:
+            use_cache = settings.embedding_cache_enabled
         
         try:
-            embeddings = self.model.encode(texts, convert_to_numpy=True)
+            if use_cache:
+                embeddings = self._encode_cached(texts)
+            else:
+                embeddings = self._encode(texts)
+            if normalize:
+                embeddings = normalize_embeddings(embeddings)
             # print(f"Created embeddings for {len(texts)} text chunks")
             return embeddings
         except Exception as e:
             print(f"Error creating embeddings: {e}")
             raise e
     
-    def create_single_embedding(self, text: str) -> np.ndarray:
+    def create_single_embedding(self, text: str, normalize: bool = False) -> np.ndarray:
         """
         Create embedding for a single text
         Args:
             text: Text string to embed            
+            normalize: Scale the embedding to unit length (for cosine similarity)
         Returns: numpy array embedding
         """
-        return self.create_embeddings([text])[0]
+        if settings.embedding_query_batch_window_ms <= 0:
+            # Queries are rarely repeated verbatim, skip the persistent cache
+            return self.create_embeddings([text], normalize=normalize, use_cache=False)[0]
+        
+        # Concurrent chat requests share one model call
+        embedding = np.array(self.query_batcher.submit(text), dtype='float32')
+        if normalize:
+            embedding = normalize_embeddings(embedding.reshape(1, -1))[0]
+        return embedding
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        start = time.perf_counter()
+        embeddings = self.model.encode(
+            texts,
+            batch_size=settings.embedding_batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        ).astype('float32', copy=False)
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self.texts_encoded += len(texts)
+            self.encode_calls += 1
+            self.encode_seconds += elapsed
+        return embeddings
+    
+    def _encode_cached(self, texts: List[str]) -> np.ndarray:
+        """Encode only texts missing from the embedding cache"""
+        hashes = [text_hash(text) for text in texts]
+        cached = embedding_cache.get_many(self.model_name, hashes)
+        
+        # Encode each missing chunk once, even if it repeats within the document
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        if missing:
+            new_embeddings = self._encode(list(missing.values()))
+            embedding_cache.put_many(self.model_name, list(missing.keys()), new_embeddings)
+            cached.update(zip(missing.keys(), new_embeddings))
+        
+        return np.stack([cached[key] for key in hashes]).astype('float32')
     
     def get_embedding_dimension(self) -> int:
         """Get the dimension of embeddings from this model"""
         return self.model.get_sentence_embedding_dimension()
+    
+    def stats(self) -> dict:
+        """Encoding throughput counters for sizing nodes"""
+        with self._stats_lock:
+            batcher = self.query_batcher
+            return {
+                "model": self.model_name,
+                "loaded": self.is_loaded,
+                "backend": settings.embedding_backend,
+                "precision": settings.embedding_precision,
+                "texts_encoded": self.texts_encoded,
+                "encode_calls": self.encode_calls,
+                "encode_seconds": self.encode_seconds,
+                "texts_per_second": self.texts_encoded / self.encode_seconds if self.encode_seconds else 0.0,
+                "query_batches": batcher.batches,
+                "avg_query_batch_size": batcher.texts / batcher.batches if batcher.batches else 0.0,
+            }
 
 # Global instance
 embedding_service = EmbeddingService()
\ No newline at end of file
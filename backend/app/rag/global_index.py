@@ -0,0 +1,507 @@
+import faiss
+import numpy as np
+import glob
+import os
+import re
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from ..core.config import settings
+from ..core.metrics import stage
+from .embeddings import embedding_service, normalize_embeddings, as_query_batch
+from .bm25 import BM25Index, cache_bm25_index, delete_bm25_index, load_bm25_index, save_bm25_index
+from .chunk_store import ChunkStore, SearchResult
+from .manifest import (
+    IndexManifest, chunks_digest, current_manifest, delete_manifest, document_manifest_path, manifest_path,
+    read_manifest, write_manifest
+)
+from .index_factory import metric_type, search_parameters, similarity_scores, stores_exact_vectors, uses_inner_product
+
+# Chunk ids pack the document id into the high bits: (document_id << 32) | chunk_no
+CHUNK_ID_BITS = 32
+CHUNK_NO_MASK = (1 << CHUNK_ID_BITS) - 1
+
+def make_chunk_id(document_id: int, chunk_no: int) -> int:
+    """Encode a document id and chunk position into a single FAISS id"""
+    return (document_id << CHUNK_ID_BITS) | chunk_no
+
+def split_chunk_id(chunk_id: int) -> Tuple[int, int]:
+    """Decode a FAISS id into (document_id, chunk_no)"""
+    return chunk_id >> CHUNK_ID_BITS, chunk_id & CHUNK_NO_MASK
+
+class GlobalVectorIndex:
+    """
+    One FAISS index shared by all documents
+
+    Vectors are stored in an IndexIDMap2 so that chunks can be added and removed
+    per document, and searches can be restricted to a set of documents.
+    """
+
+    def __init__(self, name: str = "global"):
+        self.index = None
+        self.chunks: Optional[ChunkStore] = None
+        self.document_chunks: Dict[int, int] = {}
+        self.manifest: Optional[IndexManifest] = None  # None for an index built before manifests
+        # Bumped whenever a document's chunks are replaced, so a reader holding
+        # its BM25 index can tell that the chunk numbers changed underneath it
+        self.document_versions: Dict[int, int] = {}
+        self._changed: Optional[Set[int]] = None  # documents changed while a rebuild is tracking
+        self._lock = threading.RLock()
+
+        # File paths
+        self.index_path = f"{settings.storage_path}/indexes/{name}.index"
+        self.chunks_prefix = f"{settings.storage_path}/indexes/{name}"
+        self.manifest_path = manifest_path(name)
+
+    def add_document(
+        self,
+        document_id: int,
+        texts: List[str],
+        embeddings: Optional[np.ndarray] = None,
+        persist: bool = True,
+        metadata: Optional[List[dict]] = None
+    ) -> None:
+        """
+        Add (or replace) a document's chunks
+        Args:
+            document_id: Document the chunks belong to
+            texts: Chunk texts in document order
+            embeddings: Precomputed embeddings, created from texts when omitted
+            metadata: Optional per-chunk dicts with page, char_start, char_end
+            persist: Write the index to disk (batch callers call save() once at the end)
+        """
+        if not texts:
+            raise ValueError("No texts provided to create index")
+
+        with self._lock:
+            self._ensure_loaded()
+            normalize = uses_inner_product(self.index)
+
+        if embeddings is None:
+            embeddings = embedding_service.create_embeddings(texts, normalize=normalize)
+        elif normalize:
+            # Vectors migrated from L2 indexes are not unit length
+            embeddings = normalize_embeddings(np.array(embeddings, dtype='float32'))
+
+        ids = np.array([make_chunk_id(document_id, i) for i in range(len(texts))], dtype='int64')
+
+        with self._lock:
+            self._ensure_loaded()
+            self._check_dimension(embeddings)
+            self._remove_ids(document_id)
+            self.index.add_with_ids(embeddings.astype('float32'), ids)
+            self.chunks.append(texts, metadata, ids.tolist())
+            self.document_chunks[document_id] = len(texts)
+            self._changed_document(document_id)
+            if persist:
+                self.save()
+
+    def append_chunks(self, document_id: int, texts: List[str], metadata: Optional[List[dict]] = None) -> None:
+        """
+        Append chunks after a document's existing ones, searchable immediately
+        
+        The FAISS file is only written by save(); on restart, chunks appended
+        since are dropped and the document is re-ingested.
+        """
+        if not texts:
+            return
+
+        with self._lock:
+            self._ensure_loaded()
+            normalize = uses_inner_product(self.index)
+
+        with stage("embedding"):
+            embeddings = embedding_service.create_embeddings(texts, normalize=normalize)
+
+        with self._lock:
+            self._ensure_loaded()
+            self._check_dimension(embeddings)
+            first = self.document_chunks.get(document_id, 0)
+            ids = np.array([make_chunk_id(document_id, first + i) for i in range(len(texts))], dtype='int64')
+            self.index.add_with_ids(embeddings.astype('float32'), ids)
+            self.chunks.append(texts, metadata, ids.tolist())
+            self.document_chunks[document_id] = first + len(texts)
+            if self._changed is not None:
+                self._changed.add(document_id)
+
+    def remove_document(self, document_id: int, persist: bool = True) -> None:
+        """Remove all chunks of a document"""
+        with self._lock:
+            self._ensure_loaded()
+            if self._remove_ids(document_id) and persist:
+                self.save()
+
+    def has_document(self, document_id: int) -> bool:
+        """Check if a document has chunks in the index"""
+        with self._lock:
+            self._ensure_loaded()
+            return document_id in self.document_chunks
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        document_ids: Optional[Iterable[int]] = None,
+        query_embedding: Optional[np.ndarray] = None
+    ) -> List[SearchResult]:
+        """
+        Search for similar text chunks
+        Args:
+            query: Search query
+            top_k: Number of results to return
+            document_ids: Restrict the search to these documents (all documents when None)
+            query_embedding: Embedding of the query if the caller already has it
+        Returns: Results best first, with their document_id set
+        """
+        with self._lock:
+            self._ensure_loaded()
+            normalize = uses_inner_product(self.index)
+
+        if query_embedding is None:
+            query_embedding = embedding_service.create_single_embedding(query)
+        query_embedding = as_query_batch(query_embedding, normalize=normalize)
+
+        with self._lock:
+
+            params = None
+            if document_ids is not None:
+                document_ids = [doc_id for doc_id in set(document_ids) if doc_id in self.document_chunks]
+                if not document_ids:
+                    return []
+                candidates = sum(self.document_chunks[doc_id] for doc_id in document_ids)
+                params = search_parameters(self.index, selector=self._selector(document_ids))
+            else:
+                candidates = self.index.ntotal
+
+            k = min(top_k, candidates)
+            if k <= 0:
+                return []
+            distances, ids = self.index.search(query_embedding, k, params=params)
+
+            results = []
+            scores = similarity_scores(self.index, distances[0])
+            for score, chunk_id in zip(scores, ids[0]):
+                if chunk_id < 0:
+                    continue
+                document_id, _ = split_chunk_id(int(chunk_id))
+                row = self.chunks.row_for_id(int(chunk_id))
+                if row is None:
+                    continue
+                results.append(self.chunks.result(row, float(score), document_id))
+            return results
+
+    def chunk_results(
+        self,
+        document_id: int,
+        hits: List[Tuple[int, float]],
+        version: Optional[int] = None
+    ) -> List[SearchResult]:
+        """
+        Search results for chunks of a document found by other means (e.g. BM25)
+        Args:
+            hits: (chunk number, score) pairs
+            version: document_versions entry the hits were numbered against;
+                no results if the document has been re-indexed since
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if version is not None and version != self.document_versions.get(document_id, 0):
+                return []
+            results = []
+            for chunk_no, score in hits:
+                row = self.chunks.row_for_id(make_chunk_id(document_id, chunk_no))
+                if row is not None:
+                    results.append(self.chunks.result(row, score, document_id))
+            return results
+
+    def document_texts(self, document_id: int) -> List[str]:
+        """A document's chunk texts in chunk order"""
+        return self.document_contents(document_id)[0]
+
+    def document_contents(self, document_id: int) -> Tuple[List[str], List[dict]]:
+        """A document's chunk texts and per-chunk metadata in chunk order"""
+        with self._lock:
+            self._ensure_loaded()
+            ids = np.asarray(self.chunks.records['id'])
+            rows = np.flatnonzero((ids >= make_chunk_id(document_id, 0)) & (ids < make_chunk_id(document_id + 1, 0)))
+            rows = rows[np.argsort(ids[rows], kind='stable')]
+            return [self.chunks.get(row) for row in rows], [self.chunks.get_metadata(row) for row in rows]
+
+    def document_ids(self) -> List[int]:
+        """Documents with chunks in the index"""
+        with self._lock:
+            self._ensure_loaded()
+            return sorted(self.document_chunks)
+
+    def load_bm25(self, document_id: int) -> Tuple[Optional[BM25Index], int]:
+        """A document's BM25 index with the document version its rows refer to"""
+        with self._lock:
+            return load_bm25_index(document_id), self.document_versions.get(document_id, 0)
+
+    def dense_compatible(self) -> bool:
+        """Whether query embeddings of the current model can search the index"""
+        with self._lock:
+            self._ensure_loaded()
+            if self.manifest is not None and self.manifest.embedding_model != embedding_service.model_name:
+                return False
+            dimension = self.index.d
+        return dimension == embedding_service.get_embedding_dimension()
+
+    def track_changes(self) -> None:
+        """Start recording the documents added or removed, see take_changes()"""
+        with self._lock:
+            self._changed = set()
+
+    def stop_tracking(self) -> None:
+        with self._lock:
+            self._changed = None
+
+    def take_changes(self) -> Set[int]:
+        """Documents changed since track_changes() or the previous call"""
+        with self._lock:
+            changed, self._changed = self._changed or set(), set()
+            return changed
+
+    def replace_with(self, rebuilt: "GlobalVectorIndex", catch_up: Callable[[Set[int]], None]) -> None:
+        """
+        Swap in an index rebuilt under another name, atomically for searches
+
+        The rebuilt files are moved over this index's and searches continue
+        on the rebuilt vectors.
+        Args:
+            rebuilt: Index rebuilt from this one's documents
+            catch_up: Applies the documents changed since track_changes() to
+                the rebuilt index; called under this index's lock right
+                before the swap, so no change is lost (keep them few)
+        """
+        with self._lock:
+            catch_up(self.take_changes())
+            rebuilt.save()
+            rebuilt.chunks.close()
+            os.replace(rebuilt.index_path, self.index_path)
+            os.replace(f"{rebuilt.chunks_prefix}.chunks", f"{self.chunks_prefix}.chunks")
+            os.replace(f"{rebuilt.chunks_prefix}.chunkidx", f"{self.chunks_prefix}.chunkidx")
+            os.replace(rebuilt.manifest_path, self.manifest_path)
+            if self.chunks is not None:
+                self.chunks.close()
+
+            self.index = rebuilt.index
+            self.chunks = ChunkStore(self.chunks_prefix)
+            self.manifest = rebuilt.manifest
+            for document_id in set(self.document_chunks) | set(rebuilt.document_chunks):
+                self.document_versions[document_id] = self.document_versions.get(document_id, 0) + 1
+            self.document_chunks = dict(rebuilt.document_chunks)
+            self._changed = None
+
+    def _selector(self, document_ids: List[int]):
+        if len(document_ids) == 1:
+            document_id = document_ids[0]
+            return faiss.IDSelectorRange(
+                make_chunk_id(document_id, 0),
+                make_chunk_id(document_id + 1, 0)
+            )
+        ids = np.array([
+            make_chunk_id(doc_id, i)
+            for doc_id in document_ids
+            for i in range(self.document_chunks[doc_id])
+        ], dtype='int64')
+        return faiss.IDSelectorBatch(ids)
+
+    def _remove_ids(self, document_id: int) -> bool:
+        # The whole id range even for documents missing from document_chunks:
+        # chunks appended before a crash are in the chunk store but not in the
+        # saved FAISS index, and would otherwise mix with the re-ingested ones
+        known = self.document_chunks.pop(document_id, 0)
+        start_id, end_id = make_chunk_id(document_id, 0), make_chunk_id(document_id + 1, 0)
+        removed = self.index.remove_ids(faiss.IDSelectorRange(start_id, end_id))
+        removed += self.chunks.remove_ids(start_id, end_id)
+        if not known and not removed:
+            return False
+        self._changed_document(document_id)
+        return True
+
+    def _changed_document(self, document_id: int) -> None:
+        self.document_versions[document_id] = self.document_versions.get(document_id, 0) + 1
+        if self._changed is not None:
+            self._changed.add(document_id)
+
+    def _check_dimension(self, embeddings: np.ndarray) -> None:
+        if embeddings.shape[1] != self.index.d:
+            raise ValueError(
+                f"The global index holds {self.index.d}-dimensional vectors of another embedding model, "
+                f"new documents can be added once the re-index has replaced it"
+            )
+
+    def _ensure_loaded(self) -> None:
+        if self.index is not None:
+            return
+        if os.path.exists(self.index_path) and ChunkStore.exists(self.chunks_prefix):
+            self.index = faiss.read_index(self.index_path)
+            self.chunks = ChunkStore(self.chunks_prefix)
+            self.manifest = read_manifest(self.manifest_path)
+            # Only ids present in the FAISS index count (the chunk store may hold
+            # rows appended after the last index save)
+            ids = faiss.vector_to_array(faiss.downcast_index(self.index).id_map)
+            document_ids, counts = np.unique(ids >> CHUNK_ID_BITS, return_counts=True)
+            self.document_chunks = dict(zip(document_ids.tolist(), counts.tolist()))
+        else:
+            dimension = embedding_service.get_embedding_dimension()
+            self.index = faiss.IndexIDMap2(faiss.IndexFlat(dimension, metric_type()))
+            ChunkStore.delete(self.chunks_prefix)
+            self.chunks = ChunkStore(self.chunks_prefix)
+            self.document_chunks = {}
+            self.manifest = current_manifest(dimension)
+
+    def save(self) -> None:
+        """Save the FAISS index to disk, replacing the previous file atomically"""
+        with self._lock:
+            self._ensure_loaded()
+            self._save_index()
+
+    def _save_index(self) -> None:
+        # The chunk store is written as chunks are added, only the vectors (and manifest) need saving
+        faiss.write_index(self.index, f"{self.index_path}.tmp")
+        os.replace(f"{self.index_path}.tmp", self.index_path)
+        if self.manifest is not None:
+            # Chunking is recorded per document, this one describes the vectors
+            self.manifest.chunk_count = self.index.ntotal
+            write_manifest(self.manifest_path, self.manifest)
+
+class DocumentIndexView:
+    """Per-document view of the global index with the same interface as VectorStore"""
+
+    def __init__(self, document_id: int, global_index: GlobalVectorIndex):
+        self.document_id = document_id
+        self.global_index = global_index
+        self.bm25: Optional[BM25Index] = None  # while building
+        self.digest = None  # chunks_digest() of the chunks appended so far, while building
+        self.manifest_path = document_manifest_path(document_id)
+        self._version: Optional[int] = None  # document version of the BM25 index from bm25_index()
+
+    def create_index(
+        self,
+        texts: List[str],
+        metadata: Optional[List[dict]] = None,
+        embeddings: Optional[np.ndarray] = None,
+        persist: bool = True
+    ) -> None:
+        if not texts:
+            raise ValueError("No texts provided to create index")
+        if embeddings is None:
+            # Embedded before taking the lock, which searches wait on
+            embeddings = embedding_service.create_embeddings(texts)
+        bm25 = BM25Index()
+        bm25.add(texts)
+        manifest = current_manifest(embeddings.shape[1], len(texts), chunks_digest(texts).hexdigest())
+
+        # Chunks and BM25 index are replaced together for searches
+        with self.global_index._lock:
+            # Batch callers pass persist=False and call global_index.save() once at the end
+            self.global_index.add_document(
+                self.document_id, texts, embeddings=embeddings, persist=persist, metadata=metadata
+            )
+            save_bm25_index(self.document_id, bm25)
+            write_manifest(self.manifest_path, manifest)
+
+    def begin_index(self) -> None:
+        self.global_index.remove_document(self.document_id)
+        delete_bm25_index(self.document_id)
+        delete_manifest(self.manifest_path)
+        self.bm25 = BM25Index()
+        cache_bm25_index(self.document_id, self.bm25)
+        self.digest = chunks_digest([])
+
+    def append_chunks(self, texts: List[str], metadata: Optional[List[dict]] = None) -> None:
+        self.global_index.append_chunks(self.document_id, texts, metadata)
+        self.bm25.add(texts)
+        cache_bm25_index(self.document_id, self.bm25)
+        chunks_digest(texts, self.digest)
+
+    def finalize_index(self) -> None:
+        # The global index stays flat, only the vectors need writing
+        if not self.global_index.has_document(self.document_id):
+            raise ValueError("No texts provided to create index")
+        self.global_index.save()
+        save_bm25_index(self.document_id, self.bm25)
+        write_manifest(self.manifest_path, current_manifest(
+            self.global_index.index.d, self.global_index.document_chunks[self.document_id], self.digest.hexdigest()
+        ))
+
+    def chunk_results(self, hits: List[Tuple[int, float]]) -> List[SearchResult]:
+        return self.global_index.chunk_results(self.document_id, hits, version=self._version)
+
+    def bm25_index(self) -> Optional[BM25Index]:
+        bm25, self._version = self.global_index.load_bm25(self.document_id)
+        if bm25 is None and self.global_index.has_document(self.document_id):
+            # Indexed before BM25, build it once from the stored chunks
+            bm25 = BM25Index()
+            bm25.add(self.global_index.document_texts(self.document_id))
+            save_bm25_index(self.document_id, bm25)
+        return bm25
+
+    def search(self, query: str, top_k: int = 5, query_embedding: Optional[np.ndarray] = None) -> List[SearchResult]:
+        return self.global_index.search(
+            query, top_k=top_k, document_ids=[self.document_id], query_embedding=query_embedding
+        )
+
+    def stored_chunks(self) -> Tuple[List[str], List[dict]]:
+        return self.global_index.document_contents(self.document_id)
+
+    def dense_compatible(self) -> bool:
+        return self.global_index.dense_compatible()
+
+    def exists(self) -> bool:
+        return self.global_index.has_document(self.document_id)
+
+    def delete(self) -> None:
+        try:
+            self.global_index.remove_document(self.document_id)
+            delete_bm25_index(self.document_id)
+            delete_manifest(self.manifest_path)
+        except Exception as e:
+            print(f"❌ Error deleting vector index: {e}")
+
+def migrate_per_document_indexes(delete_old: bool = False) -> int:
+    """
+    Fold existing per-document indexes into the global index
+
+    Exact (flat, HNSW, IVF-flat) vectors are copied over; documents indexed
+    with IVF-PQ are re-embedded from their chunk texts.
+    Args:
+        delete_old: Remove the per-document files once migrated
+    Returns: Number of documents migrated
+    """
+    migrated = 0
+    index_dir = f"{settings.storage_path}/indexes"
+    for index_path in sorted(glob.glob(f"{index_dir}/doc_*.index")):
+        match = re.fullmatch(r"doc_(\d+)\.index", os.path.basename(index_path))
+        chunks_prefix = f"{index_dir}/doc_{match.group(1)}" if match else None
+        if not match or not ChunkStore.exists(chunks_prefix):
+            continue
+
+        document_id = int(match.group(1))
+        index = faiss.read_index(index_path)
+        chunks = ChunkStore(chunks_prefix)
+        texts = chunks.texts()
+        metadata = [chunks.get_metadata(row) for row in range(len(chunks))]
+        chunks.close()
+
+        if stores_exact_vectors(index):
+            # Reuse the stored vectors instead of re-encoding the chunks
+            embeddings = index.reconstruct_n(0, index.ntotal)
+        else:
+            # PQ codes only reconstruct an approximation, so the chunks are re-encoded
+            print(f"Re-embedding document {document_id}: its index stores quantized vectors")
+            embeddings = None
+        global_index.add_document(document_id, texts, embeddings=embeddings, persist=False, metadata=metadata)
+        migrated += 1
+
+        if delete_old:
+            os.remove(index_path)
+            ChunkStore.delete(chunks_prefix)
+        print(f"Migrated document {document_id} ({len(texts)} chunks)")
+
+    global_index.save()
+    return migrated
+
+# Global instance
+global_index = GlobalVectorIndex()
\ No newline at end of file
@@ -0,0 +1,92 @@
+from dataclasses import replace
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from ..core.config import settings
+from ..core.metrics import stage
+from .chunk_store import SearchResult
+from .embeddings import embedding_service
+
+RETRIEVAL_MODES = ("dense", "sparse", "hybrid")
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[int]],
+    weights: Sequence[float],
+    k: int = 60
+) -> List[Tuple[int, float]]:
+    """
+    Fuse rankings by weighted reciprocal rank: sum of weight / (k + rank)
+    Args:
+        rankings: Lists of keys, best first
+        weights: One weight per ranking
+        k: Damping constant; larger values flatten the advantage of top ranks
+    Returns: (key, fused score) pairs best first
+    """
+    scores: Dict[int, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+def hybrid_search(
+    store,
+    query: str,
+    top_k: int = 5,
+    query_embedding: Optional[np.ndarray] = None
+) -> List[SearchResult]:
+    """
+    Retrieve chunks by dense similarity, BM25 or both, per settings.retrieval_mode
+    
+    In hybrid mode each retriever returns hybrid_candidates chunks and the two
+    rankings are fused with reciprocal rank fusion. Results carry `similarity`
+    when the dense search found them and `bm25_score` when they matched query
+    terms; `score` is the fused score. Documents without a BM25 index fall
+    back to dense retrieval, and indexes built with another embedding model
+    (not re-indexed yet) to BM25 alone.
+    Args:
+        store: VectorStore or DocumentIndexView of the document
+        query: Search query
+        top_k: Number of results to return
+        query_embedding: Embedding of the query if the caller already has it
+    """
+    mode = settings.retrieval_mode
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode: {mode}")
+    
+    with stage("index_load"):
+        bm25 = store.bm25_index() if mode != "dense" else None
+        compatible = mode == "sparse" or store.dense_compatible()
+    if not compatible:
+        print(f"Index of document {store.document_id} was built with another embedding model, searching it by BM25 only")
+        bm25 = bm25 or store.bm25_index()
+        if bm25 is None:
+            return []
+        mode = "sparse"
+    if mode != "sparse" and query_embedding is None:
+        with stage("query_embedding"):
+            query_embedding = embedding_service.create_single_embedding(query)
+    if bm25 is None:
+        with stage("vector_search"):
+            dense = store.search(query, top_k=top_k, query_embedding=query_embedding)
+        return [replace(result, similarity=result.score) for result in dense]
+    
+    candidates = max(top_k, settings.hybrid_candidates)
+    with stage("vector_search"):
+        dense = [] if mode == "sparse" else store.search(query, top_k=candidates, query_embedding=query_embedding)
+    with stage("bm25_search"):
+        sparse = store.chunk_results(bm25.search(query, top_k=candidates))
+    
+    by_id = {}
+    for result in dense:
+        by_id[result.chunk_id] = replace(result, similarity=result.score)
+    for result in sparse:
+        if result.chunk_id in by_id:
+            by_id[result.chunk_id].bm25_score = result.score
+        else:
+            by_id[result.chunk_id] = replace(result, bm25_score=result.score)
+    
+    fused = reciprocal_rank_fusion(
+        [[result.chunk_id for result in dense], [result.chunk_id for result in sparse]],
+        [settings.hybrid_dense_weight, settings.hybrid_sparse_weight],
+        k=settings.hybrid_rrf_k
+    )
+    return [replace(by_id[chunk_id], score=score) for chunk_id, score in fused[:top_k]]
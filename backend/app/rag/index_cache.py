@@ -0,0 +1,102 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from ..core.config import settings
+
+def estimate_index_bytes(index: Any, chunks: Any) -> int:
+    """
+    Approximate memory held by a loaded flat index and its chunk store
+    Args:
+        index: FAISS index
+        chunks: ChunkStore stored alongside the index
+    Returns: Size in bytes
+    """
+    vector_bytes = index.ntotal * index.d * 4  # float32 vectors
+    return vector_bytes + chunks.nbytes
+
+class IndexCache:
+    """Thread-safe LRU cache of loaded indexes, bounded by memory rather than entry count"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Any, Tuple[Any, Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Any) -> Optional[Tuple[Any, Any]]:
+        """
+        Get a cached index
+        Returns: (index, chunks) tuple, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def peek(self, key: Any) -> Optional[Tuple[Any, Any]]:
+        """Like get(), but neither counted as a hit or miss nor refreshing the entry's recency"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else (entry[0], entry[1])
+
+    def __contains__(self, key: Any) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key: Any, index: Any, chunks: Any, nbytes: Optional[int] = None) -> None:
+        """
+        Cache an index, evicting least recently used entries to stay within budget
+        Args:
+            nbytes: Known size of the entry, estimated from a flat index layout when omitted
+        """
+        if nbytes is None:
+            nbytes = estimate_index_bytes(index, chunks)
+        with self._lock:
+            self._remove(key)
+            if nbytes > self.max_bytes:
+                # Larger than the whole budget, callers keep using their own copy
+                return
+            while self._entries and self.current_bytes + nbytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+            self._entries[key] = (index, chunks, nbytes)
+            self.current_bytes += nbytes
+
+    def invalidate(self, key: Any) -> None:
+        """Drop a cached index"""
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        """Drop all cached indexes"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        """Cache counters for monitoring"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _remove(self, key: Any) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
+
+# Global instance
+index_cache = IndexCache(max_bytes=settings.index_cache_max_bytes)
\ No newline at end of file
@@ -0,0 +1,149 @@
+import faiss
+import math
+import numpy as np
+from typing import Optional
+from ..core.config import settings
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+METRICS = {
+    "l2": faiss.METRIC_L2,
+    "cosine": faiss.METRIC_INNER_PRODUCT,  # inner product on normalized embeddings
+}
+
+def metric_type(metric: Optional[str] = None) -> int:
+    """Resolve a metric name (default settings.vector_metric) to a FAISS metric constant"""
+    metric = metric or settings.vector_metric
+    if metric not in METRICS:
+        raise ValueError(f"Unknown vector metric: {metric}")
+    return METRICS[metric]
+
+def uses_inner_product(index) -> bool:
+    """Whether an index scores by inner product, i.e. expects normalized query embeddings"""
+    return index.metric_type == faiss.METRIC_INNER_PRODUCT
+
+def stores_exact_vectors(index) -> bool:
+    """Whether reconstruct() returns the vectors as added, not a PQ or scalar-quantized approximation"""
+    base = faiss.downcast_index(index)
+    if isinstance(base, faiss.IndexHNSW):
+        base = faiss.downcast_index(base.storage)
+    return isinstance(base, (faiss.IndexFlat, faiss.IndexIVFFlat))
+
+def similarity_scores(index, distances: np.ndarray) -> np.ndarray:
+    """
+    Convert raw FAISS search distances into similarity scores
+    
+    Inner-product indexes over normalized embeddings already return cosine
+    similarity; L2 indexes (built before cosine became the default) keep the
+    1 / (1 + distance) mapping.
+    """
+    if uses_inner_product(index):
+        return distances
+    return 1 / (1 + distances)
+
+def select_index_type(num_vectors: int, index_type: Optional[str] = None) -> str:
+    """
+    Resolve the configured index type, picking one by corpus size for "auto"
+    Args:
+        num_vectors: Number of chunks to be indexed
+        index_type: Override for settings.vector_index_type
+    Returns: One of INDEX_TYPES
+    """
+    index_type = index_type or settings.vector_index_type
+    if index_type == "auto":
+        if num_vectors < settings.ann_hnsw_min_chunks:
+            return "flat"
+        if num_vectors < settings.ann_ivf_pq_min_chunks:
+            return "hnsw"
+        return "ivf_pq"
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown vector index type: {index_type}")
+    return index_type
+
+def _ivf_nlist(num_vectors: int) -> int:
+    nlist = settings.ivf_nlist or int(4 * math.sqrt(num_vectors))
+    # FAISS wants roughly 39 training points per centroid
+    return max(1, min(nlist, num_vectors // 39))
+
+def _pq_m(dimension: int) -> int:
+    if settings.pq_m:
+        return settings.pq_m
+    # Largest sub-quantizer count that divides the dimension with >= 8 dims each
+    for m in range(dimension // 8, 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+def build_index(
+    embeddings: np.ndarray,
+    dimension: int,
+    index_type: Optional[str] = None,
+    metric: Optional[str] = None
+):
+    """
+    Build and populate a FAISS index, training it on the embeddings when needed
+    Args:
+        embeddings: float32 array of shape (n, dimension), already normalized for cosine
+        dimension: Embedding dimension
+        index_type: Override for settings.vector_index_type
+        metric: Override for settings.vector_metric
+    Returns: Populated FAISS index
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    num_vectors = embeddings.shape[0]
+    index_type = select_index_type(num_vectors, index_type)
+    faiss_metric = metric_type(metric)
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, settings.hnsw_m, faiss_metric)
+        index.hnsw.efConstruction = settings.hnsw_ef_construction
+        index.hnsw.efSearch = settings.hnsw_ef_search
+    elif index_type in ("ivf_flat", "ivf_pq"):
+        nlist = _ivf_nlist(num_vectors)
+        quantizer = faiss.IndexFlat(dimension, faiss_metric)
+        if index_type == "ivf_pq":
+            # 8-bit codes need 256 training points per sub-quantizer
+            nbits = settings.pq_nbits if num_vectors >= (1 << settings.pq_nbits) else max(1, int(math.log2(num_vectors)))
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, _pq_m(dimension), nbits, faiss_metric)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss_metric)
+        index.train(embeddings)
+        index.nprobe = min(settings.ivf_nprobe, nlist)
+    else:
+        index = faiss.IndexFlat(dimension, faiss_metric)
+
+    index.add(embeddings)
+    return index
+
+def search_parameters(
+    index,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    selector=None
+):
+    """
+    Per-query search parameters for an index
+
+    Parameters are passed with each search rather than set on the index, so
+    cached indexes can be queried concurrently with different settings.
+    Args:
+        index: FAISS index to be searched
+        nprobe: IVF lists to visit (defaults to settings.ivf_nprobe)
+        ef_search: HNSW candidate list size (defaults to settings.hnsw_ef_search)
+        selector: Optional faiss.IDSelector restricting the result ids
+    Returns: faiss.SearchParameters, or None when defaults apply
+    """
+    base = faiss.downcast_index(index)
+    if isinstance(base, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF(nprobe=min(nprobe or settings.ivf_nprobe, base.nlist))
+    elif isinstance(base, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(efSearch=ef_search or settings.hnsw_ef_search)
+    elif selector is not None:
+        params = faiss.SearchParameters()
+    else:
+        return None
+
+    if selector is not None:
+        params.sel = selector
+        # The C++ params only hold a raw pointer, keep the selector alive with them
+        params.referenced_objects = [selector]
+    return params
\ No newline at end of file
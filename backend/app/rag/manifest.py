@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from ..core.config import settings
+from .chunking import CHUNKER_VERSION
+from .embeddings import embedding_service
+
+# Bumped when the manifest layout changes
+MANIFEST_VERSION = 1
+
+@dataclass
+class IndexManifest:
+    """
+    How an index was built, written next to it
+
+    The embedding fields decide whether the index can still answer dense
+    queries (a different model or dimension cannot be searched with today's
+    query embeddings); every build setting decides whether it is stale and
+    should be rebuilt.
+    """
+    embedding_model: str
+    embedding_dimension: int
+    vector_metric: str
+    chunker_version: int
+    chunk_strategy: str
+    chunk_size_tokens: int
+    chunk_overlap_tokens: int
+    chunk_tokenizer: str
+    text_unicode_form: str
+    text_drop_categories: List[str]
+    chunk_count: int = 0
+    chunks_sha256: str = ""  # over the chunk texts, in order
+    created_at: str = ""
+    manifest_version: int = MANIFEST_VERSION
+
+    @property
+    def embedding_key(self) -> Tuple[str, int]:
+        return self.embedding_model, self.embedding_dimension
+
+    @property
+    def chunking_hash(self) -> str:
+        """Hash of the settings that decide chunk boundaries"""
+        return _settings_hash({
+            "chunker_version": self.chunker_version,
+            "chunk_strategy": self.chunk_strategy,
+            "chunk_size_tokens": self.chunk_size_tokens,
+            "chunk_overlap_tokens": self.chunk_overlap_tokens,
+            "chunk_tokenizer": self.chunk_tokenizer,
+            "text_unicode_form": self.text_unicode_form,
+            "text_drop_categories": list(self.text_drop_categories),
+        })
+
+    @property
+    def build_hash(self) -> str:
+        """Hash of every setting the index depends on"""
+        return _settings_hash({
+            "embedding_model": self.embedding_model,
+            "embedding_dimension": self.embedding_dimension,
+            "vector_metric": self.vector_metric,
+            "chunking": self.chunking_hash,
+        })
+
+def _settings_hash(values: dict) -> str:
+    return hashlib.sha256(json.dumps(values, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+def chunks_digest(texts: List[str], digest=None):
+    """SHA-256 over chunk texts; pass the returned object back in to extend it"""
+    digest = digest or hashlib.sha256()
+    for text in texts:
+        data = text.encode('utf-8')
+        # Length-prefixed, so chunk boundaries are part of the hash
+        digest.update(len(data).to_bytes(8, 'little'))
+        digest.update(data)
+    return digest
+
+def current_manifest(
+    embedding_dimension: int,
+    chunk_count: int = 0,
+    chunks_sha256: str = ""
+) -> IndexManifest:
+    """
+    Manifest for an index built now, from the current settings
+    Args:
+        embedding_dimension: Dimension of the vectors in the index
+        chunk_count: Chunks in the index
+        chunks_sha256: chunks_digest() of the chunk texts
+    """
+    return IndexManifest(
+        embedding_model=embedding_service.model_name,
+        embedding_dimension=embedding_dimension,
+        vector_metric=settings.vector_metric,
+        chunker_version=CHUNKER_VERSION,
+        chunk_strategy=settings.chunk_strategy,
+        chunk_size_tokens=settings.chunk_size_tokens,
+        chunk_overlap_tokens=settings.chunk_overlap_tokens,
+        chunk_tokenizer=settings.chunk_tokenizer,
+        text_unicode_form=settings.text_unicode_form,
+        text_drop_categories=list(settings.text_drop_categories),
+        chunk_count=chunk_count,
+        chunks_sha256=chunks_sha256,
+        created_at=datetime.utcnow().isoformat()
+    )
+
+def manifest_path(name: str) -> str:
+    """Manifest of an index, by its file name prefix (e.g. doc_12 or global)"""
+    return f"{settings.storage_path}/indexes/{name}.manifest.json"
+
+def document_manifest_path(document_id: int) -> str:
+    return manifest_path(f"doc_{document_id}")
+
+# Parsed manifests by path, reused while the file is unchanged
+_cache: Dict[str, Tuple[int, IndexManifest]] = {}
+_cache_lock = threading.Lock()
+
+def write_manifest(path: str, manifest: IndexManifest) -> None:
+    """Write a manifest, replacing any existing one atomically"""
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(asdict(manifest), f, indent=2)
+    os.replace(f"{path}.tmp", path)
+    with _cache_lock:
+        _cache.pop(path, None)
+
+def read_manifest(path: str) -> Optional[IndexManifest]:
+    """A manifest from disk, None if the index has none (built before manifests) or it is unreadable"""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _cache_lock:
+        cached = _cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    try:
+        with open(path) as f:
+            values = json.load(f)
+        known = {f.name for f in fields(IndexManifest)}
+        manifest = IndexManifest(**{key: value for key, value in values.items() if key in known})
+    except Exception as e:
+        print(f"Error reading index manifest {path}: {e}")
+        return None
+    with _cache_lock:
+        _cache[path] = (mtime, manifest)
+    return manifest
+
+def delete_manifest(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+    with _cache_lock:
+        _cache.pop(path, None)
+
+def stale_reason(
+    manifest: Optional[IndexManifest],
+    current: IndexManifest,
+    check_embedding: bool = True,
+    check_chunking: bool = True
+) -> Optional[str]:
+    """
+    Why an index needs rebuilding, None if it matches the current settings
+    Args:
+        manifest: The index's manifest (None for indexes built before manifests)
+        current: current_manifest() for comparison
+        check_embedding: Compare the embedding settings (in global mode only the global manifest's count)
+        check_chunking: Compare the chunking settings (recorded per document)
+    Returns: "missing", "embedding" (model, dimension or metric changed) or "chunking"
+        (find_stale() adds "legacy" for pickled indexes)
+    """
+    if manifest is None:
+        return "missing"
+    if check_embedding and (
+        manifest.embedding_key != current.embedding_key or manifest.vector_metric != current.vector_metric
+    ):
+        return "embedding"
+    if check_chunking and manifest.chunking_hash != current.chunking_hash:
+        return "chunking"
+    return None
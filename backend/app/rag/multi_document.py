@@ -0,0 +1,167 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from ..core.config import settings
+from .chunk_store import SearchResult
+from .embeddings import embedding_service
+from .global_index import global_index
+from .hybrid import RETRIEVAL_MODES
+from .vector_store import get_vector_store
+
+# Per-document searches are short and mostly release the GIL in FAISS/numpy
+_search_executor = ThreadPoolExecutor(
+    max_workers=settings.multi_document_search_workers,
+    thread_name_prefix="document-search"
+)
+
+def _search_document(
+    document_id: int,
+    query: str,
+    top_k: int,
+    query_embedding: np.ndarray,
+    dense: bool,
+    sparse: bool
+) -> List[SearchResult]:
+    """Dense and/or BM25 candidates of one document, with similarity / bm25_score set"""
+    store = get_vector_store(document_id)
+    if not store.exists():
+        print(f"Vector index not found for document {document_id}, skipping it")
+        return []
+
+    bm25 = store.bm25_index() if sparse else None
+    if (dense or bm25 is None) and not store.dense_compatible():
+        # Built with another embedding model and not re-indexed yet, as in hybrid_search
+        dense, bm25 = False, bm25 or store.bm25_index()
+    elif bm25 is None and settings.retrieval_mode == "sparse":
+        # Documents without a BM25 index fall back to dense retrieval, as in hybrid_search
+        dense = True
+    results = []
+    if dense:
+        for result in store.search(query, top_k=top_k, query_embedding=query_embedding):
+            result.similarity = result.score
+            results.append(result)
+    if bm25 is not None:
+        for result in store.chunk_results(bm25.search(query, top_k=top_k)):
+            result.bm25_score = result.score
+            results.append(result)
+    return results
+
+def _normalize(values: List[float]) -> List[float]:
+    """Min-max scale to [0, 1]; a single distinct value maps to 1"""
+    low, high = min(values), max(values)
+    if high == low:
+        return [1.0] * len(values)
+    return [(value - low) / (high - low) for value in values]
+
+def _is_duplicate(candidate: SearchResult, kept: SearchResult) -> bool:
+    if candidate.text == kept.text:
+        return True
+    if candidate.document_id != kept.document_id or None in (
+        candidate.char_start, candidate.char_end, kept.char_start, kept.char_end
+    ):
+        return False
+    overlap = min(candidate.char_end, kept.char_end) - max(candidate.char_start, kept.char_start)
+    shorter = min(candidate.char_end - candidate.char_start, kept.char_end - kept.char_start)
+    return shorter > 0 and overlap / shorter >= settings.multi_document_dedup_overlap
+
+def merge_results(candidates: List[SearchResult], top_k: int) -> List[SearchResult]:
+    """
+    Merge candidates from several documents into one ranking
+
+    Dense similarities and BM25 scores are min-max normalized over all
+    candidates (so a strong match in one document outranks a weak one in
+    another), combined with the hybrid weights, and stored as `score`. Chunks
+    with the same text, or overlapping the same span of a document by at least
+    multi_document_dedup_overlap of the shorter chunk, are kept only once.
+    """
+    # Results are fresh from the stores, so they are updated in place
+    merged: Dict[Tuple[Optional[int], Optional[int]], SearchResult] = {}
+    for result in candidates:
+        key = (result.document_id, result.chunk_id)
+        existing = merged.setdefault(key, result)
+        if existing is not result:
+            if existing.similarity is None:
+                existing.similarity = result.similarity
+            if existing.bm25_score is None:
+                existing.bm25_score = result.bm25_score
+    results = list(merged.values())
+
+    combined = [0.0] * len(results)
+    for field, weight in (("similarity", settings.hybrid_dense_weight), ("bm25_score", settings.hybrid_sparse_weight)):
+        positions = [i for i, result in enumerate(results) if getattr(result, field) is not None]
+        if not positions:
+            continue
+        for i, value in zip(positions, _normalize([getattr(results[i], field) for i in positions])):
+            combined[i] += weight * value
+
+    selected: List[SearchResult] = []
+    for i in sorted(range(len(results)), key=combined.__getitem__, reverse=True):
+        result = results[i]
+        if not any(_is_duplicate(result, kept) for kept in selected):
+            result.score = combined[i]
+            selected.append(result)
+            if len(selected) == top_k:
+                break
+    return selected
+
+def search_documents(
+    document_ids: Sequence[int],
+    query: str,
+    top_k: int = 5,
+    query_embedding: Optional[np.ndarray] = None,
+    all_documents: bool = False
+) -> List[SearchResult]:
+    """
+    Search several documents in parallel and merge the results
+
+    Each document contributes twice top_k dense and BM25 candidates, so the
+    merged ranking still fills top_k after duplicates are dropped. In global
+    index mode the dense search is a single filtered search of the shared
+    index instead.
+    Args:
+        document_ids: Documents to search
+        query: Search query
+        top_k: Number of results to return
+        query_embedding: Embedding of the query if the caller already has it
+        all_documents: The ids are every indexed document (skips the global-mode filter)
+    Returns: Merged, deduplicated results best first, with document_id set
+    """
+    mode = settings.retrieval_mode
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode: {mode}")
+    if not document_ids:
+        return []
+
+    dense, sparse = mode != "sparse", mode != "dense"
+    candidates_per_document = 2 * top_k
+    if dense and query_embedding is None:
+        query_embedding = embedding_service.create_single_embedding(query)
+
+    candidates: List[SearchResult] = []
+    per_document_dense = dense
+    if dense and settings.vector_index_mode == "global":
+        per_document_dense = False
+        if global_index.dense_compatible():
+            for result in global_index.search(
+                query,
+                top_k=candidates_per_document,
+                document_ids=None if all_documents else document_ids,
+                query_embedding=query_embedding
+            ):
+                result.similarity = result.score
+                candidates.append(result)
+        else:
+            # Built with another embedding model and not re-indexed yet: BM25 only
+            sparse = True
+
+    if per_document_dense or sparse:
+        searches = _search_executor.map(
+            lambda document_id: _search_document(
+                document_id, query, candidates_per_document, query_embedding, per_document_dense, sparse
+            ),
+            document_ids
+        )
+        for results in searches:
+            candidates += results
+
+    return merge_results(candidates, top_k)
\ No newline at end of file
@@ -1,100 +1,72 @@
-from typing import List
+from functools import lru_cache
+from typing import Dict, Iterable, Tuple
 import re
+import unicodedata
+from ..core.config import settings
 
-def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
+_PUNCTUATION_RUNS = re.compile(r'([.,])\1+')
+
+@lru_cache(maxsize=256)
+def _deletion_pattern(chars: Tuple[str, ...]) -> "re.Pattern":
+    """Character class of the dropped characters found in a text (few, so the scan stays fast)"""
+    return re.compile("[" + "".join(re.escape(char) for char in chars) + "]+")
+
+class TextNormalizer:
     """
-    Split text into overlapping chunks
-    Args:
-        text: Input text to chunk
-        chunk_size: Maximum characters per chunk
-        overlap: Number of characters to overlap between chunks
-    Returns: List of text chunks
+    Precompiled text normalization for extracted PDF text
+
+    Applies, in order: Unicode normalization (NFKC folds ligatures and
+    full-width forms), deletion of characters in the dropped categories
+    (by default C*: control, format, private-use and unassigned characters,
+    plus U+FFFD), collapsing all whitespace to single spaces, and collapsing
+    runs of periods or commas. Quotes, currency, math and other punctuation
+    and symbols are kept.
     """
-    if not text or not text.strip():
-        return []
-    text = clean_text(text)
 
-    if len(text) <= chunk_size:
-        return [text]
-        
-    chunks = []
-    start = 0
-    
-    while start < len(text):
-        end = start + chunk_size
-        
-        # If this is not the last chunk, try to break at sentence or word boundary
-        if end < len(text):
-            # break at sentence end
-            sentence_break = text.rfind('.', start, end)
-            if sentence_break > start:
-                end = sentence_break + 1
-            else:
-                # break at word boundary
-                word_break = text.rfind(' ', start, end)
-                if word_break > start:
-                    end = word_break
-        
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
-        start = max(start + 1, end - overlap)
-        if start >= len(text):
-            break
-    
-    return chunks
+    def __init__(self, unicode_form: str = "NFKC", drop_categories: Iterable[str] = ("C",)):
+        if unicode_form and unicode_form not in ("NFC", "NFKC", "NFD", "NFKD"):
+            raise ValueError(f"Unknown Unicode normalization form: {unicode_form}")
+        self.unicode_form = unicode_form
+        self.drop_categories = tuple(drop_categories)
+        self._dropped: Dict[str, bool] = {}  # classification of every character seen so far
+        self._ascii_table = {code: None for code in range(128) if self._is_dropped(chr(code))}
+
+    def __call__(self, text: str) -> str:
+        if not text:
+            return ""
+        if self.unicode_form:
+            text = unicodedata.normalize(self.unicode_form, text)
+        text = " ".join(self._drop_characters(text).split())
+        return _PUNCTUATION_RUNS.sub(r"\1", text)
+
+    def _drop_characters(self, text: str) -> str:
+        if text.isascii():
+            # translate() has a C fast path for ASCII-only tables
+            return text.translate(self._ascii_table)
+        # A table covering all of Unicode makes translate() look up every
+        # character in Python; find the few dropped characters present instead
+        dropped = tuple(sorted(char for char in set(text) if self._is_dropped(char)))
+        if not dropped:
+            return text
+        return _deletion_pattern(dropped).sub("", text)
+
+    def _is_dropped(self, char: str) -> bool:
+        dropped = self._dropped.get(char)
+        if dropped is None:
+            dropped = char == "\ufffd" or (
+                not char.isspace() and unicodedata.category(char).startswith(self.drop_categories)
+            )
+            self._dropped[char] = dropped
+        return dropped
+
+# Global instance
+text_normalizer = TextNormalizer(settings.text_unicode_form, settings.text_drop_categories)
 
 def clean_text(text: str) -> str:
     """
     Clean and normalize text
     Args:
         text: Input text to clean
-    Returns: Cleaned text
-    """
-    if not text:
-        return ""
-    
-    # whitespaces removed
-    text = re.sub(r'\s+', ' ', text)
-    
-    # special characters removed
-    text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)]', '', text)
-    
-    # consecutive punctuations removed
-    text = re.sub(r'[\.]{2,}', '.', text)
-    text = re.sub(r'[,]{2,}', ',', text)
-    
-    # Strip and return
-    return text.strip()
-
-def extract_keywords(text: str, max_keywords: int = 10) -> List[str]:
-    """
-    Extract important keywords from text (simple implementation)
-    Args:
-        text: Input text
-        max_keywords: Maximum number of keywords to return
-    Returns: List of keywords
+    Returns: Cleaned text (see TextNormalizer)
     """
-    if not text:
-        return []
-    
-    # Simple keyword extraction based on word frequency
-    # Remove common stop words
-    stop_words = {
-        'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 
-        'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have',
-        'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should',
-        'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we', 'they'
-    }
-    
-    # Extract words
-    words = re.findall(r'\b\w+\b', text.lower())
-    
-    # Filter out stop words and short words
-    keywords = [word for word in words if len(word) > 3 and word not in stop_words]
-    word_freq = {}
-    for word in keywords:
-        word_freq[word] = word_freq.get(word, 0) + 1
-    sorted_keywords = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)
-    
-    return [word for word, freq in sorted_keywords[:max_keywords]]
\ No newline at end of file
+    return text_normalizer(text)
\ No newline at end of file
@@ -1,54 +1,204 @@
 import faiss
+import glob
 import numpy as np
-import pickle
 import os
-from typing import List, Tuple, Optional
+import threading
+import uuid
+from typing import Dict, List, Tuple, Optional
 from ..core.config import settings
-from .embeddings import embedding_service
+from ..core.metrics import stage
+from .embeddings import embedding_service, as_query_batch, normalize_embeddings
+from .bm25 import BM25Index, bm25_path, cache_bm25_index, delete_bm25_index, load_bm25_index, save_bm25_index, uncache_bm25_index
+from .chunk_store import ChunkStore, SearchResult
+from .manifest import IndexManifest, chunks_digest, current_manifest, delete_manifest, document_manifest_path, read_manifest, write_manifest
+from .index_cache import index_cache
+from .index_factory import build_index, metric_type, search_parameters, select_index_type, similarity_scores, uses_inner_product
+from .global_index import global_index, DocumentIndexView
+
+# Indexes being built incrementally are searched while chunks are appended;
+# readers and the writer of a document share its lock
+_document_locks: Dict[int, threading.RLock] = {}
+_document_locks_guard = threading.Lock()
+
+def _document_lock(document_id: int) -> threading.RLock:
+    with _document_locks_guard:
+        return _document_locks.setdefault(document_id, threading.RLock())
+
+# Manifest mtime of each document's cached index (None while it has no manifest).
+# Another process rebuilding the index (`python -m app.cli reindex`) replaces
+# the manifest, and the next load then drops the stale cached indexes.
+_cached_manifests: Dict[int, Optional[int]] = {}
+
+def _manifest_mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def legacy_texts_path(document_id: int) -> str:
+    """
+    Pickled chunk texts written by versions before the chunk store
+
+    They are never unpickled when loading: documents left with only this file
+    are rebuilt from their PDF by the re-index job (reason "legacy"), or
+    converted with `python -m app.cli convert-chunk-stores`.
+    """
+    return f"{settings.storage_path}/indexes/doc_{document_id}_texts.pkl"
 
 class VectorStore:
     def __init__(self, document_id: int):
         self.document_id = document_id
         self.index = None
-        self.texts = []
-        self.embedding_dim = embedding_service.get_embedding_dimension()
+        self.chunks: Optional[ChunkStore] = None
+        self.bm25: Optional[BM25Index] = None  # while building
+        self.digest = None  # chunks_digest() of the chunks appended so far, while building
+        self.manifest: Optional[IndexManifest] = None  # of the loaded index, None for indexes built before manifests
         
         # File paths
         self.index_path = f"{settings.storage_path}/indexes/doc_{document_id}.index"
-        self.texts_path = f"{settings.storage_path}/indexes/doc_{document_id}_texts.pkl"
+        self.chunks_prefix = f"{settings.storage_path}/indexes/doc_{document_id}"
+        self.manifest_path = document_manifest_path(document_id)
+        self.legacy_texts_path = legacy_texts_path(document_id)
     
-    def create_index(self, texts: List[str]) -> None:
+    def create_index(
+        self,
+        texts: List[str],
+        metadata: Optional[List[dict]] = None,
+        embeddings: Optional[np.ndarray] = None
+    ) -> None:
         """
-        Create FAISS index from text chunks
+        Create FAISS index from text chunks, replacing any existing one
+        
+        The new files are written next to the live ones and swapped in under
+        the document lock, so searches keep using the previous index (and its
+        chunks and BM25 index, which stay consistent with it) until the
+        swap. This is also how the re-index job rebuilds stale indexes.
         Args:
             texts: List of text chunks to index
+            metadata: Optional per-chunk dicts with page, char_start, char_end
+            embeddings: Precomputed embeddings (e.g. batched across documents), created from texts when omitted
         """
         if not texts:
             raise ValueError("No texts provided to create index")
         
         try:
-            # Create embeddings
-            embeddings = embedding_service.create_embeddings(texts)
+            # Create embeddings (normalized once here when searching by cosine)
+            normalize = settings.vector_metric == "cosine"
+            if embeddings is None:
+                embeddings = embedding_service.create_embeddings(texts, normalize=normalize)
+            elif normalize:
+                embeddings = normalize_embeddings(np.array(embeddings, dtype='float32'))
             
-            # Create FAISS index
-            self.index = faiss.IndexFlatL2(self.embedding_dim)
-            self.index.add(embeddings.astype('float32'))
+            # Create FAISS index (flat or ANN depending on settings and chunk count)
+            index = build_index(embeddings, embedding_service.get_embedding_dimension())
+            bm25 = BM25Index()
+            bm25.add(texts)
+            manifest = current_manifest(index.d, len(texts), chunks_digest(texts).hexdigest())
             
-            # Store texts for retrieval
-            self.texts = texts
-            self._save_index()
+            staged = f"{self.chunks_prefix}.staged-{uuid.uuid4().hex[:8]}"
+            try:
+                faiss.write_index(index, f"{staged}.index")
+                ChunkStore.write(staged, texts, metadata)
+                bm25.save(f"{staged}.bm25.npz")
+                
+                with _document_lock(self.document_id):
+                    os.replace(f"{staged}.index", self.index_path)
+                    os.replace(f"{staged}.chunks", f"{self.chunks_prefix}.chunks")
+                    os.replace(f"{staged}.chunkidx", f"{self.chunks_prefix}.chunkidx")
+                    os.replace(f"{staged}.bm25.npz", bm25_path(self.document_id))
+                    write_manifest(self.manifest_path, manifest)
+                    _cached_manifests[self.document_id] = _manifest_mtime(self.manifest_path)
+                    if os.path.exists(self.legacy_texts_path):
+                        os.remove(self.legacy_texts_path)
+                    
+                    # Replace any stale copy so searches pick up the new index
+                    self.index, self.bm25, self.manifest = index, bm25, manifest
+                    self.chunks = ChunkStore(self.chunks_prefix)
+                    index_cache.put(self.document_id, self.index, self.chunks, nbytes=self._stored_bytes())
+                    cache_bm25_index(self.document_id, self.bm25)
+            finally:
+                for path in glob.glob(f"{staged}.*"):
+                    os.remove(path)
             
         except Exception as e:
             print(f"Error creating vector index: {e}")
             raise e
     
-    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+    def begin_index(self) -> None:
+        """
+        Start building the index incrementally, replacing any existing one
+        
+        Chunks added with append_chunks() are searchable right away through a
+        flat index; finalize_index() builds the configured ANN index and
+        writes it to disk.
+        """
+        with _document_lock(self.document_id):
+            self.delete()
+            self.index = faiss.IndexFlat(embedding_service.get_embedding_dimension(), metric_type())
+            ChunkStore.write(self.chunks_prefix, [])
+            self.chunks = ChunkStore(self.chunks_prefix)
+            index_cache.put(self.document_id, self.index, self.chunks)
+            self.bm25 = BM25Index()
+            cache_bm25_index(self.document_id, self.bm25)
+            self.digest = chunks_digest([])
+            _cached_manifests[self.document_id] = None
+    
+    def append_chunks(self, texts: List[str], metadata: Optional[List[dict]] = None) -> None:
+        """
+        Embed and append chunks to an index started with begin_index()
+        Args:
+            texts: Chunk texts, continuing in document order
+            metadata: Optional per-chunk dicts with page, char_start, char_end
+        """
+        if not texts:
+            return
+        with stage("embedding"):
+            embeddings = embedding_service.create_embeddings(texts, normalize=uses_inner_product(self.index))
+        with _document_lock(self.document_id):
+            self.index.add(embeddings)
+            first = len(self.chunks)
+            self.chunks.append(texts, metadata, ids=range(first, first + len(texts)))
+            self.bm25.add(texts)
+            chunks_digest(texts, self.digest)
+            # Re-cache so the budget accounts for the grown indexes
+            index_cache.put(self.document_id, self.index, self.chunks)
+            cache_bm25_index(self.document_id, self.bm25)
+    
+    def finalize_index(self) -> None:
+        """Build the configured index type from the appended vectors and save it"""
+        with _document_lock(self.document_id):
+            if not self.index or not self.index.ntotal:
+                raise ValueError("No texts provided to create index")
+            
+            if select_index_type(self.index.ntotal) != "flat":
+                embeddings = self.index.reconstruct_n(0, self.index.ntotal)
+                self.index = build_index(embeddings, self.index.d)
+            
+            faiss.write_index(self.index, self.index_path)
+            index_cache.put(self.document_id, self.index, self.chunks, nbytes=self._stored_bytes())
+            save_bm25_index(self.document_id, self.bm25)
+            # Hashed as the chunks were appended, so finalizing never holds every chunk text
+            self.manifest = current_manifest(self.index.d, len(self.chunks), self.digest.hexdigest())
+            write_manifest(self.manifest_path, self.manifest)
+            _cached_manifests[self.document_id] = _manifest_mtime(self.manifest_path)
+    
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        query_embedding: Optional[np.ndarray] = None
+    ) -> List[SearchResult]:
         """
         Search for similar text chunks
         Args:
             query: Search query
             top_k: Number of results to return
-        Returns: List of (text, similarity_score) tuples
+            nprobe: IVF lists to visit (ANN indexes only)
+            ef_search: HNSW candidate list size (ANN indexes only)
+            query_embedding: Embedding of the query if the caller already has it
+        Returns: Results best first, scored by cosine similarity for inner-product indexes
         """
         if not self.index:
             self._load_index()
@@ -56,19 +206,26 @@ class VectorStore:
         if not self.index:
             raise ValueError("No index found. Create index first.")
         try:
-            # create query embeddings
-            query_embedding = embedding_service.create_single_embedding(query)
-            query_embedding = query_embedding.reshape(1, -1).astype('float32')
+            # create query embeddings, normalized to match inner-product indexes
+            if query_embedding is None:
+                query_embedding = embedding_service.create_single_embedding(query)
+            query_embedding = as_query_batch(query_embedding, normalize=uses_inner_product(self.index))
             
             # semantic search
-            distances, indices = self.index.search(query_embedding, min(top_k, len(self.texts)))
-            
-            # Format results
-            results = []
-            for distance, idx in zip(distances[0], indices[0]):
-                if idx < len(self.texts): 
-                    similarity_score = 1 / (1 + distance)
-                    results.append((self.texts[idx], similarity_score))
+            with _document_lock(self.document_id):
+                params = search_parameters(self.index, nprobe=nprobe, ef_search=ef_search)
+                k = min(top_k, self.index.ntotal, len(self.chunks))
+                if k <= 0:
+                    return []
+                distances, indices = self.index.search(query_embedding, k, params=params)
+                
+                # Format results
+                results = []
+                scores = similarity_scores(self.index, distances[0])
+                for score, idx in zip(scores, indices[0]):
+                    # ANN indexes pad with -1 when fewer than top_k candidates were visited
+                    if 0 <= idx < len(self.chunks):
+                        results.append(self.chunks.result(idx, float(score), self.document_id))
             
             print(f"Found {len(results)} similar chunks for query")
             return results
@@ -77,35 +234,96 @@ class VectorStore:
             print(f"Error searching vector index: {e}")
             raise e
     
-    def _save_index(self) -> None:
-        """Save FAISS index and texts to disk"""
-        try:
-            # Save FAISS index
-            faiss.write_index(self.index, self.index_path)
-            
-            # Save texts
-            with open(self.texts_path, 'wb') as f:
-                pickle.dump(self.texts, f)
-                
-            # print(f"Saved vector index to {self.index_path}")
-            
-        except Exception as e:
-            # print(f"Error saving vector index: {e}")
-            raise e
+    def chunk_results(self, hits: List[Tuple[int, float]]) -> List[SearchResult]:
+        """
+        Search results for chunks found by other means (e.g. BM25)
+        Args:
+            hits: (chunk number, score) pairs
+        """
+        if not self.index:
+            self._load_index()
+        if not self.chunks:
+            return []
+        with _document_lock(self.document_id):
+            return [
+                self.chunks.result(row, score, self.document_id)
+                for row, score in hits
+                if 0 <= row < len(self.chunks)
+            ]
+    
+    def bm25_index(self) -> Optional[BM25Index]:
+        """The document's BM25 index, built from the stored chunks for documents indexed before BM25"""
+        with _document_lock(self.document_id):
+            # Loaded together, so a rebuild swapped in meanwhile cannot pair
+            # this BM25 index with the chunks of another build
+            if not self.index:
+                self._load_index()
+            bm25 = load_bm25_index(self.document_id)
+            if bm25 is None and os.path.exists(self.index_path) and self.index:
+                bm25 = BM25Index()
+                bm25.add(self.chunks.texts())
+                save_bm25_index(self.document_id, bm25)
+        return bm25
+    
+    def stored_chunks(self) -> Tuple[List[str], List[dict]]:
+        """The indexed chunk texts and per-chunk metadata, in chunk order"""
+        with _document_lock(self.document_id):
+            if not self.index and not self._load_index():
+                return [], []
+            chunks = self.chunks
+        return chunks.texts(), [chunks.get_metadata(row) for row in range(len(chunks))]
+    
+    def dense_compatible(self) -> bool:
+        """
+        Whether query embeddings of the current model can search this index
+        
+        False for an index built with another embedding model that has not
+        been re-indexed yet; searches then fall back to BM25.
+        """
+        if not self.index:
+            self._load_index()
+        if not self.index:
+            return False
+        if self.manifest is not None and self.manifest.embedding_model != embedding_service.model_name:
+            return False
+        return self.index.d == embedding_service.get_embedding_dimension()
     
     def _load_index(self) -> bool:
-        """Load FAISS index and texts from disk"""
+        """Load FAISS index and chunk store from the shared cache, falling back to disk"""
+        with _document_lock(self.document_id):
+            # Read under the lock that rebuilds swap files under, so the
+            # index, chunks and manifest all come from the same build
+            mtime = _manifest_mtime(self.manifest_path)
+            if _cached_manifests.get(self.document_id, mtime) != mtime:
+                # Rebuilt by another process since it was cached
+                index_cache.invalidate(self.document_id)
+                uncache_bm25_index(self.document_id)
+            _cached_manifests[self.document_id] = mtime
+            self.manifest = read_manifest(self.manifest_path)
+            return self._load_index_files()
+    
+    def _load_index_files(self) -> bool:
+        cached = index_cache.get(self.document_id)
+        if cached is not None:
+            self.index, self.chunks = cached
+            return True
+        
         try:
-            if os.path.exists(self.index_path) and os.path.exists(self.texts_path):
+            if self.exists():
                 # Load FAISS index
                 self.index = faiss.read_index(self.index_path)
                 
-                # Load texts
-                with open(self.texts_path, 'rb') as f:
-                    self.texts = pickle.load(f)
+                # Map chunk texts, only the chunks returned by a search are read
+                self.chunks = ChunkStore(self.chunks_prefix)
+                
+                index_cache.put(self.document_id, self.index, self.chunks, nbytes=self._stored_bytes())
                 
                 # print(f"Loaded vector index from {self.index_path}")
                 return True
+            elif os.path.exists(self.legacy_texts_path):
+                print(f"Vector index for document {self.document_id} uses pickled texts, "
+                      f"it is rebuilt by the re-index job (POST /api/documents/reindex)")
+                return False
             else:
                 print(f"Vector index not found for document {self.document_id}")
                 return False
@@ -114,20 +332,51 @@ class VectorStore:
             print(f"Error loading vector index: {e}")
             return False
     
+    def _stored_bytes(self) -> int:
+        """Resident size of the index and chunk records (chunk texts are memory-mapped)"""
+        return os.path.getsize(self.index_path) + self.chunks.nbytes
+    
     def exists(self) -> bool:
-        """Check if vector index exists for this document"""
-        return os.path.exists(self.index_path) and os.path.exists(self.texts_path)
+        """Check if vector index exists for this document (including one still being built)"""
+        if os.path.exists(self.index_path) and ChunkStore.exists(self.chunks_prefix):
+            return True
+        # Not a lookup for a search, so it must not skew the cache statistics
+        cached = index_cache.peek(self.document_id)
+        return cached is not None and cached[0].ntotal > 0
     
     def delete(self) -> None:
         """Delete vector index files"""
+        index_cache.invalidate(self.document_id)
+        _cached_manifests.pop(self.document_id, None)
         try:
             if os.path.exists(self.index_path):
                 os.remove(self.index_path)
-            if os.path.exists(self.texts_path):
-                os.remove(self.texts_path)
+            ChunkStore.delete(self.chunks_prefix)
+            delete_bm25_index(self.document_id)
+            delete_manifest(self.manifest_path)
+            if os.path.exists(self.legacy_texts_path):
+                os.remove(self.legacy_texts_path)
         except Exception as e:
             print(f"❌ Error deleting vector index: {e}")
 
+def remove_staged_indexes() -> int:
+    """
+    Delete index files left half-written by a build interrupted before its swap
+    Returns: Number of files removed
+    """
+    staged = glob.glob(f"{settings.storage_path}/indexes/*.staged-*")
+    for path in staged:
+        os.remove(path)
+    return len(staged)
+
 def get_vector_store(document_id: int) -> VectorStore:
-    """Factory function to get vector store for a document"""
+    """
+    Factory function to get vector store for a document
+    
+    Stores are cheap to construct; loaded indexes are shared between them
+    through the process-wide index cache. In global mode the returned store
+    is a view onto the shared multi-document index.
+    """
+    if settings.vector_index_mode == "global":
+        return DocumentIndexView(document_id, global_index)
     return VectorStore(document_id)
\ No newline at end of file
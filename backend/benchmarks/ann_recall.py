@@ -0,0 +1,98 @@
+"""
+Recall@k vs latency report for the FAISS index types in app.rag.index_factory
+
+Usage (from the backend directory):
+    python -m benchmarks.ann_recall --vectors 50000
+    python -m benchmarks.ann_recall --pdf storage/uploads/manual.pdf
+"""
+import argparse
+import json
+import time
+import numpy as np
+
+from app.rag.index_factory import build_index, search_parameters
+
+def synthetic_embeddings(num_vectors: int, dimension: int, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, closer to sentence embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, num_vectors // 200), dimension))
+    assignments = rng.integers(0, len(centers), size=num_vectors)
+    vectors = centers[assignments] + 0.35 * rng.normal(size=(num_vectors, dimension))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype('float32')
+
+def pdf_embeddings(pdf_path: str) -> np.ndarray:
+    """Embeddings of a real document's chunks"""
+    from app.documents.service import DocumentService
+    from app.rag.chunking import get_chunker
+    from app.rag.embeddings import embedding_service
+
+    text, _ = DocumentService.extract_text_from_pdf(pdf_path)
+    return embedding_service.create_embeddings(get_chunker().chunk(text), normalize=True)
+
+def evaluate(index, queries: np.ndarray, ground_truth: np.ndarray, k: int, **search_kwargs) -> dict:
+    params = search_parameters(index, **search_kwargs)
+    latencies = []
+    hits = 0
+    for query, truth in zip(queries, ground_truth):
+        start = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k, params=params)
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(ids[0].tolist()) & set(truth.tolist()))
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "recall_at_k": hits / (len(queries) * k),
+        "latency_ms_p50": float(np.percentile(latencies_ms, 50)),
+        "latency_ms_p95": float(np.percentile(latencies_ms, 95)),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20000, help="Synthetic corpus size")
+    parser.add_argument("--dimension", type=int, default=384, help="Synthetic embedding dimension")
+    parser.add_argument("--pdf", help="Use chunks of this PDF instead of synthetic vectors")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    embeddings = pdf_embeddings(args.pdf) if args.pdf else synthetic_embeddings(args.vectors, args.dimension)
+    num_vectors, dimension = embeddings.shape
+    rng = np.random.default_rng(1)
+    # Queries are perturbed corpus vectors so each has true near neighbours
+    queries = embeddings[rng.integers(0, num_vectors, size=args.queries)]
+    queries = (queries + 0.05 * rng.normal(size=queries.shape)).astype('float32')
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    exact = build_index(embeddings, dimension, index_type="flat")
+    _, ground_truth = exact.search(queries, args.k)
+
+    configs = [("flat", {})]
+    configs += [("hnsw", {"ef_search": ef}) for ef in (16, 32, 64, 128, 256)]
+    configs += [("ivf_flat", {"nprobe": n}) for n in (1, 4, 16, 64)]
+    configs += [("ivf_pq", {"nprobe": n}) for n in (4, 16, 64)]
+
+    results = []
+    built = {}
+    for index_type, search_kwargs in configs:
+        if index_type not in built:
+            start = time.perf_counter()
+            built[index_type] = (build_index(embeddings, dimension, index_type=index_type), time.perf_counter() - start)
+        index, build_seconds = built[index_type]
+        result = {"index_type": index_type, **search_kwargs, "build_seconds": build_seconds}
+        result.update(evaluate(index, queries, ground_truth, args.k, **search_kwargs))
+        results.append(result)
+
+    if args.json:
+        print(json.dumps({"vectors": num_vectors, "dimension": dimension, "k": args.k, "results": results}, indent=2))
+        return
+
+    print(f"{num_vectors} vectors, dimension {dimension}, {args.queries} queries, k={args.k}")
+    print(f"{'index':<10}{'param':<16}{'build s':>10}{f'recall@{args.k}':>12}{'p50 ms':>10}{'p95 ms':>10}")
+    for r in results:
+        param = ", ".join(f"{key}={r[key]}" for key in ("nprobe", "ef_search") if key in r) or "-"
+        print(f"{r['index_type']:<10}{param:<16}{r['build_seconds']:>10.2f}{r['recall_at_k']:>12.3f}"
+              f"{r['latency_ms_p50']:>10.3f}{r['latency_ms_p95']:>10.3f}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
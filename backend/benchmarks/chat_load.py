@@ -0,0 +1,123 @@
+"""
+Concurrent-question load test for POST /api/chat/ask
+
+Fires questions at a fixed concurrency and reports throughput and latency
+percentiles.
+
+Against a running server (real Gemini, real document):
+    python -m benchmarks.chat_load --url http://localhost:8000 --document-id 1
+
+In-process, with a synthetic document and the stub LLM backend taking
+--llm-latency-ms per answer, so the event loop behaviour can be measured
+without an API key. --blocking-llm makes the stub block the event loop,
+which is how the synchronous chat path behaved; compare the two runs:
+    python -m benchmarks.chat_load --llm-latency-ms 500 --blocking-llm
+    python -m benchmarks.chat_load --llm-latency-ms 500
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+import numpy as np
+
+QUESTIONS = [
+    "What does the warranty cover?",
+    "How often should the filter be replaced?",
+    "What torque is required for the assembly?",
+    "Which voltage does the pump operate at?",
+]
+
+def setup_in_process(args) -> tuple:
+    """Index a synthetic document and swap in the stub LLM"""
+    from app.main import app
+    from app.core.config import settings
+    from app.core.database import init_db, SessionLocal
+    from app.documents.models import Document
+    from app.rag.vector_store import get_vector_store
+    from app.llm.backends import StubBackend
+    from app.llm.gateway import llm_gateway
+    from benchmarks.embedding_throughput import synthetic_chunks
+
+    class BlockingStubBackend(StubBackend):
+        async def generate(self, prompt):
+            time.sleep(self.latency_seconds)
+            return await StubBackend(0).generate(prompt)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        document = Document(filename="load-test.pdf", original_filename="load-test.pdf",
+                            file_path="", file_size=0, processed=True, chunk_count=args.chunks)
+        db.add(document)
+        db.commit()
+        document_id = document.id
+    finally:
+        db.close()
+    get_vector_store(document_id).create_index(synthetic_chunks(args.chunks))
+
+    backend = BlockingStubBackend if args.blocking_llm else StubBackend
+    llm_gateway.backend = backend(args.llm_latency_ms / 1000)
+    # Measure the chat path itself, not answers served from the cache
+    settings.answer_cache_enabled = False
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load-test"), document_id
+
+async def run(client: httpx.AsyncClient, document_id: int, total: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def ask(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/api/chat/ask", json={
+                "document_id": document_id,
+                "question": QUESTIONS[i % len(QUESTIONS)],
+            }, timeout=None)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(ask(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "questions_per_second": total / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+    }
+
+async def main_async(args):
+    if args.url:
+        client, document_id = httpx.AsyncClient(base_url=args.url), args.document_id
+    else:
+        client, document_id = setup_in_process(args)
+    async with client:
+        return await run(client, document_id, args.requests, args.concurrency)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running server; in-process when omitted")
+    parser.add_argument("--document-id", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--chunks", type=int, default=200, help="In-process: chunks in the synthetic document")
+    parser.add_argument("--llm-latency-ms", type=float, default=500.0, help="In-process: stub LLM latency")
+    parser.add_argument("--blocking-llm", action="store_true", help="In-process: block the event loop like the old sync path")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{results['requests']} questions at concurrency {results['concurrency']}: "
+          f"{results['questions_per_second']:.2f} questions/s, "
+          f"p50 {results['p50_ms']:.0f} ms, p95 {results['p95_ms']:.0f} ms, {results['errors']} errors")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
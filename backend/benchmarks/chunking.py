@@ -0,0 +1,179 @@
+"""
+Chunker throughput and invariants
+
+Chunks synthetic documents with each strategy of app.rag.chunking and with the
+previous character-based chunker, and reports throughput and chunk counts.
+Also checks, for every strategy and exiting non-zero on failure, that:
+  - no chunk exceeds the token budget,
+  - chunks cover every token and start strictly in order,
+  - chunking page by page gives the same chunks as chunking the joined text,
+    and each chunk's char_start/char_end locate it in that text,
+  - the chunk count stays within the bounds set by the minimum stride,
+  - time per token does not grow with document size (linear scan).
+
+Usage (from the backend directory):
+    python -m benchmarks.chunking --tokens 200000
+    python -m benchmarks.chunking --tokenizer model  # the embedding model's tokenizer
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from typing import List
+
+from app.rag.chunking import STRATEGIES, get_chunker
+from app.rag.text_processing import clean_text
+
+WORDS = ("pump valve pressure clause section warranty torque assembly voltage "
+         "operator manual install maintenance replace inspect filter").split()
+
+def synthetic_pages(tokens: int, seed: int = 0, words_per_page: int = 400) -> List[str]:
+    """Prose-like pages: sentences of 5-30 words, with commas and the odd very long run-on"""
+    rng = random.Random(seed)
+    pages, words = [], []
+    count = 0
+    while count < tokens:
+        length = rng.choice([rng.randint(5, 30)] * 19 + [rng.randint(200, 600)])
+        sentence = [rng.choice(WORDS) for _ in range(length)]
+        for i in range(3, length - 1, rng.randint(4, 12)):
+            sentence[i] += ","
+        words.extend(sentence[:-1] + [sentence[-1] + "."])
+        count += length + length // 8 + 1
+        while len(words) >= words_per_page:
+            pages.append(" ".join(words[:words_per_page]))
+            del words[:words_per_page]
+    pages.append(" ".join(words))
+    return pages
+
+def legacy_chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
+    """The previous character-based chunker, for comparison"""
+    text = clean_text(text)
+    if len(text) <= chunk_size:
+        return [text] if text else []
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + chunk_size
+        if end < len(text):
+            sentence_break = text.rfind('.', start, end)
+            if sentence_break > start:
+                end = sentence_break + 1
+            else:
+                word_break = text.rfind(' ', start, end)
+                if word_break > start:
+                    end = word_break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = max(start + 1, end - overlap)
+    return chunks
+
+def check_invariants(chunker, pages: List[str]) -> List[str]:
+    """Violations of the chunker's guarantees on one document"""
+    failures = []
+    document = " ".join(cleaned for cleaned in map(clean_text, pages) if cleaned)
+    tokens = chunker.tokenizer.offsets(document)
+    streamed = list(chunker.chunk_pages(enumerate(pages, 1)))
+    whole = chunker.chunk(document)
+
+    if [chunk for chunk, _ in streamed] != whole:
+        failures.append("page-by-page chunks differ from chunking the joined text")
+
+    token_starts = {start: i for i, (start, _) in enumerate(tokens)}
+    token_ends = {end: i for i, (_, end) in enumerate(tokens)}
+    covered_to, previous_first = 0, -1
+    for chunk, meta in streamed:
+        if document[meta["char_start"]:meta["char_end"]] != chunk:
+            failures.append(f"chunk at {meta['char_start']} does not match its character span")
+            break
+        first, last = token_starts.get(meta["char_start"]), token_ends.get(meta["char_end"])
+        if first is None or last is None:
+            failures.append(f"chunk at {meta['char_start']} does not start and end on tokens")
+            break
+        if last - first + 1 > chunker.chunk_size:
+            failures.append(f"chunk at {meta['char_start']} has {last - first + 1} tokens")
+        if first <= previous_first:
+            failures.append(f"chunk at {meta['char_start']} does not advance")
+        if first > covered_to:
+            failures.append(f"tokens {covered_to}-{first - 1} are not in any chunk")
+        covered_to, previous_first = max(covered_to, last + 1), first
+    if tokens and covered_to != len(tokens):
+        failures.append(f"tokens from {covered_to} are not in any chunk")
+
+    stride = chunker.min_tokens - chunker.overlap if chunker.boundaries else chunker.chunk_size - chunker.overlap
+    most = math.ceil(max(0, len(tokens) - chunker.chunk_size) / stride) + 1
+    least = math.ceil(len(tokens) / chunker.chunk_size)
+    if not least <= len(streamed) <= most:
+        failures.append(f"{len(streamed)} chunks for {len(tokens)} tokens, expected {least}-{most}")
+    return failures
+
+def time_chunker(chunker, pages: List[str]) -> float:
+    start = time.perf_counter()
+    for _ in chunker.chunk_pages(enumerate(pages, 1)):
+        pass
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=200000, help="Approximate tokens in the largest document")
+    parser.add_argument("--tokenizer", default="regex", help="regex or model")
+    parser.add_argument("--chunk-size", type=int, default=128)
+    parser.add_argument("--overlap", type=int, default=16)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    sizes = [args.tokens // 4, args.tokens // 2, args.tokens]
+    documents = {size: synthetic_pages(size) for size in sizes}
+    # Degenerate inputs: no sentence or word boundaries at all, and a single word
+    edge_cases = [["x" * 20000], ["a. " + "b" * 5000 + " c"] * 3, ["word"], ["", "   "]]
+
+    results = {"tokenizer": args.tokenizer, "chunk_size": None, "strategies": {}, "legacy": {}}
+    failures = []
+    for strategy in STRATEGIES:
+        chunker = get_chunker(strategy, args.chunk_size, args.overlap, args.tokenizer)
+        results["chunk_size"] = chunker.chunk_size  # capped at the model's max sequence length
+        for pages in [documents[sizes[0]]] + edge_cases:
+            failures += [f"{strategy}: {failure}" for failure in check_invariants(chunker, pages)]
+
+        runs = []
+        for size in sizes:
+            pages = documents[size]
+            tokens = sum(len(chunker.tokenizer.offsets(clean_text(page))) for page in pages)
+            elapsed = time_chunker(chunker, pages)
+            chunks = sum(1 for _ in chunker.chunk_pages(enumerate(pages, 1)))
+            runs.append({"tokens": tokens, "chunks": chunks, "seconds": elapsed,
+                         "tokens_per_second": tokens / elapsed, "us_per_token": elapsed / tokens * 1e6})
+        # Allow for timer noise; a quadratic scan would be ~4x slower per token at 4x the size
+        if runs[-1]["us_per_token"] > 2 * runs[0]["us_per_token"]:
+            failures.append(f"{strategy}: time per token grows with document size")
+        results["strategies"][strategy] = runs
+
+    text = " ".join(documents[sizes[-1]])
+    start = time.perf_counter()
+    legacy_chunks = legacy_chunk_text(text)
+    elapsed = time.perf_counter() - start
+    results["legacy"] = {"characters": len(text), "chunks": len(legacy_chunks), "seconds": elapsed}
+    results["failures"] = failures
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"tokenizer={args.tokenizer} chunk_size={results['chunk_size']} overlap={args.overlap}")
+        for strategy, runs in results["strategies"].items():
+            for run in runs:
+                print(f"  {strategy:>9}: {run['tokens']:>8} tokens -> {run['chunks']:>6} chunks, "
+                      f"{run['tokens_per_second']:>10.0f} tokens/s ({run['us_per_token']:.2f} us/token)")
+        legacy = results["legacy"]
+        print(f"  {'legacy':>9}: {legacy['characters']:>8} chars  -> {legacy['chunks']:>6} chunks, "
+              f"{legacy['seconds']:.3f} s")
+        for failure in failures:
+            print(f"❌ {failure}")
+        if not failures:
+            print("✅ Invariants hold")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
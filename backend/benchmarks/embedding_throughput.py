@@ -0,0 +1,74 @@
+"""
+Embedding throughput for sizing CPU-only nodes
+
+Encodes synthetic chunks at several batch sizes, and concurrent single-query
+embeddings through the micro-batcher. Backend, precision and torch thread count
+come from the usual settings (EMBEDDING_BACKEND, EMBEDDING_PRECISION,
+EMBEDDING_TORCH_THREADS), so compare configurations by re-running with
+different environment variables.
+
+Usage (from the backend directory):
+    python -m benchmarks.embedding_throughput --chunks 2000
+"""
+import argparse
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import settings
+from app.rag.embeddings import embedding_service
+
+WORDS = ("pump valve pressure clause section warranty torque assembly voltage "
+         "operator manual install maintenance replace inspect filter").split()
+
+def synthetic_chunks(count: int, words_per_chunk: int = 80, seed: int = 0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(words_per_chunk)) + f" #{i}" for i in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--batch-sizes", default="8,32,64,128")
+    parser.add_argument("--queries", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    chunks = synthetic_chunks(args.chunks)
+    embedding_service.create_embeddings(chunks[:8], use_cache=False)  # warm up
+
+    results = {"backend": settings.embedding_backend, "precision": settings.embedding_precision,
+               "torch_threads": settings.embedding_torch_threads, "batch": [], "queries": {}}
+    for batch_size in (int(size) for size in args.batch_sizes.split(",")):
+        settings.embedding_batch_size = batch_size
+        start = time.perf_counter()
+        embedding_service.create_embeddings(chunks, use_cache=False)
+        elapsed = time.perf_counter() - start
+        results["batch"].append({"batch_size": batch_size, "texts_per_second": len(chunks) / elapsed})
+
+    queries = [f"what does section {i} say about {random.choice(WORDS)}" for i in range(args.queries)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(embedding_service.create_single_embedding, queries))
+    elapsed = time.perf_counter() - start
+    stats = embedding_service.stats()
+    results["queries"] = {
+        "concurrency": args.concurrency,
+        "queries_per_second": len(queries) / elapsed,
+        "avg_batch_size": stats["avg_query_batch_size"],
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"backend={results['backend']} precision={results['precision']} torch_threads={results['torch_threads'] or 'default'}")
+    for row in results["batch"]:
+        print(f"  chunks, batch size {row['batch_size']:>4}: {row['texts_per_second']:>9.1f} texts/s")
+    q = results["queries"]
+    print(f"  queries, {q['concurrency']} concurrent: {q['queries_per_second']:>9.1f} queries/s "
+          f"(avg micro-batch {q['avg_batch_size']:.1f})")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,58 @@
+"""
+Import-time budget for the application module
+
+Imports `app.main` in a fresh interpreter with `-X importtime`, reports the
+wall time and the slowest packages pulled in, and exits non-zero when the
+budget is exceeded (so it can gate CI).
+
+Usage (from the backend directory):
+    python -m benchmarks.import_time --budget-ms 2500
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+def measure(module: str):
+    env = dict(os.environ)
+    env.setdefault("GEMINI_API_KEY", "import-time-check")
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if completed.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{completed.stderr}")
+
+    # Lines look like: "import time:  self [us] | cumulative | imported package"
+    packages = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if "." not in name:  # package roots, wherever they were first imported
+            packages[name] = max(packages.get(name, 0), int(cumulative) / 1000)
+    return wall_ms, sorted(((ms, name) for name, ms in packages.items()), reverse=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=2500.0)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    wall_ms, imports = measure(args.module)
+    print(f"import {args.module}: {wall_ms:.0f} ms wall (budget {args.budget_ms:.0f} ms)")
+    for cumulative_ms, name in imports[:args.top]:
+        print(f"  {cumulative_ms:>8.1f} ms  {name}")
+
+    if wall_ms > args.budget_ms:
+        print("❌ Over budget")
+        sys.exit(1)
+    print("✅ Within budget")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
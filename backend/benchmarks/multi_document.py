@@ -0,0 +1,172 @@
+"""
+Multi-document search latency as the number of documents grows
+
+Indexes synthetic documents in a temporary storage directory, then times
+app.rag.multi_document.search_documents over 10, 100 and 1,000 of them with
+the fan-out pool and with a single search thread, and reports p50/p95
+latency. Also checks, exiting non-zero on failure, that merged results hold
+no duplicate chunks and that a part number planted in one document is found
+however many other documents are searched.
+
+Documents are embedded with the configured embedding model.
+
+Usage (from the backend directory):
+    python -m benchmarks.multi_document
+    python -m benchmarks.multi_document --documents 10 100 1000 --chunks-per-document 20
+    python -m benchmarks.multi_document --index-mode global
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+
+PLANTED = "Replace gasket XK-4471 before restarting the pump."
+QUESTIONS = [
+    "What does the warranty cover?",
+    "How often should the filter be replaced?",
+    "What torque is required for the assembly?",
+    "Which gasket is XK-4471?",
+]
+
+def synthetic_chunks(document_id: int, count: int) -> List[str]:
+    from benchmarks.chunking import synthetic_pages
+    pages = synthetic_pages(count * 100, seed=document_id, words_per_page=90)
+    return [f"Document {document_id}. {page}" for page in pages[:count]]
+
+def build_corpus(documents: int, chunks_per_document: int, planted: int) -> None:
+    from app.core.config import settings
+    from app.rag.bm25 import BM25Index, save_bm25_index
+    from app.rag.global_index import global_index
+    from app.rag.vector_store import get_vector_store
+    for document_id in range(1, documents + 1):
+        texts = synthetic_chunks(document_id, chunks_per_document)
+        if document_id == planted:
+            texts[len(texts) // 2] += " " + PLANTED
+        metadata = [{"page": i + 1, "char_start": i * 1000, "char_end": i * 1000 + len(text)}
+                    for i, text in enumerate(texts)]
+        if settings.vector_index_mode == "global":
+            # Write the shared index once at the end rather than after every document
+            global_index.add_document(document_id, texts, persist=False, metadata=metadata)
+            bm25 = BM25Index()
+            bm25.add(texts)
+            save_bm25_index(document_id, bm25)
+        else:
+            get_vector_store(document_id).create_index(texts, metadata)
+    if settings.vector_index_mode == "global":
+        global_index.save()
+
+def check_results(results, top_k: int, question: str, planted: int) -> List[str]:
+    failures = []
+    keys = [(result.document_id, result.chunk_id) for result in results]
+    if len(set(keys)) != len(keys) or len({result.text for result in results}) != len(results):
+        failures.append(f"duplicate chunks for {question!r}")
+    if len(results) > top_k:
+        failures.append(f"{len(results)} results for top_k={top_k}")
+    if "XK-4471" in question and not any(result.document_id == planted and "XK-4471" in result.text
+                                         for result in results):
+        failures.append(f"planted chunk of document {planted} not found")
+    return failures
+
+def time_searches(search_documents, document_ids, embeddings, repeat: int, top_k: int, planted: int):
+    latencies, failures = [], []
+    for _ in range(repeat):
+        for question, embedding in zip(QUESTIONS, embeddings):
+            start = time.perf_counter()
+            results = search_documents(document_ids, question, top_k=top_k, query_embedding=embedding)
+            latencies.append(time.perf_counter() - start)
+            failures += check_results(results, top_k, question, planted)
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "latency_ms_p50": float(np.percentile(latencies_ms, 50)),
+        "latency_ms_p95": float(np.percentile(latencies_ms, 95)),
+    }, sorted(set(failures))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, nargs="+", default=[10, 100, 1000], help="Corpus sizes to search")
+    parser.add_argument("--chunks-per-document", type=int, default=20)
+    parser.add_argument("--index-mode", default="per_document", help="per_document or global")
+    parser.add_argument("--retrieval-mode", default="hybrid", help="dense, sparse or hybrid")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes over the questions per corpus size")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    # Settings are read at import, so point storage at a scratch directory first
+    storage = tempfile.TemporaryDirectory(prefix="multi_document_")
+    os.environ["STORAGE_PATH"] = storage.name
+    os.environ["VECTOR_INDEX_MODE"] = args.index_mode
+    os.environ["RETRIEVAL_MODE"] = args.retrieval_mode
+    os.makedirs(os.path.join(storage.name, "indexes"), exist_ok=True)
+
+    from app.core.config import settings
+    from app.rag import multi_document
+    from app.rag.embeddings import embedding_service
+
+    sizes = sorted(args.documents)
+    planted = random.Random(0).randint(1, sizes[0])
+    quiet = io.StringIO()  # the stores log every index build and search
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(quiet):
+        build_corpus(sizes[-1], args.chunks_per_document, planted)
+    build_seconds = time.perf_counter() - start
+    embeddings = [embedding_service.create_single_embedding(question) for question in QUESTIONS]
+
+    parallel_executor = multi_document._search_executor
+    serial_executor = ThreadPoolExecutor(max_workers=1)
+    results = {
+        "index_mode": settings.vector_index_mode,
+        "retrieval_mode": settings.retrieval_mode,
+        "chunks_per_document": args.chunks_per_document,
+        "workers": settings.multi_document_search_workers,
+        "build_seconds": build_seconds,
+        "runs": [],
+    }
+    failures = []
+    for size in sizes:
+        document_ids = list(range(1, size + 1))
+        row = {"documents": size}
+        for name, executor in (("parallel", parallel_executor), ("serial", serial_executor)):
+            multi_document._search_executor = executor
+            with contextlib.redirect_stdout(quiet):
+                # Warm-up pass loads the indexes, as a long-running server would have
+                multi_document.search_documents(document_ids, QUESTIONS[0], top_k=args.k, query_embedding=embeddings[0])
+                row[name], run_failures = time_searches(
+                    multi_document.search_documents, document_ids, embeddings, args.repeat, args.k, planted
+                )
+            failures += [f"{size} documents, {name}: {failure}" for failure in run_failures]
+        row["speedup_p50"] = row["serial"]["latency_ms_p50"] / row["parallel"]["latency_ms_p50"]
+        results["runs"].append(row)
+    multi_document._search_executor = parallel_executor
+    results["failures"] = failures
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"index_mode={results['index_mode']} retrieval_mode={results['retrieval_mode']} "
+              f"chunks_per_document={args.chunks_per_document} workers={results['workers']} "
+              f"(indexed in {build_seconds:.1f} s)")
+        for row in results["runs"]:
+            print(f"  {row['documents']:>5} documents: "
+                  f"parallel p50 {row['parallel']['latency_ms_p50']:>8.1f} ms  p95 {row['parallel']['latency_ms_p95']:>8.1f} ms | "
+                  f"serial p50 {row['serial']['latency_ms_p50']:>8.1f} ms  p95 {row['serial']['latency_ms_p95']:>8.1f} ms | "
+                  f"{row['speedup_p50']:.2f}x")
+        for failure in failures:
+            print(f"❌ {failure}")
+        if not failures:
+            print("✅ Merged results hold no duplicates and find the planted chunk")
+    storage.cleanup()
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+PDF text extraction: the original page-by-page loop vs page-range workers
+
+Builds a synthetic PDF (or uses --pdf), extracts it with the original
+`text += page.get_text()` loop, the extractor in-process, and the extractor
+with worker processes, checks all three produce the same text, and reports
+pages/sec.
+
+Usage (from the backend directory):
+    python -m benchmarks.pdf_extraction --pages 1500 --workers 4
+    python -m benchmarks.pdf_extraction --pdf storage/uploads/manual.pdf
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+from app.documents.pdf_extraction import PdfExtractor
+from benchmarks.embedding_throughput import WORDS
+
+def synthetic_pdf(path: str, pages: int, lines_per_page: int = 45, seed: int = 0) -> None:
+    """Text-only PDF with a page header and dense body lines"""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        body = "\n".join(" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(lines_per_page))
+        page.insert_text((48, 56), f"Section {page_num + 1}\n{body}", fontsize=9)
+    doc.save(path)
+    doc.close()
+
+def legacy_extract(file_path: str):
+    """The extraction loop as it was before page-range workers"""
+    doc = fitz.open(file_path)
+    text_content = ""
+    page_count = len(doc)
+    for page_num in range(page_count):
+        page = doc.load_page(page_num)
+        text_content += page.get_text()
+        text_content += "\n\n"
+    doc.close()
+    return text_content.strip(), page_count
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="Benchmark an existing PDF instead of a synthetic one")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--pages-per-task", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = args.pdf
+        if not pdf_path:
+            pdf_path = os.path.join(tmp, "synthetic.pdf")
+            synthetic_pdf(pdf_path, args.pages)
+
+        (legacy_text, page_count), legacy_seconds = timed(legacy_extract, pdf_path)
+
+        sequential = PdfExtractor(max_workers=1, pages_per_task=args.pages_per_task, parallel_min_pages=0)
+        sequential_result, sequential_seconds = timed(sequential.extract, pdf_path)
+
+        parallel = PdfExtractor(max_workers=args.workers, pages_per_task=args.pages_per_task, parallel_min_pages=0)
+        parallel._get_executor().submit(int).result()  # start the worker processes outside the timing
+        parallel_result, parallel_seconds = timed(parallel.extract, pdf_path)
+        parallel.shutdown()
+
+    for name, result in (("in-process", sequential_result), ("parallel", parallel_result)):
+        assert result.text == legacy_text, f"{name} extraction differs from the original loop"
+        assert result.page_count == page_count
+        assert result.page_offsets[0] == 0 and result.page_offsets == sorted(result.page_offsets)
+
+    results = {
+        "pages": page_count,
+        "characters": len(legacy_text),
+        "workers": args.workers,
+        "runs": [
+            {"method": "original loop", "seconds": legacy_seconds},
+            {"method": "extractor, in-process", "seconds": sequential_seconds},
+            {"method": f"extractor, {args.workers} workers", "seconds": parallel_seconds},
+        ],
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{page_count} pages, {len(legacy_text):,} characters (identical output)")
+    for run in results["runs"]:
+        print(f"  {run['method']:<26} {run['seconds']:>7.2f} s  {page_count / run['seconds']:>8.0f} pages/s  "
+              f"{legacy_seconds / run['seconds']:>5.1f}x")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,342 @@
+"""
+Retrieval and ingestion benchmark suite on a reproducible offline corpus
+
+Generates seeded synthetic PDFs, so every run indexes the same text, in a
+temporary storage directory and database, then measures each stage of the
+pipeline and reports p50/p95/p99 latency:
+
+    extraction    PDF text extraction, per document
+    chunking      token chunking, per document
+    embedding     chunk embeddings, per document
+    index_build   FAISS index, chunk store and BM25 index built and written, per document
+    index_load    index, chunks and BM25 index loaded from disk, per document
+    search        retrieval for one question, query embedding included
+    chat_ask      POST /api/chat/ask end to end, with the stub LLM
+
+It runs fully offline: embeddings come from the hashing backend
+(EMBEDDING_BACKEND=hashing) and answers from the stub LLM. --model uses the
+configured embedding model instead. Each document has a planted calibration
+code, and the suite exits non-zero if searches for it miss it.
+
+Results can be saved as a baseline that later runs are compared against. A
+comparison exits non-zero when a stage's p50 or p95 is slower than the
+baseline by more than --tolerance (and --min-delta-ms). Baselines only
+compare across runs with the same options on the same machine.
+
+Usage (from the backend directory):
+    python -m benchmarks.suite --save-baseline baseline.json
+    python -m benchmarks.suite --baseline baseline.json
+    python -m benchmarks.suite --documents 50 --pages 40 --json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+QUESTIONS = [
+    "What does the warranty cover?",
+    "How often should the filter be replaced?",
+    "What torque is required for the assembly?",
+    "Which voltage does the pump operate at?",
+]
+COMPARED_METRICS = ("p50_ms", "p95_ms")
+
+def planted_code(document_number: int) -> str:
+    return f"CAL-{document_number:04d}"
+
+def synthetic_corpus(directory: str, documents: int, pages: int, seed: int) -> List[str]:
+    """
+    Seeded text-only PDFs of prose-like pages
+
+    The middle page of each document states its calibration code.
+    Returns: Paths of the PDFs
+    """
+    import fitz  # PyMuPDF
+    from benchmarks.chunking import synthetic_pages
+
+    paths = []
+    for number in range(1, documents + 1):
+        texts = synthetic_pages(pages * 380, seed=seed * 100003 + number, words_per_page=350)[:pages]
+        texts[len(texts) // 2] += f" The calibration code of unit {number} is {planted_code(number)}."
+        doc = fitz.open()
+        for page_num, text in enumerate(texts, start=1):
+            page = doc.new_page()
+            page.insert_textbox(fitz.Rect(48, 48, 564, 744), f"Section {page_num}. {text}", fontsize=8)
+        path = os.path.join(directory, f"synthetic_{number:04d}.pdf")
+        doc.save(path)
+        doc.close()
+        paths.append(path)
+    return paths
+
+def summarize(seconds: List[float], items: Optional[int] = None) -> Dict[str, float]:
+    """Latency percentiles of one stage, and items/sec when the samples process items"""
+    latencies_ms = np.array(seconds) * 1000
+    summary = {
+        "count": len(seconds),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "total_seconds": float(np.sum(seconds)),
+    }
+    if items is not None:
+        summary["items_per_second"] = items / summary["total_seconds"] if summary["total_seconds"] else 0.0
+    return summary
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def register_documents(paths: List[str]) -> List[int]:
+    from app.main import app  # noqa: F401 - imports every model, so init_db creates all tables
+    from app.core.database import init_db, SessionLocal
+    from app.documents.models import Document
+
+    init_db()
+    db = SessionLocal()
+    try:
+        documents = [
+            Document(filename=os.path.basename(path), original_filename=os.path.basename(path),
+                     file_path=path, file_size=os.path.getsize(path))
+            for path in paths
+        ]
+        db.add_all(documents)
+        db.commit()
+        return [document.id for document in documents]
+    finally:
+        db.close()
+
+def mark_processed(document_ids: List[int], chunk_counts: List[int]) -> None:
+    from app.core.database import SessionLocal
+    from app.documents.models import Document
+
+    db = SessionLocal()
+    try:
+        for document_id, chunk_count in zip(document_ids, chunk_counts):
+            document = db.get(Document, document_id)
+            document.processed = True
+            document.chunk_count = chunk_count
+        db.commit()
+    finally:
+        db.close()
+
+def ingest(paths: List[str], document_ids: List[int], stages: Dict[str, list]) -> List[int]:
+    """Run each document through the ingestion stages, timing every stage separately"""
+    from app.documents.pdf_extraction import pdf_extractor
+    from app.rag.chunking import get_chunker
+    from app.rag.embeddings import embedding_service
+    from app.rag.vector_store import get_vector_store
+
+    chunker = get_chunker()
+    embedding_service.create_embeddings(["warm up"], use_cache=False)
+    chunk_counts = []
+    for path, document_id in zip(paths, document_ids):
+        pages, seconds = timed(lambda: list(pdf_extractor.iter_pages(path)))
+        stages["extraction"].append((seconds, len(pages)))
+
+        chunked, seconds = timed(lambda: list(chunker.chunk_pages(pages)))
+        texts = [chunk for chunk, _ in chunked]
+        metadata = [meta for _, meta in chunked]
+        stages["chunking"].append((seconds, len(texts)))
+
+        embeddings, seconds = timed(embedding_service.create_embeddings, texts, use_cache=False)
+        stages["embedding"].append((seconds, len(texts)))
+
+        _, seconds = timed(get_vector_store(document_id).create_index, texts, metadata, embeddings=embeddings)
+        stages["index_build"].append((seconds, len(texts)))
+        chunk_counts.append(len(texts))
+    return chunk_counts
+
+def load_and_search(document_ids: List[int], stages: Dict[str, list], top_k: int) -> List[str]:
+    """Time cold index loads, then searches; returns planted codes that were not retrieved"""
+    from app.rag.hybrid import hybrid_search
+    from app.rag.index_cache import index_cache
+    from app.rag.vector_store import get_vector_store
+
+    index_cache.clear()
+    for document_id in document_ids:
+        _, seconds = timed(get_vector_store(document_id).bm25_index)
+        stages["index_load"].append((seconds, 1))
+
+    missed = []
+    for number, document_id in enumerate(document_ids, start=1):
+        code = planted_code(number)
+        for question in QUESTIONS + [f"What is the calibration code {code}?"]:
+            results, seconds = timed(hybrid_search, get_vector_store(document_id), question, top_k=top_k)
+            stages["search"].append((seconds, 1))
+            if code in question and not any(code in result.text for result in results):
+                missed.append(f"document {number}: {code} not in the top {top_k}")
+    return missed
+
+async def ask_questions(document_ids: List[int], repeat: int, stages: Dict[str, list]) -> int:
+    """Sequential /api/chat/ask requests in-process; returns the number of failed requests"""
+    import httpx
+    from app.main import app
+
+    errors = 0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+        for _ in range(repeat):
+            for document_id in document_ids:
+                for question in QUESTIONS:
+                    start = time.perf_counter()
+                    response = await client.post("/api/chat/ask", json={
+                        "document_id": document_id,
+                        "question": question,
+                    }, timeout=None)
+                    stages["chat_ask"].append((time.perf_counter() - start, 1))
+                    if response.status_code != 200:
+                        errors += 1
+    return errors
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> List[str]:
+    """Stages slower than the baseline by more than tolerance (relative) and min_delta_ms (absolute)"""
+    regressions = []
+    for stage, current in results["stages"].items():
+        previous = baseline["stages"].get(stage)
+        if not previous:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = previous[metric], current[metric]
+            if after > before * (1 + tolerance) and after - before > min_delta_ms:
+                regressions.append(f"{stage} {metric}: {before:.2f} -> {after:.2f} ms ({after / before - 1:+.0%})")
+    return regressions
+
+def print_results(results: dict, baseline: Optional[dict]) -> None:
+    config = results["config"]
+    print(f"{config['documents']} documents x {config['pages']} pages, embeddings: {config['embedding_model']}, "
+          f"index: {config['index_mode']}, retrieval: {config['retrieval_mode']}, seed {config['seed']}")
+    print(f"  {'stage':<12} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'items/s':>10}"
+          + ("   p50 vs baseline" if baseline else ""))
+    for stage, summary in results["stages"].items():
+        line = (f"  {stage:<12} {summary['count']:>6} {summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f} "
+                f"{summary['p99_ms']:>9.2f} {summary.get('items_per_second', 0):>10.1f}")
+        previous = baseline["stages"].get(stage) if baseline else None
+        if previous:
+            line += f"   {summary['p50_ms'] / previous['p50_ms'] - 1:+.0%}"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=20, help="Pages per document")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed")
+    parser.add_argument("-k", type=int, default=5, help="Chunks retrieved per question")
+    parser.add_argument("--chat-repeat", type=int, default=1, help="Passes of /api/chat/ask over every document")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Stub LLM latency added to chat_ask")
+    parser.add_argument("--index-mode", default="per_document", help="per_document or global")
+    parser.add_argument("--model", action="store_true", help="Use the configured embedding model instead of hashing embeddings")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    parser.add_argument("--baseline", help="Compare against results saved with --save-baseline")
+    parser.add_argument("--save-baseline", help="Save the results as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown of p50/p95")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Slowdowns smaller than this never count")
+    args = parser.parse_args()
+
+    # Settings are read at import, so configure the offline environment first
+    workspace = tempfile.TemporaryDirectory(prefix="benchmark_suite_")
+    storage = os.path.join(workspace.name, "storage")
+    os.makedirs(os.path.join(storage, "indexes"))
+    os.environ.update(
+        STORAGE_PATH=storage,
+        DATABASE_URL=f"sqlite:///{workspace.name}/benchmark.db",
+        ASYNC_DATABASE_URL="",
+        VECTOR_INDEX_MODE=args.index_mode,
+        LLM_BACKEND="stub",
+        LLM_STUB_LATENCY_MS=str(args.llm_latency_ms),
+        EMBEDDING_CACHE_ENABLED="false",  # measure encoding, not cache hits
+        ANSWER_CACHE_ENABLED="false",  # measure the chat path, not cached answers
+        WARMUP_ON_STARTUP="false",
+        REINDEX_ON_STARTUP="false",
+    )
+    os.environ.setdefault("GEMINI_API_KEY", "offline")
+    if not args.model:
+        os.environ.update(EMBEDDING_BACKEND="hashing", CHUNK_TOKENIZER="regex")
+
+    from app.core.config import settings
+    from app.rag.embeddings import embedding_service
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    stages: Dict[str, list] = {name: [] for name in (
+        "extraction", "chunking", "embedding", "index_build", "index_load", "search", "chat_ask"
+    )}
+    quiet = io.StringIO()  # the stores log every index build and search
+    with contextlib.redirect_stdout(quiet):
+        paths = synthetic_corpus(workspace.name, args.documents, args.pages, args.seed)
+        document_ids = register_documents(paths)
+        chunk_counts = ingest(paths, document_ids, stages)
+        mark_processed(document_ids, chunk_counts)
+        missed = load_and_search(document_ids, stages, args.k)
+        chat_errors = asyncio.run(ask_questions(document_ids, args.chat_repeat, stages))
+
+    results = {
+        "config": {
+            "documents": args.documents,
+            "pages": args.pages,
+            "seed": args.seed,
+            "top_k": args.k,
+            "chat_repeat": args.chat_repeat,
+            "llm_latency_ms": args.llm_latency_ms,
+            "embedding_model": embedding_service.model_name,
+            "index_mode": settings.vector_index_mode,
+            "retrieval_mode": settings.retrieval_mode,
+            "vector_index_type": settings.vector_index_type,
+            "chunk_strategy": settings.chunk_strategy,
+            "chunk_size_tokens": settings.chunk_size_tokens,
+            "chunk_tokenizer": settings.chunk_tokenizer,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "chunks": int(sum(chunk_counts)),
+        "stages": {},
+        "failures": missed + ([f"{chat_errors} /api/chat/ask requests failed"] if chat_errors else []),
+    }
+    item_counts = {"extraction": "pages", "chunking": "chunks", "embedding": "chunks", "index_build": "chunks"}
+    for stage, samples in stages.items():
+        seconds = [sample[0] for sample in samples]
+        items = sum(sample[1] for sample in samples) if stage in item_counts else len(samples)
+        results["stages"][stage] = summarize(seconds, items)
+
+    failures = list(results["failures"])
+    if baseline:
+        if baseline.get("config") != results["config"]:
+            failures.append("baseline was measured with other options, re-run with the same ones or save a new baseline")
+        else:
+            results["regressions"] = compare(results, baseline, args.tolerance, args.min_delta_ms)
+            failures += [f"regression: {regression}" for regression in results["regressions"]]
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results, baseline if baseline and baseline.get("config") == results["config"] else None)
+        for failure in failures:
+            print(f"❌ {failure}")
+        if not failures:
+            print("✅ Planted codes retrieved" + (", no regressions against the baseline" if baseline else ""))
+    workspace.cleanup()
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
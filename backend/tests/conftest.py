@@ -0,0 +1,21 @@
+"""
+Test settings: everything runs offline against a throwaway storage directory
+
+The environment is set before anything imports app.core.config, which reads
+it once (and creates the storage directories) at import time.
+"""
+import os
+import tempfile
+
+_storage = tempfile.mkdtemp(prefix="pdfqa-tests-")
+
+os.environ.update({
+    "GEMINI_API_KEY": "test",
+    "STORAGE_PATH": _storage,
+    "DATABASE_URL": f"sqlite:///{_storage}/app.db",
+    "LLM_BACKEND": "stub",
+    "EMBEDDING_BACKEND": "hashing",
+    "CHUNK_TOKENIZER": "regex",
+    "WARMUP_ON_STARTUP": "false",
+    "REINDEX_ON_STARTUP": "false",
+})
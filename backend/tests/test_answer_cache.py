@@ -0,0 +1,92 @@
+import math
+import numpy as np
+import pytest
+
+from app.chat import answer_cache as answer_cache_module
+from app.chat.answer_cache import AnswerCache
+
+def unit(angle_degrees: float) -> np.ndarray:
+    """Unit vector whose cosine similarity to unit(0) is cos(angle)"""
+    angle = math.radians(angle_degrees)
+    return np.array([math.cos(angle), math.sin(angle), 0.0], dtype='float32')
+
+def angle_for(similarity: float) -> float:
+    return math.degrees(math.acos(similarity))
+
+def make_cache(**overrides) -> AnswerCache:
+    options = {"max_entries": 10, "ttl_seconds": 0, "min_similarity": 0.95}
+    options.update(overrides)
+    cache = AnswerCache(**options)
+    cache.put(1, "What is the pump pressure?", unit(0), "120 psi", 3)
+    return cache
+
+def test_hit_at_or_above_threshold():
+    cache = make_cache()
+
+    exact = cache.get(1, unit(0))
+    assert exact is not None and exact.answer == "120 psi"
+    assert cache.get(1, unit(angle_for(0.96))) is not None
+    assert cache.stats()["hits"] == 2
+
+def test_miss_below_threshold():
+    cache = make_cache()
+
+    assert cache.get(1, unit(angle_for(0.94))) is None
+    assert cache.get(1, unit(90)) is None
+    assert cache.stats()["misses"] == 2
+
+@pytest.mark.parametrize("threshold,hit", [(0.8, True), (0.9, False)])
+def test_threshold_is_configurable(threshold, hit):
+    cache = make_cache(min_similarity=threshold)
+    assert (cache.get(1, unit(angle_for(0.85))) is not None) == hit
+
+def test_closest_cached_question_wins():
+    cache = make_cache(min_similarity=0.5)
+    cache.put(1, "What is the rated torque?", unit(40), "45 Nm", 2)
+
+    assert cache.get(1, unit(30)).answer == "45 Nm"
+    assert cache.get(1, unit(5)).answer == "120 psi"
+
+def test_entries_are_scoped_to_their_document():
+    cache = make_cache()
+
+    assert cache.get(2, unit(0)) is None
+    cache.invalidate_document(1)
+    assert cache.get(1, unit(0)) is None
+    assert cache.stats()["entries"] == 0
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache_module.time, "monotonic", lambda: now[0])
+    cache = make_cache(ttl_seconds=60)
+
+    now[0] += 59
+    assert cache.get(1, unit(0)) is not None
+    now[0] += 2
+    assert cache.get(1, unit(0)) is None
+
+def test_least_recently_used_entry_is_evicted():
+    cache = make_cache(max_entries=2, min_similarity=0.99)
+    cache.put(1, "torque?", unit(45), "45 Nm", 2)
+    cache.get(1, unit(0))  # the pump answer is now the most recently used
+    cache.put(1, "warranty?", unit(90), "two years", 1)
+
+    assert cache.get(1, unit(45)) is None
+    assert cache.get(1, unit(0)) is not None
+    assert cache.stats()["evictions"] == 1
+
+def test_zero_max_entries_disables_caching():
+    cache = make_cache(max_entries=0)
+    assert cache.get(1, unit(0)) is None
+    assert cache.stats()["entries"] == 0
+
+def test_answer_from_an_invalidated_index_is_not_cached():
+    cache = make_cache()
+    generation = cache.generation(1)  # read when retrieval starts
+    cache.invalidate_document(1)  # ingestion finalizes the index meanwhile
+
+    cache.put(1, "What is the rated torque?", unit(60), "partial answer", 1, generation=generation)
+    assert cache.get(1, unit(60)) is None
+
+    cache.put(1, "What is the rated torque?", unit(60), "45 Nm", 2, generation=cache.generation(1))
+    assert cache.get(1, unit(60)).answer == "45 Nm"
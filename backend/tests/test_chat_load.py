@@ -0,0 +1,58 @@
+import argparse
+import asyncio
+import time
+import pytest
+
+from app.core.config import settings
+from app.llm.gateway import llm_gateway
+from benchmarks.chat_load import QUESTIONS, setup_in_process
+
+LLM_LATENCY_SECONDS = 0.25
+REQUESTS = 32
+
+@pytest.fixture
+def chat_client(monkeypatch):
+    """In-process client and an indexed synthetic document, answered by the stub LLM"""
+    # setup_in_process swaps these globals; restore them afterwards
+    monkeypatch.setattr(settings, "answer_cache_enabled", settings.answer_cache_enabled)
+    monkeypatch.setattr(llm_gateway, "_backend", llm_gateway._backend)
+    args = argparse.Namespace(chunks=200, blocking_llm=False, llm_latency_ms=LLM_LATENCY_SECONDS * 1000)
+    return setup_in_process(args)
+
+async def _ask_concurrently(client, document_id):
+    """Fire REQUESTS distinct questions at once while measuring event loop lag"""
+    lags = []
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - start - 0.01)
+
+    async def ask(i):
+        # Distinct questions, so the gateway cannot coalesce them into one call
+        question = f"{QUESTIONS[i % len(QUESTIONS)]} (#{i})"
+        return await client.post("/api/chat/ask", json={"document_id": document_id, "question": question}, timeout=None)
+
+    async with client:
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(ask(i) for i in range(REQUESTS)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+        history = await client.get(f"/api/chat/history/{document_id}", params={"limit": REQUESTS * 2})
+    return responses, elapsed, lags, history
+
+def test_concurrent_questions_overlap_their_llm_calls(chat_client):
+    client, document_id = chat_client
+    responses, elapsed, lags, history = asyncio.run(_ask_concurrently(client, document_id))
+
+    assert [response.status_code for response in responses] == [200] * REQUESTS
+    assert all(response.json()["answer"].startswith("Stub answer") for response in responses)
+    # Serially the LLM alone would take REQUESTS * latency (8s); concurrent calls overlap
+    assert elapsed < REQUESTS * LLM_LATENCY_SECONDS / 4
+    # Waiting on the LLM never blocks the event loop for a whole call
+    assert max(lags) < LLM_LATENCY_SECONDS
+    assert history.json()["total"] == REQUESTS
@@ -0,0 +1,110 @@
+import random
+import pytest
+
+from app.rag.chunking import STRATEGIES, Chunker, RegexTokenizer, get_chunker
+from app.rag.embeddings import embedding_service
+from app.rag.text_processing import clean_text
+
+WORDS = ["pump", "valve", "pressure", "torque", "filter", "assembly", "the", "of", "is", "at", "120", "psi", "M8x1.25"]
+
+def synthetic_pages(pages: int = 6, seed: int = 7):
+    """Pages of sentences with clause punctuation and a few very long words"""
+    rng = random.Random(seed)
+    result = []
+    for page in range(1, pages + 1):
+        sentences = []
+        for _ in range(rng.randint(5, 25)):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(3, 30))]
+            if rng.random() < 0.3:
+                words.insert(rng.randrange(len(words)), "x" * rng.randint(40, 120))
+            if rng.random() < 0.5:
+                words[rng.randrange(len(words))] += ","
+            sentences.append(" ".join(words).capitalize() + rng.choice(".!?"))
+        result.append((page, "  ".join(sentences) + "\n"))
+    return result
+
+def document_text(pages):
+    """The cleaned text chunk offsets refer to"""
+    return " ".join(cleaned for cleaned in (clean_text(text) for _, text in pages) if cleaned)
+
+def token_count(text: str) -> int:
+    return len(RegexTokenizer().offsets(text))
+
+@pytest.mark.parametrize("strategy", list(STRATEGIES))
+@pytest.mark.parametrize("chunk_size,overlap", [(16, 0), (32, 5), (64, 15)])
+def test_chunks_respect_size_overlap_and_offsets(strategy, chunk_size, overlap):
+    pages = synthetic_pages()
+    text = document_text(pages)
+    chunker = Chunker(RegexTokenizer(), chunk_size, overlap, strategy)
+    chunks = list(chunker.chunk_pages(pages))
+
+    assert chunks
+    for chunk, metadata in chunks:
+        assert token_count(chunk) <= chunk_size
+        assert text[metadata["char_start"]:metadata["char_end"]] == chunk
+
+    # Chunks cover the whole text in order (skipping at most whitespace), each
+    # overlapping the previous by at most `overlap` tokens
+    assert chunks[0][1]["char_start"] == 0
+    assert chunks[-1][1]["char_end"] == len(text)
+    for (_, previous), (_, current) in zip(chunks, chunks[1:]):
+        assert previous["char_start"] < current["char_start"]
+        assert not text[previous["char_end"]:current["char_start"]].strip()
+        shared = text[current["char_start"]:previous["char_end"]]
+        assert token_count(shared) <= overlap
+
+def test_overlap_is_kept_between_chunks():
+    pages = synthetic_pages()
+    text = document_text(pages)
+    chunks = list(Chunker(RegexTokenizer(), 32, 5, "fixed").chunk_pages(pages))
+
+    for (_, previous), (_, current) in zip(chunks, chunks[1:]):
+        assert token_count(text[current["char_start"]:previous["char_end"]]) == 5
+
+def test_chunks_record_their_start_page():
+    pages = synthetic_pages()
+    page_starts, offset = [], 0
+    for page_number, page_text in pages:
+        page_starts.append((offset, page_number))
+        offset += len(clean_text(page_text)) + 1
+
+    for _, metadata in Chunker(RegexTokenizer(), 32, 5).chunk_pages(pages):
+        expected = [page for start, page in page_starts if start <= metadata["char_start"]][-1]
+        assert metadata["page"] == expected
+
+def test_chunk_matches_chunk_pages_on_single_text():
+    text = synthetic_pages(1)[0][1]
+    chunker = Chunker(RegexTokenizer(), 24, 4)
+    assert chunker.chunk(text) == [chunk for chunk, _ in chunker.chunk_pages([(1, text)])]
+
+def test_invalid_overlap_is_rejected():
+    with pytest.raises(ValueError):
+        Chunker(RegexTokenizer(), 16, 8)
+
+class _FastTokenizer:
+    """Stands in for a Hugging Face fast tokenizer, splitting like the regex tokenizer"""
+    is_fast = True
+
+    def __call__(self, text, **kwargs):
+        return {"offset_mapping": RegexTokenizer().offsets(text)}
+
+class _Model:
+    tokenizer = _FastTokenizer()
+    max_seq_length = 34
+
+def test_model_tokenizer_caps_chunks_at_max_seq_length(monkeypatch):
+    monkeypatch.setattr(embedding_service, "_model", _Model())
+    chunker = get_chunker(chunk_size=256, overlap=10, tokenizer="model")
+
+    assert chunker.chunk_size == _Model.max_seq_length - 2
+    for chunk, _ in chunker.chunk_pages(synthetic_pages()):
+        assert token_count(chunk) <= _Model.max_seq_length - 2
+
+def test_model_tokenizer_clamps_overlap_with_the_chunk_size(monkeypatch):
+    monkeypatch.setattr(embedding_service, "_model", _Model())
+    # Valid for 256-token chunks, but not for the 32 the model reads
+    chunker = get_chunker(chunk_size=256, overlap=60, tokenizer="model")
+
+    assert chunker.chunk_size == 32
+    assert chunker.overlap == 15
+    assert list(chunker.chunk_pages(synthetic_pages()))
@@ -0,0 +1,34 @@
+import pytest
+
+from app.core.config import settings
+from app.rag.embeddings import embedding_service
+from app.rag.manifest import current_manifest, stale_reason
+
+@pytest.fixture
+def model_settings(monkeypatch):
+    monkeypatch.setattr(settings, "embedding_model", "all-MiniLM-L6-v2")
+    monkeypatch.setattr(settings, "embedding_backend", "torch")
+    monkeypatch.setattr(settings, "embedding_precision", "fp32")
+
+    def configure(backend, precision):
+        monkeypatch.setattr(settings, "embedding_backend", backend)
+        monkeypatch.setattr(settings, "embedding_precision", precision)
+    return configure
+
+@pytest.mark.parametrize("backend,precision,name", [
+    ("torch", "fp32", "all-MiniLM-L6-v2"),
+    ("torch", "fp16", "all-MiniLM-L6-v2@torch-fp16"),
+    ("torch", "int8", "all-MiniLM-L6-v2@torch-int8"),
+    ("onnx", "fp32", "all-MiniLM-L6-v2@onnx-fp32"),
+])
+def test_model_name_includes_backend_and_precision(model_settings, backend, precision, name):
+    model_settings(backend, precision)
+    assert embedding_service.model_name == name
+
+def test_precision_switch_marks_indexes_stale(model_settings):
+    built = current_manifest(384)
+
+    model_settings("torch", "int8")
+    assert stale_reason(built, current_manifest(384)) == "embedding"
+    model_settings("torch", "fp32")
+    assert stale_reason(built, current_manifest(384)) is None
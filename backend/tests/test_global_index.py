@@ -0,0 +1,32 @@
+from app.rag.global_index import DocumentIndexView, GlobalVectorIndex
+
+DOCUMENT_ID = 990005
+OTHER_DOCUMENT_ID = 990006
+
+def test_reingest_after_crash_drops_unsaved_chunks():
+    index = GlobalVectorIndex("crash_test")
+    index.add_document(OTHER_DOCUMENT_ID, ["other document"])
+    # Ingestion appends to the chunk store, then the process dies before the index is saved
+    index.append_chunks(DOCUMENT_ID, ["stale zero", "stale one", "stale two"])
+
+    restarted = GlobalVectorIndex("crash_test")
+    assert DOCUMENT_ID not in restarted.document_ids()
+    view = DocumentIndexView(DOCUMENT_ID, restarted)
+    view.begin_index()
+    view.append_chunks(["fresh zero"])
+    view.finalize_index()
+
+    assert restarted.document_contents(DOCUMENT_ID)[0] == ["fresh zero"]
+    assert restarted.document_contents(OTHER_DOCUMENT_ID)[0] == ["other document"]
+    assert restarted.index.ntotal == 2
+    view.delete()
+
+def test_removing_an_unknown_document_is_a_no_op():
+    index = GlobalVectorIndex("remove_test")
+    index.add_document(OTHER_DOCUMENT_ID, ["other document"])
+    versions = dict(index.document_versions)
+
+    index.remove_document(DOCUMENT_ID)
+
+    assert index.document_versions == versions
+    assert index.document_contents(OTHER_DOCUMENT_ID)[0] == ["other document"]
@@ -0,0 +1,133 @@
+import pytest
+
+from app.chat.service import ChatService
+from app.core.config import settings
+from app.rag.bm25 import BM25Index, tokenize
+from app.rag.chunk_store import SearchResult
+from app.rag.hybrid import hybrid_search, reciprocal_rank_fusion
+from app.rag.vector_store import get_vector_store
+
+CHUNKS = [
+    "The pump operates at 120 psi under normal load.",
+    "Replace the intake filter every 500 operating hours.",
+    "Valve AB-1234 must be torqued to 45 Nm during assembly.",
+    "The warranty covers manufacturing defects for two years.",
+    "Filter housings are sealed with an O-ring; inspect the filter seal yearly.",
+]
+
+def test_rrf_sums_weighted_reciprocal_ranks():
+    fused = dict(reciprocal_rank_fusion([[1, 2, 3], [3, 4]], [1.0, 2.0], k=10))
+
+    assert fused[1] == pytest.approx(1 / 11)
+    assert fused[2] == pytest.approx(1 / 12)
+    assert fused[3] == pytest.approx(1 / 13 + 2 / 11)
+    assert fused[4] == pytest.approx(2 / 12)
+
+def test_rrf_orders_best_first_and_favours_agreement():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 2, 5]], [1.0, 1.0])
+
+    assert [key for key, _ in fused][:2] in ([2, 3], [3, 2])
+    assert [score for _, score in fused] == sorted((score for _, score in fused), reverse=True)
+
+def test_rrf_zero_weight_ignores_a_ranking():
+    fused = reciprocal_rank_fusion([[1, 2], [2, 1]], [1.0, 0.0])
+    assert [key for key, _ in fused] == [1, 2]
+
+def test_tokenize_keeps_identifiers_whole_and_split():
+    terms = tokenize("Valve AB-1234 is the part")
+    assert "ab-1234" in terms and "ab" in terms and "1234" in terms
+    assert "the" not in terms and "is" not in terms
+
+def test_bm25_ranks_matching_chunks_only():
+    index = BM25Index()
+    index.add(CHUNKS)
+
+    hits = index.search("filter seal", top_k=5)
+    assert [row for row, _ in hits] == [4, 1]
+    assert hits[0][1] > hits[1][1] > 0
+    assert index.search("AB-1234")[0][0] == 2
+    assert index.search("nothing here matches") == []
+
+def test_bm25_save_load_round_trip(tmp_path):
+    index = BM25Index()
+    index.add(CHUNKS)
+    path = str(tmp_path / "doc.bm25.npz")
+    index.save(path)
+
+    loaded = BM25Index.load(path)
+    assert len(loaded) == len(index)
+    for query in ("filter seal", "AB-1234", "warranty defects"):
+        assert loaded.search(query) == pytest.approx(index.search(query))
+
+    # Chunks appended after loading are searchable too
+    loaded.add(["A spare AB-1234 valve ships with the kit."])
+    assert {row for row, _ in loaded.search("AB-1234")} == {2, 5}
+
+class _FakeStore:
+    """Fixed dense ranking over CHUNKS, with a real BM25 index"""
+    document_id = 1
+
+    def __init__(self, dense_rows):
+        self.dense_rows = dense_rows
+        self.bm25 = BM25Index()
+        self.bm25.add(CHUNKS)
+
+    def bm25_index(self):
+        return self.bm25
+
+    def dense_compatible(self):
+        return True
+
+    def search(self, query, top_k=5, query_embedding=None):
+        return [self._result(row, 0.9 - 0.1 * rank) for rank, row in enumerate(self.dense_rows[:top_k])]
+
+    def chunk_results(self, hits):
+        return [self._result(row, score) for row, score in hits]
+
+    def _result(self, row, score):
+        return SearchResult(text=CHUNKS[row], score=score, document_id=self.document_id, chunk_id=row)
+
+def test_hybrid_search_fuses_dense_and_bm25(monkeypatch):
+    monkeypatch.setattr(settings, "retrieval_mode", "hybrid")
+    results = hybrid_search(_FakeStore([0, 3, 2]), "AB-1234 torque", top_k=3)
+
+    # Ranked by both retrievers, the valve chunk overtakes the dense favourite
+    assert results[0].chunk_id == 2
+    assert results[0].similarity is not None and results[0].bm25_score > 0
+    dense_only = next(result for result in results if result.chunk_id == 0)
+    assert dense_only.bm25_score is None and dense_only.similarity == pytest.approx(0.9)
+    assert [result.score for result in results] == sorted((result.score for result in results), reverse=True)
+
+def test_hybrid_search_modes(monkeypatch):
+    store = _FakeStore([0, 3, 2])
+
+    monkeypatch.setattr(settings, "retrieval_mode", "dense")
+    assert [result.chunk_id for result in hybrid_search(store, "AB-1234", top_k=3)] == [0, 3, 2]
+
+    monkeypatch.setattr(settings, "retrieval_mode", "sparse")
+    results = hybrid_search(store, "AB-1234", top_k=3)
+    assert [result.chunk_id for result in results] == [2]
+    assert results[0].similarity is None
+
+def test_hybrid_search_finds_identifier_in_real_index(monkeypatch):
+    monkeypatch.setattr(settings, "retrieval_mode", "hybrid")
+    store = get_vector_store(990001)
+    store.create_index(CHUNKS)
+    try:
+        results = hybrid_search(store, "AB-1234", top_k=3)
+        assert results[0].text == CHUNKS[2]
+        assert results[0].bm25_score > 0
+    finally:
+        store.delete()
+
+def test_relevant_keeps_only_strong_bm25_matches(monkeypatch):
+    monkeypatch.setattr(settings, "retrieval_min_similarity", 0.5)
+    monkeypatch.setattr(settings, "retrieval_min_bm25_ratio", 0.5)
+    results = [
+        SearchResult(text="dense", score=0.0, similarity=0.8),
+        SearchResult(text="best bm25", score=0.0, similarity=0.1, bm25_score=10.0),
+        SearchResult(text="close bm25", score=0.0, bm25_score=6.0),
+        SearchResult(text="weak bm25", score=0.0, similarity=0.1, bm25_score=1.0),
+        SearchResult(text="weak dense", score=0.0, similarity=0.3),
+    ]
+    assert [result.text for result in ChatService._relevant(results)] == ["dense", "best bm25", "close bm25"]
@@ -0,0 +1,22 @@
+from app.rag.index_cache import IndexCache, index_cache
+from app.rag.vector_store import VectorStore
+
+def test_peek_and_contains_leave_stats_and_order_alone():
+    cache = IndexCache(max_bytes=100)
+    cache.put("a", "index a", None, nbytes=40)
+    cache.put("b", "index b", None, nbytes=40)
+
+    assert cache.peek("a") == ("index a", None)
+    assert cache.peek("missing") is None
+    assert "a" in cache and "missing" not in cache
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (0, 0)
+
+    # "a" is still the least recently used entry and goes first
+    cache.put("c", "index c", None, nbytes=40)
+    assert "a" not in cache and "b" in cache
+
+def test_exists_does_not_count_as_a_cache_lookup():
+    before = index_cache.stats()
+    assert not VectorStore(990010).exists()
+    after = index_cache.stats()
+    assert (after["hits"], after["misses"]) == (before["hits"], before["misses"])
@@ -0,0 +1,176 @@
+import asyncio
+import pytest
+
+from app.core.config import settings
+from app.llm import gateway as gateway_module
+from app.llm.backends import LLMResult, RateLimitError
+from app.llm.gateway import MAX_RETRY_DELAY_SECONDS, LLMGateway
+
+# Kept before the backoff fixture patches asyncio.sleep
+_real_sleep = asyncio.sleep
+
+class FakeBackend:
+    """Counts calls; rate-limits the first `rate_limited` of them"""
+    name = "fake"
+
+    def __init__(self, rate_limited: int = 0, latency: float = 0.0, error: Exception = None):
+        self.rate_limited = rate_limited
+        self.latency = latency
+        self.error = error
+        self.calls = 0
+        self.concurrent = 0
+        self.max_concurrent = 0
+
+    async def generate(self, prompt: str) -> LLMResult:
+        self.calls += 1
+        self.concurrent += 1
+        self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        try:
+            await _real_sleep(self.latency)
+            if self.error is not None:
+                raise self.error
+            if self.calls <= self.rate_limited:
+                raise RateLimitError("429 quota exceeded")
+            return LLMResult(text=f"answer to {prompt}", prompt_tokens=10, output_tokens=5)
+        finally:
+            self.concurrent -= 1
+
+    async def stream(self, prompt: str):
+        self.calls += 1
+        if self.calls <= self.rate_limited:
+            raise RateLimitError("429 quota exceeded")
+        for word in ("streamed", " answer"):
+            yield LLMResult(text=word)
+        yield LLMResult(text="", prompt_tokens=10, output_tokens=2)
+
+@pytest.fixture
+def backoff_delays(monkeypatch):
+    """Backoff sleeps recorded instead of waited, with the jitter at its maximum"""
+    delays = []
+
+    async def sleep(seconds, *args, **kwargs):
+        delays.append(seconds)
+        await _real_sleep(0)
+
+    monkeypatch.setattr(gateway_module.asyncio, "sleep", sleep)
+    monkeypatch.setattr(gateway_module.random, "uniform", lambda low, high: high)
+    monkeypatch.setattr(settings, "llm_retry_base_delay_seconds", 1.0)
+    monkeypatch.setattr(settings, "llm_max_retries", 3)
+    return delays
+
+def test_rate_limited_calls_retry_with_exponential_backoff(backoff_delays):
+    backend = FakeBackend(rate_limited=2)
+    gateway = LLMGateway(backend)
+
+    result = asyncio.run(gateway.generate("pump pressure?"))
+
+    assert result.text == "answer to pump pressure?"
+    assert backend.calls == 3
+    assert backoff_delays == [1.0, 2.0]
+    assert (gateway.retries, gateway.rate_limited, gateway.failures, gateway.calls) == (2, 2, 0, 1)
+
+def test_backoff_is_capped(backoff_delays, monkeypatch):
+    monkeypatch.setattr(settings, "llm_retry_base_delay_seconds", 20.0)
+    gateway = LLMGateway(FakeBackend(rate_limited=3))
+
+    asyncio.run(gateway.generate("pump pressure?"))
+
+    assert backoff_delays == [20.0, MAX_RETRY_DELAY_SECONDS, MAX_RETRY_DELAY_SECONDS]
+
+def test_jitter_stays_within_the_backoff_window(monkeypatch):
+    windows = []
+    monkeypatch.setattr(gateway_module.random, "uniform", lambda low, high: windows.append((low, high)) or 0.0)
+    monkeypatch.setattr(settings, "llm_retry_base_delay_seconds", 0.5)
+    gateway = LLMGateway(FakeBackend(rate_limited=2))
+
+    asyncio.run(gateway.generate("pump pressure?"))
+
+    assert windows == [(0, 0.5), (0, 1.0)]
+
+def test_retries_are_exhausted(backoff_delays):
+    backend = FakeBackend(rate_limited=100)
+    gateway = LLMGateway(backend)
+
+    with pytest.raises(RateLimitError):
+        asyncio.run(gateway.generate("pump pressure?"))
+
+    assert backend.calls == settings.llm_max_retries + 1
+    assert len(backoff_delays) == settings.llm_max_retries
+    assert gateway.failures == 1
+
+def test_other_errors_are_not_retried(backoff_delays):
+    backend = FakeBackend(error=ValueError("bad prompt"))
+    gateway = LLMGateway(backend)
+
+    with pytest.raises(ValueError):
+        asyncio.run(gateway.generate("pump pressure?"))
+
+    assert backend.calls == 1
+    assert backoff_delays == []
+    assert gateway.failures == 1
+
+def test_stream_retries_until_the_first_text(backoff_delays):
+    backend = FakeBackend(rate_limited=1)
+    gateway = LLMGateway(backend)
+
+    async def consume():
+        return "".join([delta async for delta in gateway.stream("pump pressure?")])
+
+    assert asyncio.run(consume()) == "streamed answer"
+    assert backend.calls == 2
+    assert gateway.retries == 1
+    assert gateway.output_tokens == 2
+
+def test_identical_in_flight_prompts_share_one_call():
+    backend = FakeBackend(latency=0.05)
+    gateway = LLMGateway(backend)
+
+    async def ask_all():
+        return await asyncio.gather(*(gateway.generate("pump pressure?") for _ in range(5)))
+
+    results = asyncio.run(ask_all())
+
+    assert backend.calls == 1
+    assert gateway.coalesced == 4
+    assert {result.text for result in results} == {"answer to pump pressure?"}
+    assert gateway._inflight == {}
+
+def test_distinct_and_later_prompts_are_not_coalesced():
+    backend = FakeBackend(latency=0.01)
+    gateway = LLMGateway(backend)
+
+    async def ask():
+        await asyncio.gather(gateway.generate("pump pressure?"), gateway.generate("valve torque?"))
+        await gateway.generate("pump pressure?")
+
+    asyncio.run(ask())
+
+    assert backend.calls == 3
+    assert gateway.coalesced == 0
+
+def test_coalesced_callers_survive_one_caller_cancelling():
+    backend = FakeBackend(latency=0.05)
+    gateway = LLMGateway(backend)
+
+    async def ask():
+        first = asyncio.ensure_future(gateway.generate("pump pressure?"))
+        second = asyncio.ensure_future(gateway.generate("pump pressure?"))
+        await _real_sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(ask()).text == "answer to pump pressure?"
+    assert backend.calls == 1
+
+def test_concurrent_calls_are_capped(monkeypatch):
+    monkeypatch.setattr(settings, "llm_max_concurrency", 2)
+    backend = FakeBackend(latency=0.02)
+    gateway = LLMGateway(backend)
+
+    async def ask_all():
+        await asyncio.gather(*(gateway.generate(f"question {i}") for i in range(6)))
+
+    asyncio.run(ask_all())
+
+    assert backend.calls == 6
+    assert backend.max_concurrent == 2
@@ -0,0 +1,39 @@
+import os
+import pickle
+
+from app.core.config import settings
+from app.core.database import SessionLocal, init_db
+from app.documents.models import Document
+from app.documents.reindex import ReindexReport, find_stale, reindex
+from app.rag.vector_store import get_vector_store, legacy_texts_path
+from benchmarks.pdf_extraction import synthetic_pdf
+
+def test_document_with_only_a_pickled_index_is_rebuilt_from_its_pdf():
+    init_db()
+    pdf_path = f"{settings.storage_path}/uploads/legacy.pdf"
+    synthetic_pdf(pdf_path, 2)
+    db = SessionLocal()
+    try:
+        document = Document(filename="legacy.pdf", original_filename="legacy.pdf", file_path=pdf_path,
+                            file_size=os.path.getsize(pdf_path), processed=True, chunk_count=1)
+        db.add(document)
+        db.commit()
+        document_id = document.id
+        with open(legacy_texts_path(document_id), "wb") as f:
+            pickle.dump(["chunk pickled by an older version"], f)
+
+        assert not get_vector_store(document_id).exists()
+        _, stale = find_stale(db, ReindexReport())
+        assert [(document.id, reason) for document, _, reason in stale if document.id == document_id] == [
+            (document_id, "legacy")
+        ]
+    finally:
+        db.close()
+
+    report = reindex(throttle=1)
+
+    assert report.reasons.get("legacy") == 1 and report.failed == 0
+    store = get_vector_store(document_id)
+    assert store.exists()
+    assert "chunk pickled by an older version" not in store.stored_chunks()[0]
+    assert not os.path.exists(legacy_texts_path(document_id))
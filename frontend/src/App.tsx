@@ -38,10 +38,18 @@ function App() {
     try {
       const uploadResponse = await documentsApi.upload(file);
       await loadDocuments(); // Refresh document list
-      
+
+      // Processing runs in the background, poll until it finishes
+      let status = await documentsApi.getStatus(uploadResponse.document_id);
+      while (status.status === 'queued' || status.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        status = await documentsApi.getStatus(uploadResponse.document_id);
+      }
+
       // Find and select the uploaded document
-      const newDoc = documents.find(doc => doc.id === uploadResponse.document_id);
-      if (newDoc?.processed) {
+      const newDoc = await documentsApi.getById(uploadResponse.document_id);
+      await loadDocuments();
+      if (newDoc.processed) {
         setSelectedDocument(newDoc);
         setMessages([]); // Clear chat for new document
       }
@@ -1,7 +1,7 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { Send } from 'lucide-react';
 import MessageBubble from './MessageBubble';
-import type { Document, Message } from '../types';
+import type { Citation, Document, Message } from '../types';
 import { chatApi } from '../services/api';
 
 interface ChatInterfaceProps {
@@ -32,6 +32,7 @@ function ChatInterface({
         const userQuestion = question.trim();
         setQuestion('');
         setIsAsking(true);
+        let loadingMessageId: string | null = null;
 
         try {
             // Add user message
@@ -40,27 +41,40 @@ function ChatInterface({
                 content: userQuestion,
             });
             // Add loading message for AI response
-            const loadingMessageId = onAddMessage({
+            const messageId = onAddMessage({
                 type: 'ai',
                 content: 'Thinking...',
                 isLoading: true,
             });
-            const response = await chatApi.ask({
-                document_id: selectedDocument.id,
-                question: userQuestion,
-            });
+            loadingMessageId = messageId;
 
-            // Update AI message with response
-            onUpdateMessage(loadingMessageId, {
-                content: response.answer,
-                isLoading: false,
-            });
+            // Render the answer as it is generated
+            let answer = '';
+            let citations: Citation[] = [];
+            await chatApi.askStream(
+                {
+                    document_id: selectedDocument.id,
+                    question: userQuestion,
+                },
+                {
+                    onContext: (context) => {
+                        citations = context.citations;
+                    },
+                    onToken: (text) => {
+                        answer += text;
+                        onUpdateMessage(messageId, {
+                            content: answer,
+                            isLoading: false,
+                            citations,
+                        });
+                    },
+                },
+            );
 
         } catch (error) {
             console.error('Error asking question:', error);
-            const loadingMessage = messages.find(m => m.isLoading);
-            if (loadingMessage) {
-                onUpdateMessage(loadingMessage.id, {
+            if (loadingMessageId) {
+                onUpdateMessage(loadingMessageId, {
                     content: 'Sorry, I encountered an error processing your question. Please try again.',
                     isLoading: false,
                 });
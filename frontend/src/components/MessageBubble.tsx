@@ -30,6 +30,20 @@ function MessageBubble({ message }: MessageBubbleProps) {
                         message.content
                     )}
                 </div>
+                {message.citations && message.citations.length > 0 && (
+                    <div className="message-citations">
+                        Sources:{' '}
+                        {message.citations.map((citation, index) => (
+                            <span
+                                key={index}
+                                className="citation"
+                                title={citation.snippet}
+                            >
+                                {citation.page ? `p. ${citation.page}` : `excerpt ${index + 1}`}
+                            </span>
+                        ))}
+                    </div>
+                )}
                 <div className="message-time">
                     {message.timestamp.toLocaleTimeString([], { 
                         hour: '2-digit', 
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import type { Document, UploadResponse, QuestionRequest, QuestionResponse } from '../types/index';
+import type { Document, DocumentStatus, UploadResponse, QuestionRequest, QuestionResponse, StreamHandlers } from '../types/index';
 
 const API_BASE_URL = 'http://localhost:8000/api';
 
@@ -34,6 +34,12 @@ export const documentsApi = {
     return response.data;
   },
 
+  // Get processing status
+  getStatus: async (id: number): Promise<DocumentStatus> => {
+    const response = await api.get(`/documents/${id}/status`);
+    return response.data;
+  },
+
   // Delete document
   delete: async (id: number): Promise<{ message: string }> => {
     const response = await api.delete(`/documents/${id}`);
@@ -48,6 +54,50 @@ export const chatApi = {
     return response.data;
   },
 
+  // Ask question and receive the answer as server-sent events
+  askStream: async (request: QuestionRequest, handlers: StreamHandlers, signal?: AbortSignal): Promise<void> => {
+    const response = await fetch(`${API_BASE_URL}/chat/ask/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(request),
+      signal,
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Request failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Events are separated by a blank line
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        const raw = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+
+        let event = 'message';
+        let data = '';
+        for (const line of raw.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        }
+        if (!data) continue;
+
+        const payload = JSON.parse(data);
+        if (event === 'context') handlers.onContext?.(payload);
+        else if (event === 'token') handlers.onToken(payload.text);
+        else if (event === 'done') handlers.onDone?.(payload);
+        else if (event === 'error') throw new Error(payload.detail);
+      }
+    }
+  },
+
   // Get conversation history
   getHistory: async (documentId: number): Promise<{
     // eslint-disable-next-line @typescript-eslint/no-explicit-any
@@ -18,6 +18,19 @@ export interface UploadResponse {
   filename: string;
   file_size: number;
   processing_started: boolean;
+  job_id?: string;
+  duplicate?: boolean;
+}
+
+export interface DocumentStatus {
+  document_id: number;
+  processed: boolean;
+  processing_error?: string;
+  chunk_count: number;
+  status: 'queued' | 'running' | 'completed' | 'failed';
+  stage: string;
+  progress: number;
+  job_id?: string;
 }
 
 export interface Message {
@@ -26,6 +39,16 @@ export interface Message {
   content: string;
   timestamp: Date;
   isLoading?: boolean;
+  citations?: Citation[];
+}
+
+export interface Citation {
+  document_id?: number;
+  page?: number;
+  char_start?: number;
+  char_end?: number;
+  score: number;
+  snippet: string;
 }
 
 export interface QuestionRequest {
@@ -40,6 +63,28 @@ export interface QuestionResponse {
   context_chunks_used: number;
   response_time_seconds: number;
   conversation_id: number;
+  cached?: boolean;
+  citations?: Citation[];
+}
+
+export interface StreamDone {
+  conversation_id: number;
+  context_chunks_used: number;
+  response_time_seconds: number;
+  time_to_first_token_seconds?: number;
+  cached?: boolean;
+}
+
+export interface StreamContext {
+  context_chunks_used: number;
+  cached?: boolean;
+  citations: Citation[];
+}
+
+export interface StreamHandlers {
+  onContext?: (context: StreamContext) => void;
+  onToken: (text: string) => void;
+  onDone?: (result: StreamDone) => void;
 }
 
 export interface ApiResponse<T> {